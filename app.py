@@ -1,9 +1,18 @@
 # Interactive Data Visualization Dashboard
 # Featuring: Stream Graph, Scatter Plot, Heatmaps, and Violin Chart
 
+import argparse
+import sys
+
+from dashboard.startup import LAZY_INIT, report_startup, warm_up
+
 import dash
 
-from dashboard.layout import LAYOUT
+from dashboard.layout import serve_layout, validation_layout
+from dashboard.compression import register_compression
+from dashboard.live import register_live_ingest
+from dashboard.recording import register_session_recording
+from dashboard.metrics import register_metrics
 import dashboard.callbacks  # noqa: F401, Import callbacks to register them
 
 
@@ -17,7 +26,72 @@ app = dash.Dash(
     meta_tags=[{"name": "viewport", "content": "width=device-width, initial-scale=1"}],
 )
 
-app.layout = LAYOUT
+if LAZY_INIT:
+    # Data and figures load on the first page load or callback; the id-only validation
+    # layout keeps Dash from calling serve_layout while checking callbacks at startup
+    app.validation_layout = validation_layout()
+    app.layout = serve_layout
+    report_startup()
+else:
+    timings = warm_up()
+    app.layout = serve_layout()
+    report_startup(timings)
+
+# WSGI entry point (e.g. `waitress-serve --threads 8 app:server`, or pre-fork:
+# `gunicorn -c gunicorn.conf.py app:server`)
+server = app.server
+
+# gzip/brotli responses; registered first so that its hook runs after the metrics hook
+register_compression(server)
+
+# Per-callback latency and payload metrics on /metrics (Prometheus text format)
+register_metrics(server)
+
+# HOSPITOOLS_LIVE_INGEST=1: fold rows appended to the data files in while running
+register_live_ingest(server)
+
+# HOSPITOOLS_RECORD_SESSIONS=DIR: save user sessions for benchmarks/load_test.py
+register_session_recording(server)
+
+
+def serve_threaded(threads: int, port: int) -> None:
+    """Serve the app from one process with a pool of worker threads.
+
+    Callbacks build every figure on a private clone of the frozen base figures,
+    so requests can run concurrently. Uses waitress when it is installed and
+    falls back to the threaded Flask server otherwise, with a warning: that
+    server starts a thread per request and ignores the thread count.
+
+    Args:
+        threads: Number of request threads
+        port: Port to listen on
+    """
+    try:
+        from waitress import serve
+    except ImportError:
+        print(
+            f"HospiTools: waitress is not installed, --threads {threads} is ignored and the "
+            "threaded Flask server starts a thread per request "
+            "(pip install -r requirements-optional.txt)",
+            file=sys.stderr,
+        )
+        app.run(debug=False, port=port, threaded=True)
+    else:
+        serve(server, host="127.0.0.1", port=port, threads=threads)
+
 
 if __name__ == "__main__":
-    app.run(debug=True, port=8050)
+    parser = argparse.ArgumentParser(description="Run the HospiTools dashboard")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        help="Serve with N request threads instead of the debug server",
+    )
+    args = parser.parse_args()
+
+    if args.threads > 0:
+        serve_threaded(args.threads, args.port)
+    else:
+        app.run(debug=True, port=args.port)
@@ -0,0 +1,74 @@
+// ============================================
+// CLIENTSIDE TIME RANGE EXTRACTION
+// ============================================
+// Turns line-chart relayoutData into the {start, end} week window stored in
+// time-range-store. Runs in the browser so rangeslider drags never hit the
+// server, and only writes the store once the drag settles (trailing-edge
+// debounce) and the integer week window actually changed.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    time_range: (function () {
+        let latestCall = 0;
+
+        function extractRange(relayoutData) {
+            if (!relayoutData) {
+                return undefined;
+            }
+            if (relayoutData["xaxis.autorange"]) {
+                return null; // Reset to the full range
+            }
+            if (Array.isArray(relayoutData["xaxis.range"])) {
+                return relayoutData["xaxis.range"];
+            }
+            if ("xaxis.range[0]" in relayoutData && "xaxis.range[1]" in relayoutData) {
+                return [relayoutData["xaxis.range[0]"], relayoutData["xaxis.range[1]"]];
+            }
+            // Ignore other layout changes (autosize, width, height, etc.)
+            return undefined;
+        }
+
+        function snapToWeeks(range, config) {
+            if (range === null) {
+                return null;
+            }
+            // Same semantics as the server-side filters: week >= start and week <= end
+            const start = Math.max(config.min_week, Math.ceil(Number(range[0])));
+            const end = Math.min(config.max_week, Math.floor(Number(range[1])));
+            if (start <= config.min_week && end >= config.max_week) {
+                return null; // The whole history is visible
+            }
+            return {start: start, end: end};
+        }
+
+        function sameWindow(a, b) {
+            if (!a || !b) {
+                return !a && !b;
+            }
+            return a.start === b.start && a.end === b.end;
+        }
+
+        return {
+            relayout_to_week_window: function (relayoutData, currentWindow, config) {
+                const noUpdate = window.dash_clientside.no_update;
+                const range = extractRange(relayoutData);
+                if (range === undefined) {
+                    return noUpdate;
+                }
+
+                const window_ = snapToWeeks(range, config);
+                const callId = ++latestCall;
+
+                return new Promise(function (resolve) {
+                    setTimeout(function () {
+                        // A newer relayout event arrived while waiting: let that one win
+                        if (callId !== latestCall || sameWindow(window_, currentWindow)) {
+                            resolve(noUpdate);
+                        } else {
+                            resolve(window_);
+                        }
+                    }, config.debounce_ms);
+                });
+            },
+        };
+    })(),
+});
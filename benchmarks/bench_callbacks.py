@@ -0,0 +1,308 @@
+"""Benchmarks of the view callbacks and their data helpers at scaled data sizes.
+
+For every scale the shipped CSVs are enlarged (services: one extra year of weeks per
+multiple, patients: the table repeated on the shifted weeks), then each operation is
+timed in a fresh subprocess pointed at that extract through HOSPITOOLS_DATA_DIR.
+With --synthetic the extract comes from benchmarks.synthetic_data instead (same
+size: one year and 1000 patients per multiple, with independent random values).
+With --columnar the extract is also converted to Feather before the worker runs.
+Results (latency distribution per operation, peak traced memory, peak RSS, import
+time) are written as JSON; pass --compare to flag regressions against an older run.
+
+Usage:
+    python -m benchmarks.bench_callbacks --scales 1 10 100 1000 --output bench.json
+    python -m benchmarks.bench_callbacks --scales 1 10 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import write_dataset
+from dashboard.ingest import convert_to_columnar
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / "data"
+SERVICES_FILE = "df_services_weekly_prepped.csv"
+PATIENTS_FILE = "df_patients_prepped.csv"
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+
+
+# ============================================
+# SCALED DATASETS
+# ============================================
+
+
+def write_scaled_data(scale: int, out_dir: Path) -> dict:
+    """Write the shipped datasets enlarged `scale` times into out_dir.
+
+    Copy k of the weekly services table is shifted by k years, so the number of
+    services stays the same and the history grows. Patients are repeated on the
+    same shifted weeks.
+
+    Returns:
+        Row counts of the written tables
+    """
+    services = pd.read_csv(DATA_DIR / SERVICES_FILE)
+    patients = pd.read_csv(DATA_DIR / PATIENTS_FILE)
+    weeks_per_copy = int(services["week"].max() - services["week"].min() + 1)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for filename, frame in ((SERVICES_FILE, services), (PATIENTS_FILE, patients)):
+        path = out_dir / filename
+        for k in range(scale):
+            copy = frame.assign(week=frame["week"] + k * weeks_per_copy)
+            copy.to_csv(path, mode="w" if k == 0 else "a", header=k == 0, index=False)
+
+    return {"services_rows": len(services) * scale, "patients_rows": len(patients) * scale}
+
+
+# ============================================
+# OPERATIONS
+# ============================================
+
+
+def build_operations() -> dict:
+    """Import the dashboard and return {operation name: zero-argument callable}.
+
+    The view callbacks are timed as the browser calls them: a request to
+    /_dash-update-component through the Flask test client, so the figure cache,
+    compaction and serialization are included, and so are the job and its polls when
+    the worker runs with HOSPITOOLS_BACKGROUND_CALLBACKS=1. "[cached]" repeats the
+    same request; "[built]" empties the figure cache (and the stored background
+    results) first. Time ranges are whole weeks, as the page's time-range-store
+    sends them.
+    """
+    from app import server
+    from benchmarks.dash_client import call_callback, find_dependency, load_dependencies, load_layout_ids
+    from dashboard.background import BACKGROUND_MANAGER
+    from dashboard.dash_data import SERVICES, WEEKS, get_heatmap_counts, get_heatmap_data
+    from dashboard.figure_cache import FIGURE_CACHE
+    from dashboard.scatterplot_matrix import decode_selection
+
+    client = server.test_client()
+    dependencies = load_dependencies(client)
+    layout_ids = load_layout_ids(client)
+
+    # A window over the middle half of the history, like a zoomed rangeslider
+    span = WEEKS[-1] - WEEKS[0]
+    time_range = (int(WEEKS[0] + span // 4), int(WEEKS[0] + span * 3 // 4))
+    two_services = SERVICES[:2]
+    # A lasso over every point of every trace
+    all_points = [{"curveNumber": c, "pointIndex": i} for c in range(len(SERVICES)) for i in range(len(WEEKS))]
+
+    values = {
+        "services-checklist.value": two_services,
+        "metric-checklist.value": ["Patient Satisfaction", "Staff Morale"],
+        "time-range-store.data": {"start": time_range[0], "end": time_range[1]},
+        "line-chart.relayoutData": {"xaxis.range": list(time_range)},
+        "heatmap-attribute-radio.value": "age_bin",
+        "violin-metric-radio.value": "ratio",
+        # The first event of the violin chart, as its click sends it
+        "violin-chart.clickData": {"points": [{"x": 0.1}]},
+    }
+
+    def clear_caches():
+        FIGURE_CACHE.clear()
+        if BACKGROUND_MANAGER is not None:
+            BACKGROUND_MANAGER.handle.clear()
+
+    def request(output: str, changed: list[str], built: bool = False):
+        dependency = find_dependency(dependencies, output)
+
+        def call():
+            if built:
+                clear_caches()
+            status, _ = call_callback(client, dependency, values, changed, layout_ids)
+            if status != 200:
+                raise RuntimeError(f"{output}: HTTP {status}")
+
+        return call
+
+    return {
+        "get_heatmap_data[age_bin]": lambda: get_heatmap_data("age_bin", SERVICES[0], time_range),
+        "get_heatmap_data[length_of_stay]": lambda: get_heatmap_data("length_of_stay", SERVICES[0], time_range),
+        "get_heatmap_counts[all services]": lambda: get_heatmap_counts("age_bin", time_range),
+        "heatmaps callback[cached]": request('"type":"heatmap"', ["time-range-store.data"]),
+        "heatmaps callback[built]": request('"type":"heatmap"', ["time-range-store.data"], built=True),
+        # Not cached: every request builds the figure
+        "line chart callback[violin click]": request("line-chart.figure", ["violin-chart.clickData"]),
+        "scatter callback[cached]": request("scatter-plot.figure", ["violin-chart.clickData"]),
+        "scatter callback[built]": request("scatter-plot.figure", ["violin-chart.clickData"], built=True),
+        "violin callback[cached]": request("violin-chart.figure", ["time-range-store.data"]),
+        "violin callback[built]": request("violin-chart.figure", ["time-range-store.data"], built=True),
+        "decode_selection[all points]": lambda: decode_selection(all_points, time_range),
+    }
+
+
+def _distribution(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+
+    def pct(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "min_ms": ordered[0],
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+def run_worker(repeat: int, max_seconds: float) -> dict:
+    """Time every operation in this process (data comes from HOSPITOOLS_DATA_DIR)."""
+    start = time.perf_counter()
+    operations = build_operations()
+    import_s = time.perf_counter() - start
+
+    results = {}
+    for name, operation in operations.items():
+        operation()  # Warm-up: lazy imports, caches
+
+        samples = []
+        budget_end = time.perf_counter() + max_seconds
+        while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() < budget_end):
+            t0 = time.perf_counter()
+            operation()
+            samples.append((time.perf_counter() - t0) * 1e3)
+
+        # Peak memory is traced on a separate run: tracemalloc distorts the timings
+        tracemalloc.start()
+        operation()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {**_distribution(samples), "peak_traced_mb": peak / 2**20}
+
+    return {
+        "import_s": import_s,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "operations": results,
+    }
+
+
+# ============================================
+# DRIVER
+# ============================================
+
+
+def run_scale(scale: int, repeat: int, max_seconds: float, synthetic: bool = False, columnar: bool = False) -> dict:
+    """Build the scaled extract and benchmark it in a fresh interpreter."""
+    with tempfile.TemporaryDirectory(prefix=f"hospitools-x{scale}-") as tmp:
+        if synthetic:
+            rows = write_dataset(Path(tmp), years=scale, n_patients=1000 * scale)
+        else:
+            rows = write_scaled_data(scale, Path(tmp))
+        if columnar:
+            convert_to_columnar(Path(tmp))
+        env = {**os.environ, "HOSPITOOLS_DATA_DIR": tmp}
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_callbacks",
+            "--worker",
+            "--repeat",
+            str(repeat),
+            "--max-seconds",
+            str(max_seconds),
+        ]
+        output = subprocess.run(command, cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    return {**rows, **json.loads(output.splitlines()[-1])}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """List operations whose p50 grew by more than `threshold` times versus the baseline."""
+    regressions = []
+    for scale, result in current["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if base is None:
+            continue
+        for name, stats in result["operations"].items():
+            old = base["operations"].get(name)
+            if old and stats["p50_ms"] > old["p50_ms"] * threshold:
+                ratio = stats["p50_ms"] / old["p50_ms"]
+                regressions.append(
+                    f"x{scale} {name}: p50 {old['p50_ms']:.2f} -> {stats['p50_ms']:.2f} ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def print_table(report: dict) -> None:
+    for scale, result in report["scales"].items():
+        print(
+            f"\nx{scale}: {result['services_rows']} weekly rows, {result['patients_rows']} patients, "
+            f"import {result['import_s']:.2f}s, peak RSS {result['peak_rss_mb']:.0f} MB"
+        )
+        for name, stats in result["operations"].items():
+            print(
+                f"  {name:34s} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  "
+                f"p99 {stats['p99_ms']:9.2f} ms  peak {stats['peak_traced_mb']:8.1f} MB  (n={stats['n']})"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--repeat", type=int, default=30, help="Timed runs per operation")
+    parser.add_argument("--max-seconds", type=float, default=20.0, help="Time budget per operation")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p50 ratio reported as a regression")
+    parser.add_argument("--synthetic", action="store_true", help="Use generated data instead of copies")
+    parser.add_argument("--columnar", action="store_true", help="Load the extract from Feather instead of CSV")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.repeat, args.max_seconds)))
+        return 0
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "data": "synthetic" if args.synthetic else "scaled copies",
+            "format": "feather" if args.columnar else "csv",
+        },
+        "scales": {},
+    }
+    for scale in args.scales:
+        report["scales"][str(scale)] = run_scale(
+            scale, args.repeat, args.max_seconds, args.synthetic, args.columnar
+        )
+        print_table({"scales": {str(scale): report["scales"][str(scale)]}})
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        print("\nRegressions:" if regressions else "\nNo regressions.")
+        for line in regressions:
+            print(f"  {line}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
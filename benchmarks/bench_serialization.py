@@ -0,0 +1,124 @@
+"""Bytes and encode time of every figure, plain plotly JSON versus the compact serializer.
+
+Each default figure (and a zoomed, highlighted line chart as produced by its callback)
+is serialized three ways:
+
+- plotly json: plotly.io.json.to_json_plotly with the json module (no orjson);
+- plotly orjson: the same with orjson, i.e. what Dash sends for a raw figure;
+- compact: dashboard.serialization (typed arrays, rounded floats, orjson).
+
+For each the JSON size, its gzip size and the median encode time are printed; the
+compact time includes building the compacted copy of the figure.
+
+Usage:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --data-dir /tmp/big --repeat 50 --output ser.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def build_figures() -> dict:
+    """Import the dashboard and return {figure name: plotly figure}."""
+    from dashboard.dash_data import SERVICES, WEEKS
+    from dashboard.figure_base import clone_figure
+    from dashboard.heatmap import get_heatmap_figs
+    from dashboard.linechart import get_linechart_base, get_linechart_fig, update_line_chart
+    from dashboard.scatterplot_matrix import get_scatterplot_fig
+    from dashboard.startup import warm_up
+    from dashboard.violinchart import get_violin_fig
+
+    warm_up()
+    span = WEEKS[-1] - WEEKS[0]
+    time_range = [WEEKS[0] + span * 0.25, WEEKS[0] + span * 0.75]
+
+    figures = {
+        "line chart": get_linechart_fig(),
+        "line chart [zoomed, flu]": update_line_chart(
+            clone_figure(get_linechart_base()),
+            ["Patient Satisfaction", "Staff Morale"],
+            SERVICES,
+            time_range,
+            None,
+            None,
+            "flu",
+        ),
+        "scatter matrix": get_scatterplot_fig(),
+        "violin chart": get_violin_fig(),
+    }
+    figures.update({f"heatmap [{service}]": fig for service, fig in get_heatmap_figs().items()})
+    return figures
+
+
+def _encoders() -> dict:
+    from plotly.io.json import to_json_plotly
+
+    from dashboard.serialization import compact_figure, dumps, orjson
+
+    encoders = {"plotly json": lambda fig: to_json_plotly(fig, engine="json")}
+    if orjson is not None:
+        encoders["plotly orjson"] = lambda fig: to_json_plotly(fig, engine="orjson")
+    encoders["compact"] = lambda fig: dumps(compact_figure(fig))
+    return encoders
+
+
+def measure(figures: dict, repeat: int) -> dict:
+    """{figure: {encoder: bytes, gzip bytes, median encode ms}}."""
+    encoders = _encoders()
+    results = {}
+    for name, fig in figures.items():
+        results[name] = {}
+        for encoder_name, encode in encoders.items():
+            text = encode(fig)
+            samples = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                encode(fig)
+                samples.append((time.perf_counter() - t0) * 1e3)
+            body = text.encode()
+            results[name][encoder_name] = {
+                "bytes": len(body),
+                "gzip_bytes": len(gzip.compress(body, compresslevel=6)),
+                "encode_ms": statistics.median(samples),
+            }
+    return results
+
+
+def print_table(results: dict) -> None:
+    for name, by_encoder in results.items():
+        print(f"\n{name}")
+        baseline = by_encoder["plotly json"]
+        for encoder_name, stats in by_encoder.items():
+            print(
+                f"  {encoder_name:14s} {stats['bytes'] / 1024:8.1f} kB ({stats['bytes'] / baseline['bytes']:5.0%})  "
+                f"gzip {stats['gzip_bytes'] / 1024:7.1f} kB  encode {stats['encode_ms']:8.2f} ms "
+                f"({baseline['encode_ms'] / stats['encode_ms']:4.1f}x)"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, help="Dataset to load (HOSPITOOLS_DATA_DIR)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed encodes per figure and encoder")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    if args.data_dir is not None:
+        os.environ["HOSPITOOLS_DATA_DIR"] = str(args.data_dir)
+
+    results = measure(build_figures(), args.repeat)
+    print_table(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import json
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# ============================================
+# DASH CALLBACK REQUESTS
+# ============================================
+# Helpers to drive registered callbacks through `/_dash-update-component` exactly
+# like the browser does, using the dependency list the app publishes. They work with
+# a Flask test client (in-process) or an HttpClient (a running server). Background
+# callbacks first answer with a job handle; call_callback then polls for the result
+# like the browser does.
+
+
+class HttpResponse:
+    """The parts of a Flask test response the helpers below use."""
+
+    def __init__(self, status_code: int, data: bytes):
+        self.status_code = status_code
+        self.data = data
+
+    def get_json(self):
+        return json.loads(self.data)
+
+
+class HttpClient:
+    """Minimal stand-in for a Flask test client that talks to a running server."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def get(self, path: str) -> HttpResponse:
+        return self._request(urllib.request.Request(self.base_url + path))
+
+    def post(self, path: str, data: str, content_type: str) -> HttpResponse:
+        request = urllib.request.Request(
+            self.base_url + path, data=data.encode(), headers={"Content-Type": content_type}
+        )
+        return self._request(request)
+
+    def _request(self, request) -> HttpResponse:
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return HttpResponse(response.status, response.read())
+        except urllib.error.HTTPError as error:
+            return HttpResponse(error.code, error.read())
+
+
+def load_dependencies(client) -> list[dict]:
+    """Fetch the callback dependency list from a Flask test client or HTTP session."""
+    return client.get("/_dash-dependencies").get_json()
+
+
+def _layout_props(layout) -> list[dict]:
+    """Props of every component of a layout that has an id."""
+    found = []
+
+    def walk(node):
+        if isinstance(node, list):
+            for child in node:
+                walk(child)
+        elif isinstance(node, dict) and "props" in node:
+            if node["props"].get("id") is not None:
+                found.append(node["props"])
+            walk(node["props"].get("children"))
+
+    walk(layout)
+    return found
+
+
+def layout_ids(layout) -> list:
+    """Every component id of a layout (as served by /_dash-layout), used to expand wildcard outputs."""
+    return [props["id"] for props in _layout_props(layout)]
+
+
+def layout_values(layout) -> dict:
+    """Initial "component-id.property" -> value of every prop of a layout.
+
+    Components with pattern-matching (dict) ids are left out, and so are children.
+    """
+    values = {}
+    for props in _layout_props(layout):
+        if isinstance(props["id"], str):
+            values.update({f"{props['id']}.{name}": value for name, value in props.items() if name != "children"})
+    return values
+
+
+def load_layout_ids(client) -> list:
+    """Every component id of the served layout, used to expand wildcard outputs."""
+    return layout_ids(client.get("/_dash-layout").get_json())
+
+
+def free_port() -> int:
+    """A TCP port on 127.0.0.1 that is free right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(client: HttpClient, process: subprocess.Popen, timeout: float) -> None:
+    """Wait until a server started as process answers /_dash-dependencies.
+
+    Raises:
+        RuntimeError: The process exited first
+        TimeoutError: The server did not answer within timeout seconds
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}")
+        try:
+            if client.get("/_dash-dependencies").status_code == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("The server did not start in time")
+
+
+def find_dependency(dependencies: list[dict], output: str) -> dict:
+    """Return the callback whose output string contains the given component id."""
+    for dependency in dependencies:
+        if output in dependency["output"]:
+            return dependency
+    raise KeyError(f"No callback with output {output!r}")
+
+
+def _outputs(output: str, layout_ids: list):
+    """Decode Dash's output string into the `outputs` field of a request."""
+    if output.startswith(".."):
+        return [_prop_spec(part, layout_ids) for part in output.strip(".").split("...")]
+    return _prop_spec(output, layout_ids)
+
+
+def _prop_spec(prop: str, layout_ids: list):
+    component_id, prop_name = prop.rsplit(".", 1)
+    if not component_id.startswith("{"):
+        return {"id": component_id, "property": prop_name}
+
+    # Pattern-matching id: one spec per layout component matching it, like the browser sends
+    pattern = json.loads(component_id)
+    return [
+        {"id": layout_id, "property": prop_name}
+        for layout_id in layout_ids
+        if isinstance(layout_id, dict)
+        and layout_id.keys() == pattern.keys()
+        and all(value == ["ALL"] or layout_id[key] == value for key, value in pattern.items())
+    ]
+
+
+def build_callback_body(dependency: dict, values: dict, changed: list[str], layout_ids: list | None = None) -> dict:
+    """Build the JSON body of a callback request.
+
+    Args:
+        dependency: Entry of the dependency list for the callback to call
+        values: Current value per "component-id.property" (missing ones are sent as None)
+        changed: The "component-id.property" keys that triggered the call
+        layout_ids: Component ids of the layout (load_layout_ids), needed for wildcard outputs
+
+    Returns:
+        Request body for POST /_dash-update-component
+    """
+
+    def with_value(spec):
+        key = f"{spec['id']}.{spec['property']}"
+        return {"id": spec["id"], "property": spec["property"], "value": values.get(key)}
+
+    return {
+        "output": dependency["output"],
+        "outputs": _outputs(dependency["output"], layout_ids or []),
+        "inputs": [with_value(spec) for spec in dependency["inputs"]],
+        "state": [with_value(spec) for spec in dependency["state"]],
+        "changedPropIds": changed,
+    }
+
+
+def call_callback(
+    client,
+    dependency: dict,
+    values: dict,
+    changed: list[str],
+    layout_ids: list | None = None,
+    poll_interval: float = 0.02,
+    timeout: float = 60.0,
+) -> tuple[int, bytes]:
+    """POST one callback request and return (status code, raw response body).
+
+    For a background callback, the body is that of the poll that returned the result.
+
+    Raises:
+        TimeoutError: A background job gave no result within timeout seconds
+    """
+    body = build_callback_body(dependency, values, changed, layout_ids)
+    response = client.post("/_dash-update-component", data=json.dumps(body), content_type="application/json")
+    if response.status_code != 200 or not response.data.startswith(b'{"cacheKey"'):
+        return response.status_code, response.data
+
+    # Background callback: poll with the job handle (the browser clears the values too)
+    handle = response.get_json()
+    query = urllib.parse.urlencode({"cacheKey": handle["cacheKey"], "job": handle["job"]})
+    for spec in body["inputs"] + body["state"]:
+        spec["value"] = None
+    poll_body = json.dumps(body)
+    deadline = time.perf_counter() + timeout
+    while True:
+        time.sleep(poll_interval)
+        response = client.post(f"/_dash-update-component?{query}", data=poll_body, content_type="application/json")
+        if response.status_code != 200 or b'"response"' in response.data[:64]:
+            return response.status_code, response.data
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"No result for {dependency['output']} after {timeout} s")
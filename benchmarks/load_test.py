@@ -0,0 +1,505 @@
+"""Replay dashboard sessions with concurrent simulated users and report the load per callback.
+
+Every user loads the page (layout and the callbacks the browser fires on load) and then
+replays a session: a list of steps, each a set of props the user changed, at its time
+offset. Steps are rangeslider drags on the line chart, service checklist toggles,
+SPLOM lassos, violin clicks and heatmap attribute switches. As in the browser, every
+server callback with a changed prop among its inputs is called with the page's
+current values. Outputs that other callbacks read (stores) are applied to the page
+and fire those callbacks in turn.
+
+Sessions are JSON Lines files recorded from real use (HOSPITOOLS_RECORD_SESSIONS=DIR, see
+dashboard/recording.py). Without --sessions they are generated from --seed;
+--save-sessions writes the generated ones in the same format.
+
+Per callback it prints calls, throughput, latency percentiles (background callbacks
+include polling) and error rate. It also counts mismatches: identical requests must
+get identical responses, so a difference points at shared figures mutated by
+concurrent requests (use --no-verify while live ingestion changes the data). The
+exit code is 1 if any request failed or mismatched.
+
+The app is served in-process through the Flask test client, by a server started for
+the run (--start threads|gunicorn), or by a running server (--url).
+
+Usage:
+    python -m benchmarks.load_test --users 16 --speed 0
+    python -m benchmarks.load_test --sessions recorded/ --users 32 --duration 120 --url http://127.0.0.1:8050
+    python -m benchmarks.load_test --start gunicorn --workers 4 --users 64 --data-dir /tmp/big --output load.json
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.dash_client import (
+    HttpClient,
+    call_callback,
+    free_port,
+    layout_ids,
+    layout_values,
+    load_dependencies,
+    wait_ready,
+)
+from dashboard.recording import SESSION_FORMAT, read_session, write_session
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Generated sessions: user actions and their relative frequency
+ACTIONS = {
+    "drag": 6,
+    "services": 3,
+    "lasso": 3,
+    "violin_click": 3,
+    "heatmap_attribute": 2,
+    "violin_metric": 1,
+    "metrics": 1,
+}
+
+# One violin per event (dash_data.EVENTS)
+EVENT_COUNT = 4
+
+# Cap on callback chains (a store output firing more callbacks) per step
+MAX_CHAIN = 8
+
+
+# ============================================
+# SESSIONS
+# ============================================
+
+
+def _option_values(options: list) -> list:
+    return [option["value"] if isinstance(option, dict) else option for option in options]
+
+
+def generate_session(rng: random.Random, page: dict, steps: int) -> dict:
+    """A session of random user actions on a page with the given initial values.
+
+    Args:
+        rng: Random source
+        page: Initial "component-id.property" -> value of the page (layout_values)
+        steps: Number of actions
+
+    Returns:
+        Session dict in the format of dashboard/recording.py
+    """
+    # One splom trace per service option, holding one point per week of the history
+    services = _option_values(page["services-checklist.options"])
+    metrics = _option_values(page["metric-checklist.options"])
+    attributes = _option_values(page["heatmap-attribute-radio.options"])
+    violin_metrics = _option_values(page["violin-metric-radio.options"])
+    first_week, last_week = page["time-range-config.data"]["min_week"], page["time-range-config.data"]["max_week"]
+    span = last_week - first_week
+
+    selected_services = list(page["services-checklist.value"] or [])
+    selected_metrics = list(page["metric-checklist.value"] or [])
+    attribute = page["heatmap-attribute-radio.value"]
+    violin_metric = page["violin-metric-radio.value"]
+
+    at_s = 0.0
+    session_steps = []
+    for _ in range(steps):
+        action = rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        if action == "drag":
+            if rng.random() < 0.1:
+                # Double click: back to the full range
+                changed = {"line-chart.relayoutData": {"xaxis.autorange": True}, "time-range-store.data": None}
+            else:
+                # Where the rangeslider handles settle; the store gets the snapped window
+                # once the clientside debounce (assets/time_range.js) has fired
+                width = rng.uniform(0.1, 0.6) * span
+                start = rng.uniform(first_week, last_week - width)
+                window = {"start": math.ceil(start), "end": math.floor(start + width)}
+                changed = {
+                    "line-chart.relayoutData": {"xaxis.range": [start, start + width]},
+                    "time-range-store.data": window,
+                }
+            think_s = rng.uniform(0.2, 1.5)
+        elif action == "services":
+            service = rng.choice(services)
+            if service in selected_services:
+                selected_services.remove(service)
+            else:
+                selected_services.append(service)
+            changed = {"services-checklist.value": list(selected_services)}
+            think_s = rng.uniform(0.5, 3.0)
+        elif action == "lasso":
+            points = [
+                {"curveNumber": rng.randrange(len(services)), "pointIndex": rng.randrange(span + 1)}
+                for _ in range(rng.randint(3, 60))
+            ]
+            changed = {"scatter-plot.selectedData": {"points": points} if rng.random() < 0.9 else None}
+            think_s = rng.uniform(1.0, 4.0)
+        elif action == "violin_click":
+            changed = {
+                "violin-chart.clickData": {"points": [{"x": rng.randrange(EVENT_COUNT) + rng.uniform(-0.3, 0.3)}]}
+            }
+            think_s = rng.uniform(1.0, 4.0)
+        elif action == "heatmap_attribute":
+            attribute = rng.choice([value for value in attributes if value != attribute])
+            changed = {"heatmap-attribute-radio.value": attribute}
+            think_s = rng.uniform(0.5, 3.0)
+        elif action == "violin_metric":
+            violin_metric = rng.choice([value for value in violin_metrics if value != violin_metric])
+            changed = {"violin-metric-radio.value": violin_metric}
+            think_s = rng.uniform(0.5, 3.0)
+        else:
+            metric = rng.choice(metrics)
+            if metric in selected_metrics and len(selected_metrics) > 1:
+                selected_metrics.remove(metric)
+            elif metric not in selected_metrics:
+                selected_metrics.append(metric)
+            changed = {"metric-checklist.value": list(selected_metrics)}
+            think_s = rng.uniform(0.5, 3.0)
+
+        at_s += think_s
+        session_steps.append({"at_s": round(at_s, 3), "changed": changed})
+    return {"format": SESSION_FORMAT, "recorded": "generated", "steps": session_steps}
+
+
+def load_sessions(paths: list[Path]) -> list[dict]:
+    """Sessions from session files, or from every *.jsonl file of the given directories."""
+    files = []
+    for path in paths:
+        files += sorted(path.glob("*.jsonl")) if path.is_dir() else [path]
+    sessions = [read_session(file) for file in files]
+    return [session for session in sessions if session["steps"]]
+
+
+# ============================================
+# REPLAY
+# ============================================
+
+
+def _keys(specs: list) -> list[str]:
+    """The "component-id.property" keys of the specs with plain string ids."""
+    return [f"{spec['id']}.{spec['property']}" for spec in specs if isinstance(spec.get("id"), str)]
+
+
+def _output_keys(output: str) -> list[str]:
+    parts = output.strip(".").split("...") if output.startswith("..") else [output]
+    return [part for part in parts if not part.startswith("{")]
+
+
+def _label(dependency: dict) -> str:
+    """Readable name of a callback: its first output, wildcards shortened."""
+    output = dependency["output"].strip(".").split("...")[0]
+    component_id, prop = output.rsplit(".", 1)
+    if component_id.startswith("{"):
+        component_id = json.loads(component_id).get("type", "pattern") + "[ALL]"
+    return f"{component_id}.{prop}"
+
+
+class CallbackGraph:
+    """The server callbacks of the app and the page props they read and write."""
+
+    def __init__(self, dependencies: list[dict]):
+        # Clientside callbacks run in the browser: the props they write are recorded
+        self.callbacks = [dependency for dependency in dependencies if not dependency.get("clientside_function")]
+        for dependency in self.callbacks:
+            dependency["input_keys"] = set(_keys(dependency["inputs"]))
+            dependency["label"] = _label(dependency)
+        self.read = set()
+        for dependency in self.callbacks:
+            self.read |= dependency["input_keys"] | set(_keys(dependency["state"]))
+        self.written = {key for dependency in self.callbacks for key in _output_keys(dependency["output"])}
+        for dependency in self.callbacks:
+            # Outputs the page has to keep because callbacks read them (stores)
+            dependency["read_outputs"] = set(_output_keys(dependency["output"])) & self.read
+
+    def triggered(self, changed: set[str]) -> list[tuple[dict, list[str]]]:
+        """Callbacks fired by a set of changed props, with the props that triggered each."""
+        return [
+            (dependency, sorted(dependency["input_keys"] & changed))
+            for dependency in self.callbacks
+            if dependency["input_keys"] & changed
+        ]
+
+    def initial(self) -> list[tuple[dict, list[str]]]:
+        """Callbacks the browser fires when the page loads."""
+        return [(dependency, []) for dependency in self.callbacks if not dependency.get("prevent_initial_call")]
+
+
+class LoadStats:
+    """Thread-safe latencies, errors and response mismatches per callback."""
+
+    def __init__(self, verify: bool):
+        self.verify = verify
+        self._lock = threading.Lock()
+        self._latencies = {}  # label -> [ms]
+        self._errors = {}  # label -> count
+        self._mismatches = {}  # label -> count
+        self._digests = {}  # request fingerprint -> response digest
+
+    def record(self, label: str, seconds: float, ok: bool, request: str | None = None, body: bytes = b"") -> None:
+        digest = hashlib.blake2b(body, digest_size=16).digest() if self.verify and ok and request else None
+        with self._lock:
+            self._latencies.setdefault(label, []).append(seconds * 1e3)
+            if not ok:
+                self._errors[label] = self._errors.get(label, 0) + 1
+            if digest is not None and self._digests.setdefault(request, digest) != digest:
+                self._mismatches[label] = self._mismatches.get(label, 0) + 1
+
+    def report(self, duration_s: float) -> dict:
+        """{label: calls, throughput, latency percentiles, errors, mismatches}, plus "total"."""
+        report = {}
+        everything = []
+        for label, latencies in sorted(self._latencies.items()):
+            everything += latencies
+            report[label] = self._summary(
+                latencies, self._errors.get(label, 0), self._mismatches.get(label, 0), duration_s
+            )
+        report["total"] = self._summary(
+            everything, sum(self._errors.values()), sum(self._mismatches.values()), duration_s
+        )
+        return report
+
+    @staticmethod
+    def _summary(latencies: list[float], errors: int, mismatches: int, duration_s: float) -> dict:
+        ordered = sorted(latencies)
+
+        def pct(q):
+            return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+        return {
+            "calls": len(ordered),
+            "per_second": len(ordered) / duration_s if duration_s else 0.0,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": ordered[-1] if ordered else 0.0,
+            "errors": errors,
+            "error_rate": errors / len(ordered) if ordered else 0.0,
+            "mismatches": mismatches,
+        }
+
+
+def _call(client, stats: LoadStats, page: dict, ids: list, dependency: dict, changed: list[str]) -> dict:
+    """Call one callback with the page's values; returns the page props it changed."""
+    fingerprint = None
+    if stats.verify:
+        fingerprint = json.dumps(
+            [
+                dependency["output"],
+                changed,
+                [page.get(key) for key in _keys(dependency["inputs"] + dependency["state"])],
+            ],
+            sort_keys=True,
+        )
+    start = time.perf_counter()
+    try:
+        status, body = call_callback(client, dependency, page, changed, ids)
+    except (OSError, TimeoutError):
+        status, body = None, b""
+    # 204: the callback raised PreventUpdate
+    ok = status in (200, 204)
+    stats.record(dependency["label"], time.perf_counter() - start, ok, fingerprint, body)
+
+    updates = {}
+    if status == 200 and dependency["read_outputs"]:
+        for component_id, props in json.loads(body)["response"].items():
+            for prop, value in props.items():
+                key = f"{component_id}.{prop}"
+                if key in dependency["read_outputs"] and page.get(key) != value:
+                    updates[key] = value
+    return updates
+
+
+def _fire(client, graph: CallbackGraph, stats: LoadStats, page: dict, ids: list, calls: list) -> None:
+    """Run the triggered callbacks, then those triggered by the store values they set."""
+    for _ in range(MAX_CHAIN):
+        if not calls:
+            return
+        updates = {}
+        for dependency, changed in calls:
+            updates.update(_call(client, stats, page, ids, dependency, changed))
+        page.update(updates)
+        calls = graph.triggered(set(updates))
+
+
+def replay(client, graph: CallbackGraph, stats: LoadStats, session: dict, speed: float, deadline: float) -> bool:
+    """Load the page and replay one session. Returns False when stopped by the deadline."""
+    # What the browser fetches on every page load
+    start = time.perf_counter()
+    response = client.get("/_dash-layout")
+    ok = response.status_code == 200 and client.get("/_dash-dependencies").status_code == 200
+    stats.record("page load", time.perf_counter() - start, ok)
+    if not ok:
+        return True
+    layout = response.get_json()
+    page, ids = layout_values(layout), layout_ids(layout)
+    _fire(client, graph, stats, page, ids, graph.initial())
+
+    previous_s = 0.0
+    for step in session["steps"]:
+        time.sleep(max(0.0, step["at_s"] - previous_s) * speed)
+        previous_s = step["at_s"]
+        if time.monotonic() > deadline:
+            return False
+        # Props written by server callbacks are derived again by the replay itself
+        changed = {key: value for key, value in step["changed"].items() if key not in graph.written}
+        page.update(changed)
+        _fire(client, graph, stats, page, ids, graph.triggered(set(changed)))
+    return True
+
+
+# ============================================
+# SERVERS
+# ============================================
+
+
+def start_server(kind: str, threads: int, workers: int, data_dir: Path | None) -> tuple[subprocess.Popen, str]:
+    """Start `python app.py --threads` or gunicorn on a free port; returns (process, base URL)."""
+    port = free_port()
+    env = dict(os.environ)
+    if data_dir is not None:
+        env["HOSPITOOLS_DATA_DIR"] = str(data_dir)
+    if kind == "gunicorn":
+        env.update(
+            HOSPITOOLS_BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY=str(workers), HOSPITOOLS_WORKER_THREADS=str(threads)
+        )
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:server"]
+    else:
+        command = [sys.executable, "app.py", "--threads", str(threads), "--port", str(port)]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(HttpClient(url), process, timeout=600)
+    except (RuntimeError, TimeoutError):
+        process.kill()
+        raise
+    return process, url
+
+
+def run(
+    make_client,
+    sessions: list[dict],
+    users: int,
+    loops: int,
+    duration: float,
+    speed: float,
+    ramp_up: float,
+    verify: bool,
+) -> dict:
+    """Replay the sessions with `users` concurrent users and return the report."""
+    graph = CallbackGraph(load_dependencies(make_client()))
+    stats = LoadStats(verify)
+    completed = [0] * users
+    start = time.monotonic()
+    deadline = start + duration if duration > 0 else math.inf
+
+    def user(index: int) -> None:
+        time.sleep(ramp_up * index / users)
+        client = make_client()
+        session = sessions[index % len(sessions)]
+        # Loop until the deadline with --duration, else `loops` times
+        while duration > 0 or completed[index] < loops:
+            if not replay(client, graph, stats, session, speed, deadline):
+                return
+            completed[index] += 1
+            if time.monotonic() > deadline:
+                return
+
+    threads = [threading.Thread(target=user, args=(index,), daemon=True) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    return {
+        "users": users,
+        "sessions_replayed": sum(completed),
+        "duration_s": elapsed,
+        "callbacks": stats.report(elapsed),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"\n{report['users']} users, {report['sessions_replayed']} sessions replayed in {report['duration_s']:.1f} s\n"
+        f"{'callback':34s} {'calls':>7s} {'per s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+        f"{'max ms':>9s} {'errors':>8s} {'mismatch':>8s}"
+    )
+    for label, stats in report["callbacks"].items():
+        print(
+            f"{label:34s} {stats['calls']:7d} {stats['per_second']:8.1f} {stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} "
+            f"{stats['p99_ms']:9.1f} {stats['max_ms']:9.1f} {stats['error_rate']:8.2%} {stats['mismatches']:8d}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8, help="Concurrent simulated users")
+    parser.add_argument("--sessions", type=Path, nargs="+", help="Recorded session files or directories")
+    parser.add_argument("--steps", type=int, default=20, help="Actions per generated session")
+    parser.add_argument("--seed", type=int, default=65)
+    parser.add_argument("--save-sessions", type=Path, help="Write the generated sessions to this directory")
+    parser.add_argument("--loops", type=int, default=1, help="Times each user replays its session")
+    parser.add_argument("--duration", type=float, default=0, help="Replay for this many seconds instead of --loops")
+    parser.add_argument("--speed", type=float, default=1.0, help="Think-time factor (0: no pauses between steps)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which the users start")
+    parser.add_argument("--no-verify", action="store_true", help="Don't compare responses of identical requests")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Load a running server instead of the in-process app")
+    target.add_argument("--start", choices=["threads", "gunicorn"], help="Start a local server for the run")
+    parser.add_argument("--threads", type=int, default=8, help="Request threads of a started server (per worker)")
+    parser.add_argument("--workers", type=int, default=2, help="Workers of a started gunicorn server")
+    parser.add_argument("--data-dir", type=Path, help="Dataset to serve (HOSPITOOLS_DATA_DIR)")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url = args.url
+    elif args.start:
+        process, url = start_server(args.start, args.threads, args.workers, args.data_dir)
+    else:
+        url = None
+        if args.data_dir is not None:
+            os.environ["HOSPITOOLS_DATA_DIR"] = str(args.data_dir)
+        sys.path.insert(0, str(ROOT))
+        from app import server
+
+    def make_client():
+        return HttpClient(url) if url else server.test_client()
+
+    try:
+        if args.sessions:
+            sessions = load_sessions(args.sessions)
+            if not sessions:
+                parser.error("No session with steps found")
+        else:
+            page = layout_values(make_client().get("/_dash-layout").get_json())
+            rng = random.Random(args.seed)
+            sessions = [generate_session(rng, page, args.steps) for _ in range(args.users)]
+            if args.save_sessions:
+                args.save_sessions.mkdir(parents=True, exist_ok=True)
+                for index, session in enumerate(sessions):
+                    write_session(args.save_sessions / f"generated-{index:03d}.jsonl", session)
+
+        report = run(
+            make_client, sessions, args.users, args.loops, args.duration, args.speed, args.ramp_up, not args.no_verify
+        )
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    total = report["callbacks"]["total"]
+    return 1 if total["errors"] or total["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Memory per worker of the pre-fork server at increasing worker counts.
+
+For every worker count, `gunicorn -c gunicorn.conf.py app:server` is started on the
+given data, each callback is requested a few times per worker so that every worker
+has built its figures, and the memory of the master and of each worker is read from
+/proc/<pid>/smaps_rollup:
+
+- RSS counts every resident page, shared or not, so it overstates the real cost;
+- PSS splits each shared page between the processes mapping it;
+- USS counts the pages private to the process: the cost of one more worker.
+
+With shared data (the gunicorn.conf.py default) USS per worker should stay flat and
+small as workers are added; --no-shared runs the same servers with private arrays.
+Needs Linux and gunicorn.
+
+Usage:
+    python -m benchmarks.prefork_memory --workers 1 2 4 8 --data-dir /tmp/big
+    python -m benchmarks.prefork_memory --workers 1 4 --no-shared
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.dash_client import (
+    HttpClient,
+    call_callback,
+    find_dependency,
+    free_port,
+    load_dependencies,
+    load_layout_ids,
+    wait_ready,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_WORKERS = [1, 2, 4, 8]
+
+# One request per view callback, so that every worker builds its figures
+WARM_UP_REQUESTS = [
+    ('"type":"heatmap"', ["time-range-store.data"]),
+    ("line-chart.figure", ["metric-checklist.value"]),
+    ("violin-chart.figure", ["violin-metric-radio.value"]),
+    ("scatter-plot.figure", ["services-checklist.value"]),
+]
+WARM_UP_VALUES = {
+    "services-checklist.value": ["emergency", "ICU"],
+    "metric-checklist.value": ["Patient Satisfaction"],
+    "time-range-store.data": {"start": 5, "end": 30},
+    "heatmap-attribute-radio.value": "age_bin",
+    "violin-metric-radio.value": "staff_morale",
+}
+
+
+def _memory_kb(pid: int) -> dict:
+    """RSS, PSS and USS of a process in kB, from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0])
+    return {
+        "rss_kb": fields["Rss"],
+        "pss_kb": fields["Pss"],
+        "uss_kb": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def _children(pid: int) -> list[int]:
+    children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    return [int(child) for child in children]
+
+
+def measure(workers: int, shared: bool, data_dir: Path | None, requests_per_worker: int) -> dict:
+    """Start a server with `workers` workers, warm every worker up and read its memory."""
+    port = free_port()
+    env = {
+        **os.environ,
+        "HOSPITOOLS_SHARED_DATA": "1" if shared else "0",
+        "HOSPITOOLS_BIND": f"127.0.0.1:{port}",
+        "WEB_CONCURRENCY": str(workers),
+    }
+    if data_dir is not None:
+        env["HOSPITOOLS_DATA_DIR"] = str(data_dir)
+
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:server"]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        client = HttpClient(f"http://127.0.0.1:{port}")
+        wait_ready(client, process, timeout=600)
+        dependencies = load_dependencies(client)
+        layout_ids = load_layout_ids(client)
+
+        # Every request opens a new connection, so the workers share them out
+        for _ in range(requests_per_worker * workers):
+            for output, changed in WARM_UP_REQUESTS:
+                status, _ = call_callback(
+                    client, find_dependency(dependencies, output), WARM_UP_VALUES, changed, layout_ids
+                )
+                if status != 200:
+                    raise RuntimeError(f"{output} answered {status}")
+
+        worker_memory = [_memory_kb(pid) for pid in _children(process.pid)]
+        return {
+            "workers": workers,
+            "shared": shared,
+            "master": _memory_kb(process.pid),
+            "per_worker": {key: sum(m[key] for m in worker_memory) / len(worker_memory) for key in worker_memory[0]},
+            "total_pss_kb": _memory_kb(process.pid)["pss_kb"] + sum(m["pss_kb"] for m in worker_memory),
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--data-dir", type=Path, help="Dataset to serve (HOSPITOOLS_DATA_DIR)")
+    parser.add_argument("--no-shared", action="store_true", help="Keep the arrays private to each process")
+    parser.add_argument("--requests", type=int, default=3, help="Warm-up rounds per worker")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        result = measure(workers, not args.no_shared, args.data_dir, args.requests)
+        results.append(result)
+        per_worker = result["per_worker"]
+        print(
+            f"{workers:3d} workers: master RSS {result['master']['rss_kb'] / 1024:7.1f} MB | per worker "
+            f"RSS {per_worker['rss_kb'] / 1024:7.1f} MB, PSS {per_worker['pss_kb'] / 1024:7.1f} MB, "
+            f"USS {per_worker['uss_kb'] / 1024:7.1f} MB | total PSS {result['total_pss_kb'] / 1024:7.1f} MB"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
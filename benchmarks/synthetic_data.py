@@ -0,0 +1,261 @@
+"""Schema-faithful synthetic hospital datasets at arbitrary scale.
+
+Writes `df_services_weekly_prepped.csv` and `df_patients_prepped.csv` with the same
+columns and value conventions as the shipped files in `data/`, for any number of
+services, years of weeks and patients. Tables are generated and appended in chunks,
+so memory stays bounded by the chunk size (plus one service x week satisfaction
+matrix, which patients are drawn around). The same seed and chunk size always
+produce the same files.
+
+Usage:
+    python -m benchmarks.synthetic_data /tmp/big --services 12 --years 5 --patients 5000000
+    HOSPITOOLS_DATA_DIR=/tmp/big python app.py
+"""
+
+import argparse
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SERVICES_FILE = "df_services_weekly_prepped.csv"
+PATIENTS_FILE = "df_patients_prepped.csv"
+
+WEEKS_PER_YEAR = 52
+BASE_SERVICES = ["emergency", "surgery", "general_medicine", "ICU"]
+
+# Share of (service, week) cells per event, close to the shipped extract
+EVENTS = ["none", "flu", "donation", "strike"]
+EVENT_PROBABILITIES = [0.79, 0.09, 0.07, 0.05]
+
+SERVICES_COLUMNS = [
+    "week",
+    "service",
+    "available_beds",
+    "patients_request",
+    "patients_admitted",
+    "patients_refused",
+    "staff_morale",
+    "event",
+    "satisfaction_from_patients",
+    "doctors_count",
+    "nurses_count",
+    "satisfaction_bin",
+]
+PATIENTS_COLUMNS = ["name", "age", "service", "satisfaction", "length_of_stay", "week", "satisfaction_bin", "age_bin"]
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Walker"]
+
+
+def service_names(n_services: int) -> list[str]:
+    """The shipped services first, then generic wards."""
+    return (BASE_SERVICES + [f"ward_{i}" for i in range(len(BASE_SERVICES) + 1, n_services + 1)])[:n_services]
+
+
+def _bin_labels(values: np.ndarray, width: int, lowest: int, highest: int) -> np.ndarray:
+    """Labels like "80-85" for values binned by `width`, clipped to [lowest, highest)."""
+    lower = np.clip(values // width * width, lowest, highest - width)
+    return np.char.add(np.char.add(lower.astype(str), "-"), (lower + width).astype(str))
+
+
+def _rng(seed: int, *key: int) -> np.random.Generator:
+    """Independent, reproducible stream per (table, chunk)."""
+    return np.random.default_rng([seed, *key])
+
+
+# ============================================
+# WEEKLY SERVICES
+# ============================================
+
+
+def _service_profiles(services: list[str], seed: int) -> dict[str, np.ndarray]:
+    """Stable per-service levels (beds, demand, staffing, baseline morale/satisfaction)."""
+    rng = _rng(seed, 0)
+    n = len(services)
+    beds = rng.uniform(12, 50, n)
+    return {
+        "beds": beds,
+        "demand": beds * rng.uniform(1.4, 2.6, n),
+        "doctors": rng.uniform(17, 22, n),
+        "nurses": rng.uniform(88, 98, n),
+        "morale": rng.uniform(68, 78, n),
+        "satisfaction": rng.uniform(77, 83, n),
+    }
+
+
+def generate_services_weekly(
+    n_services: int, n_weeks: int, seed: int, weeks_per_chunk: int = WEEKS_PER_YEAR
+) -> Iterator[pd.DataFrame]:
+    """Yield the weekly services table in chunks of `weeks_per_chunk` weeks.
+
+    Metrics are correlated like in the real extract: flu weeks raise demand, so
+    refusals rise; strikes lower staff morale, donations raise it; satisfaction
+    follows morale and falls with the refused/admitted ratio. Admissions are capped
+    by available beds and refusals are the remainder of the requests.
+    """
+    services = service_names(n_services)
+    profile = _service_profiles(services, seed)
+
+    for chunk, first_week in enumerate(range(1, n_weeks + 1, weeks_per_chunk)):
+        rng = _rng(seed, 1, chunk)
+        weeks = np.arange(first_week, min(first_week + weeks_per_chunk, n_weeks + 1))
+        shape = (len(weeks), n_services)
+
+        event = rng.choice(len(EVENTS), size=shape, p=EVENT_PROBABILITIES)
+        is_flu, is_donation, is_strike = (event == EVENTS.index(e) for e in ("flu", "donation", "strike"))
+
+        # Winter demand peak on top of the per-service level
+        season = 1 + 0.2 * np.cos(2 * np.pi * ((weeks - 1) % WEEKS_PER_YEAR) / WEEKS_PER_YEAR)
+        demand = profile["demand"] * season[:, None] * np.where(is_flu, 2.2, 1.0)
+        requests = rng.poisson(demand * rng.lognormal(0, 0.35, shape))
+        beds = np.maximum(1, np.round(profile["beds"] * rng.normal(1, 0.25, shape))).astype(int)
+        admitted = np.minimum(requests, beds)
+        refused = requests - admitted
+
+        morale = profile["morale"] + rng.normal(0, 12, shape) - 20 * is_strike + 7 * is_donation
+        morale = np.clip(np.round(morale), 20, 99).astype(int)
+
+        refusal_ratio = refused / np.maximum(admitted, 1)
+        satisfaction = (
+            profile["satisfaction"]
+            + 0.15 * (morale - 73)
+            - 2.5 * np.minimum(refusal_ratio, 4)
+            + rng.normal(0, 7, shape)
+        )
+        satisfaction = np.clip(np.round(satisfaction), 60, 99).astype(int)
+
+        yield pd.DataFrame(
+            {
+                "week": np.repeat(weeks, n_services),
+                "service": np.tile(services, len(weeks)),
+                "available_beds": beds.ravel(),
+                "patients_request": requests.ravel(),
+                "patients_admitted": admitted.ravel(),
+                "patients_refused": refused.ravel(),
+                "staff_morale": morale.ravel(),
+                "event": np.asarray(EVENTS)[event].ravel(),
+                "satisfaction_from_patients": satisfaction.ravel(),
+                "doctors_count": np.round(profile["doctors"] + rng.normal(0, 1.5, shape)).astype(int).ravel(),
+                "nurses_count": np.round(profile["nurses"] + rng.normal(0, 2.8, shape)).astype(int).ravel(),
+                "satisfaction_bin": _bin_labels(satisfaction, 5, 60, 100).ravel(),
+            },
+            columns=SERVICES_COLUMNS,
+        )
+
+
+# ============================================
+# PATIENTS
+# ============================================
+
+
+def generate_patients(
+    n_patients: int,
+    services: list[str],
+    weekly_satisfaction: np.ndarray,
+    weekly_admissions: np.ndarray,
+    seed: int,
+    chunk_size: int,
+) -> Iterator[pd.DataFrame]:
+    """Yield the patient table in chunks of at most `chunk_size` rows.
+
+    Patients are spread over (service, week) cells in proportion to admissions and
+    their satisfaction scatters around that week's service satisfaction. Older
+    patients stay longer. The bins follow the shipped conventions: age_bin "0-10"
+    to "80-90", satisfaction_bin "60-70" to "90-100", stays of 1 to 14 days.
+
+    Args:
+        n_patients: Total number of patients
+        services: Service names (columns of the weekly matrices)
+        weekly_satisfaction: (weeks, services) satisfaction_from_patients
+        weekly_admissions: (weeks, services) patients_admitted, used as sampling weights
+        seed: Random seed
+        chunk_size: Maximum rows per chunk
+    """
+    weights = weekly_admissions.ravel().astype(float) + 1
+    weights /= weights.sum()
+
+    for chunk, start in enumerate(range(0, n_patients, chunk_size)):
+        rng = _rng(seed, 2, chunk)
+        size = min(chunk_size, n_patients - start)
+
+        cell = rng.choice(weights.size, size=size, p=weights)
+        week_idx, service_idx = np.divmod(cell, len(services))
+
+        age = rng.integers(0, 90, size)
+        satisfaction = np.clip(np.round(rng.normal(weekly_satisfaction.ravel()[cell], 9)), 60, 99).astype(int)
+        length_of_stay = np.clip(np.round(rng.gamma(4, 1.5, size) + age / 30), 1, 14).astype(int)
+        names = np.char.add(
+            np.char.add(np.asarray(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), size)], " "),
+            np.asarray(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), size)],
+        )
+
+        yield pd.DataFrame(
+            {
+                "name": names,
+                "age": age,
+                "service": np.asarray(services)[service_idx],
+                "satisfaction": satisfaction,
+                "length_of_stay": length_of_stay,
+                "week": week_idx + 1,
+                "satisfaction_bin": _bin_labels(satisfaction, 10, 60, 100),
+                "age_bin": _bin_labels(age, 10, 0, 90),
+            },
+            columns=PATIENTS_COLUMNS,
+        )
+
+
+def write_dataset(
+    out_dir: Path,
+    n_services: int = 4,
+    years: int = 1,
+    n_patients: int = 1000,
+    seed: int = 65,
+    chunk_size: int = 250_000,
+) -> dict:
+    """Generate both tables into out_dir, appending chunk by chunk.
+
+    Returns:
+        Row counts of the written tables
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    services = service_names(n_services)
+    n_weeks = years * WEEKS_PER_YEAR
+
+    # Only the two (weeks, services) matrices the patients need are kept in memory
+    weekly_satisfaction = np.empty((n_weeks, n_services))
+    weekly_admissions = np.empty((n_weeks, n_services))
+    services_rows = 0
+    for i, frame in enumerate(generate_services_weekly(n_services, n_weeks, seed)):
+        frame.to_csv(out_dir / SERVICES_FILE, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        week_idx = frame["week"].to_numpy().reshape(-1, n_services)[:, 0] - 1
+        weekly_satisfaction[week_idx] = frame["satisfaction_from_patients"].to_numpy().reshape(-1, n_services)
+        weekly_admissions[week_idx] = frame["patients_admitted"].to_numpy().reshape(-1, n_services)
+        services_rows += len(frame)
+
+    patients_path = out_dir / PATIENTS_FILE
+    pd.DataFrame(columns=PATIENTS_COLUMNS).to_csv(patients_path, index=False)
+    for frame in generate_patients(n_patients, services, weekly_satisfaction, weekly_admissions, seed, chunk_size):
+        frame.to_csv(patients_path, mode="a", header=False, index=False)
+
+    return {"services_rows": services_rows, "patients_rows": n_patients}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--services", type=int, default=4)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=65)
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    args = parser.parse_args()
+
+    rows = write_dataset(args.out_dir, args.services, args.years, args.patients, args.seed, args.chunk_size)
+    print(f"Wrote {rows['services_rows']} weekly rows and {rows['patients_rows']} patients to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
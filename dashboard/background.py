@@ -0,0 +1,246 @@
+import functools
+import os
+import sys
+import tempfile
+import threading
+import uuid
+
+import dash
+from dash import DiskcacheManager, Output
+
+from dashboard import dash_data, metrics
+from dashboard.figure_cache import FIGURE_CACHE, FIGURE_CACHE_BYTES
+
+try:
+    # All three are needed by DiskcacheManager (pip install "dash[diskcache]")
+    import diskcache
+    import multiprocess  # noqa: F401
+    import psutil
+except ImportError:
+    diskcache = None
+
+# ============================================
+# BACKGROUND CALLBACKS
+# ============================================
+# With HOSPITOOLS_BACKGROUND_CALLBACKS=1 (and diskcache installed), the heavy view
+# callbacks (heatmaps, violin, scatter matrix) run as Dash background callbacks: the
+# request thread only starts a job process and returns, and the browser polls for
+# the result every BACKGROUND_POLL_MS. When an input changes while a job is still
+# running, the browser sends the old job along with the new request and Dash kills
+# it, so stale requests stop using CPU. While a job runs, its graph gets the
+# RUNNING_CLASS class (greyed out, assets/styles.css).
+#
+# Job processes are forked from the worker. What a job records in the metrics and in
+# FIGURE_CACHE is captured and stored next to its result as a report; the worker
+# applies the report when it collects the result, so /metrics and the figure cache
+# see background callbacks like the others. Results are also kept by the manager
+# (cache_by) per data version, shared by all workers of the instance: a request
+# whose result is stored is answered without starting a process, and only its
+# response size is recorded.
+#
+# Off by default: every callback runs in the request thread.
+
+# StoredResultManager overrides internals of DiskcacheManager as they are in this
+# Dash release (pinned in requirements-optional.txt, covered by tests/test_background.py).
+# With any other release the callbacks stay in the request thread
+SUPPORTED_DASH = "4.4"
+
+BACKGROUND_REQUESTED = os.environ.get("HOSPITOOLS_BACKGROUND_CALLBACKS", "0") == "1"
+BACKGROUND_CALLBACKS = (
+    BACKGROUND_REQUESTED
+    and diskcache is not None
+    and dash.__version__.split(".")[:2] == SUPPORTED_DASH.split(".")
+)
+
+BACKGROUND_CACHE_DIR = os.environ.get(
+    "HOSPITOOLS_BACKGROUND_CACHE_DIR", os.path.join(tempfile.gettempdir(), "hospitools-background")
+)
+
+# Result polling period of the browser (Dash's default of 1 s would add up to a second per update)
+BACKGROUND_POLL_MS = int(os.environ.get("HOSPITOOLS_BACKGROUND_POLL_MS", "200"))
+
+RUNNING_CLASS = "graph-running"
+
+# Stored results of another run of the app (or of another data directory) sharing the
+# cache directory must never be served: keys include this id, drawn once per instance
+# (in the master under the pre-fork server, so its workers share results)
+_INSTANCE_ID = uuid.uuid4().hex
+
+
+def _data_version() -> tuple[str, int, int]:
+    # Evaluated in the request thread for every call: a new data version gives new keys
+    return _INSTANCE_ID, dash_data.DATA_VERSION, dash_data.DATA_ROWS
+
+
+# Result key of the job run by this process (set in job processes only, see _run_job)
+_job_key = None
+
+
+def _report_key(key: str) -> str:
+    return f"{key}-report"
+
+
+def _run_job(job_fn, result_key: str, progress_key: str, args, context) -> None:
+    # Target of the job process: the report is stored under the key of its result
+    global _job_key
+    _job_key = result_key
+    job_fn(result_key, progress_key, args, context)
+
+
+def _serialized(method):
+    """Run a manager method under the manager's lock (see StoredResultManager)."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class StoredResultManager(DiskcacheManager):
+    """DiskcacheManager that answers from a stored result without starting a job process.
+
+    Written against DiskcacheManager of Dash SUPPORTED_DASH: call_job_fn, make_job_fn,
+    get_result, terminate_job and job_running replace or wrap its own.
+
+    Dash would start the job anyway and kill it on the first poll. Job id 0 stands for
+    "no process": never running, nothing to terminate. Failed jobs are not kept.
+
+    Jobs are forked from a multi-threaded worker. A fork while another thread is inside
+    a SQLite call or transaction of the cache leaves the job process with SQLite lock
+    state nobody will release, and its result write times out after a minute. So the
+    cache operations of the worker and the fork itself take turns on one lock, and old
+    jobs are killed without Dash's transaction and one-second wait.
+
+    Callbacks run in jobs report their metrics samples and figure cache use (see
+    the module comment): the report is written before the result and applied when
+    the result is collected.
+
+    A job that stored its result and exited between Dash's look for the result and its
+    look at the process is still counted as running, so that the next poll returns the
+    result instead of no_update.
+    """
+
+    def __init__(self, cache, cache_by=None, expire=None):
+        super().__init__(cache, cache_by=cache_by, expire=expire)
+        self._lock = threading.RLock()
+        self._job_keys = {}  # pid -> result key, until the job is seen finished
+
+    @_serialized
+    def call_job_fn(self, key, job_fn, args, context):
+        if self.result_ready(key):
+            return 0
+        job = super().call_job_fn(key, functools.partial(_run_job, job_fn), args, context)
+        self._job_keys[job] = key
+        return job
+
+    def make_job_fn(self, fn, progress, key=None):
+        return super().make_job_fn(self._reporting(fn), progress, key)
+
+    def _reporting(self, fn):
+        """Wrap a callback so that its job stores a report of its metrics and cache use."""
+        handle = self.handle
+
+        @functools.wraps(fn)
+        def job(*args, **kwargs):
+            with metrics.capture_samples() as samples, FIGURE_CACHE.capture() as cached:
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    report = {"callback_id": fn.__name__, "samples": samples, "figure_cache": cached}
+                    handle.set(_report_key(_job_key), report)
+
+        return job
+
+    @_serialized
+    def get_result(self, key, job):
+        result = super().get_result(key, job)
+        if result is self.UNDEFINED:
+            return result
+        if isinstance(result, dict) and "background_callback_error" in result:
+            # Errors are reported once and never served from the store: the next call retries
+            self.clear_cache_entry(key)
+        self._apply_report(key)
+        return result
+
+    def _apply_report(self, key: str) -> None:
+        # A report is applied once (pop is atomic across workers). Its callback id is
+        # kept, so that the response size of the stored result is recorded every time
+        report = self.handle.pop(_report_key(key), None)
+        if report is None:
+            return
+        metrics.attribute_response(report["callback_id"])
+        if "samples" in report:
+            metrics.record_samples(report["samples"])
+            FIGURE_CACHE.merge(report["figure_cache"])
+        self.handle.set(_report_key(key), {"callback_id": report["callback_id"]})
+
+    def terminate_job(self, job):
+        if job is None or int(job) == 0:
+            return
+        self._job_keys.pop(int(job), None)
+        try:
+            # Jobs start no processes of their own; the zombie is reaped with the next fork
+            psutil.Process(int(job)).kill()
+        except psutil.NoSuchProcess:
+            pass
+
+    def job_running(self, job):
+        try:
+            if super().job_running(job):
+                return True
+        except psutil.NoSuchProcess:
+            pass  # Exited between the existence check and the status read
+        # Dash reads the result first: a job that stored it and exited in between would
+        # be answered with no_update. Counted as running, its result goes out next poll
+        key = self._job_keys.pop(int(job), None) if job is not None else None
+        return key is not None and self.result_ready(key)
+
+    result_ready = _serialized(DiskcacheManager.result_ready)
+    get_progress = _serialized(DiskcacheManager.get_progress)
+    get_updated_props = _serialized(DiskcacheManager.get_updated_props)
+    clear_cache_entry = _serialized(DiskcacheManager.clear_cache_entry)
+
+    @_serialized
+    def get_or_create_signing_secret(self, generate):
+        # Not in every Dash release: looked up only when Dash calls it
+        return super().get_or_create_signing_secret(generate)
+
+
+def _create_manager() -> StoredResultManager | None:
+    if BACKGROUND_REQUESTED and not BACKGROUND_CALLBACKS:
+        print(
+            f'HOSPITOOLS_BACKGROUND_CALLBACKS=1 needs pip install "dash[diskcache]=={SUPPORTED_DASH}.*" '
+            f"(Dash {dash.__version__} is installed); the callbacks run in the request thread",
+            file=sys.stderr,
+        )
+    if not BACKGROUND_CALLBACKS:
+        return None
+    cache = diskcache.Cache(BACKGROUND_CACHE_DIR, size_limit=FIGURE_CACHE_BYTES)
+    return StoredResultManager(cache, cache_by=[_data_version])
+
+
+BACKGROUND_MANAGER = _create_manager()
+
+
+def background_options(*component_ids: str) -> dict:
+    """Keyword arguments of @callback that run it as a background callback.
+
+    Empty when background callbacks are disabled or diskcache is not installed, so the
+    callback runs in the request thread as before.
+
+    Args:
+        component_ids: Components marked with RUNNING_CLASS while the job runs
+
+    Returns:
+        Keyword arguments for dash.callback
+    """
+    if BACKGROUND_MANAGER is None:
+        return {}
+    return {
+        "background": True,
+        "manager": BACKGROUND_MANAGER,
+        "interval": BACKGROUND_POLL_MS,
+        "running": [(Output(component_id, "className"), RUNNING_CLASS, "") for component_id in component_ids],
+    }
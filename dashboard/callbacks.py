@@ -1,64 +1,59 @@
-from plotly.graph_objects import Figure
-
-from dash import callback, ctx, Output, Input, State
-from dash.exceptions import PreventUpdate
-
-from dashboard.linechart import linechart_fig, update_line_chart
-from dashboard.scatterplot_matrix import scatterplot_fig, update_scatter_plot
-from dashboard.violinchart import violin_fig, update_violin_chart
-from dashboard.heatmap import heatmap_figs, update_heatmap
+import math
+
+import numpy as np
+
+from dash import callback, clientside_callback, ctx, no_update, ClientsideFunction, Output, Input, State, Patch, ALL
+
+from dashboard import dash_data
+from dashboard.background import background_options
+from dashboard.figure_base import clone_figure
+from dashboard.figure_cache import FIGURE_CACHE
+from dashboard.serialization import compact_figure
+from dashboard.metrics import instrument_callback
+from dashboard.linechart import get_linechart_base, patch_line_chart_markers, time_view_is_static, update_line_chart
+from dashboard.scatterplot_matrix import decode_selection, get_scatterplot_base, update_scatter_plot
+from dashboard.violinchart import get_violin_base, update_violin_chart
+from dashboard.heatmap import HEATMAP_GRAPH_TYPE, get_heatmap_bases, update_heatmap
 from dashboard.dash_data import (
-    get_heatmap_data,
-    SERVICES_DATA,
-    SERVICES,
-    SCATTER_DATA,
-    SERVICES_MAPPING,
+    get_heatmap_counts,
+    get_heatmap_labels,
     EVENTS,
 )
 
 
-@callback(
+# Zoom/pan on the line chart -> shared week window. Runs in the browser
+# (assets/time_range.js): debounced, snapped to integer weeks, and the store only
+# changes when the effective window does, so drags don't fan out to the server.
+clientside_callback(
+    ClientsideFunction(namespace="time_range", function_name="relayout_to_week_window"),
     Output("time-range-store", "data"),
     Input("line-chart", "relayoutData"),
+    State("time-range-store", "data"),
+    State("time-range-config", "data"),
     prevent_initial_call=True,
 )
-def update_time_range_store(relayout_data: dict | None) -> dict | None:
-    """Extract and store time range from line chart zoom/pan events.
-
-    Only updates when xaxis.range changes, ignoring spurious layout events
-    like autosize, width, height changes that cause excessive callbacks.
-
-    Args:
-        relayout_data: Layout data from line chart interactions
-
-    Returns:
-        Dictionary with start/end weeks or None for full range
-    """
-    if not relayout_data:
-        return None
-
-    # Check for xaxis range keys - these indicate actual zoom/pan
-    if "xaxis.range" in relayout_data:
-        r = relayout_data["xaxis.range"]
-        return {"start": r[0], "end": r[1]}
-    elif "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
-        return {
-            "start": relayout_data["xaxis.range[0]"],
-            "end": relayout_data["xaxis.range[1]"],
-        }
-
-    # Ignore other layout changes (autosize, width, height, etc.)
-    # by not updating the Store (PreventUpdate prevents downstream callbacks)
-    raise PreventUpdate
 
 
 def normalize_services(selected_services: list[str] | None) -> list[str]:
     """Convert selected_services to actual service list."""
     if not selected_services:
-        return SERVICES  # Return all services
+        return dash_data.snapshot()["SERVICES"]  # Return all services
     return selected_services
 
 
+def canonical_services(selected_services: list[str] | None) -> tuple[str, ...]:
+    """Selected services in the data's SERVICES order, without duplicates (cache keys, stable trace order)."""
+    selected = set(selected_services or ())
+    return tuple(s for s in dash_data.snapshot()["SERVICES"] if s in selected)
+
+
+def snap_week_range(time_range_data: dict | None) -> tuple[int, int] | None:
+    """Integer week range selecting the same weeks as the store's (possibly fractional) range."""
+    if not time_range_data:
+        return None
+    return math.ceil(time_range_data["start"]), math.floor(time_range_data["end"])
+
+
 def _extract_xaxis_range(relayout_data: dict | None) -> list[float] | None:
     """Extract x-axis range from relayout data."""
     if not relayout_data:
@@ -74,35 +69,6 @@ def _extract_xaxis_range(relayout_data: dict | None) -> list[float] | None:
     return None
 
 
-def _get_scatter_week_lookup(
-    services: list[str],
-    time_range: tuple[float, float] | None,
-) -> list[int]:
-    """Build a week lookup array matching the scatter plot's filtered data.
-
-    This replicates the same filtering logic used in create_scatter_plot
-    so that pointIndex from selectedData can be used to look up weeks.
-    """
-    dimensions = [
-        "Satisfaction",
-        "Morale",
-        "Refused/Admitted Ratio",
-        "Staff/Patient Ratio",
-    ]
-    df_plot = SCATTER_DATA[dimensions + ["Category", "Week"]]
-
-    if services:
-        selected_labels = [SERVICES_MAPPING[s] for s in services if s in SERVICES_MAPPING]
-        df_plot = df_plot[df_plot["Category"].isin(selected_labels)]
-
-    if time_range:
-        start_week, end_week = time_range
-        df_plot = df_plot[(df_plot["Week"] >= start_week) & (df_plot["Week"] <= end_week)]
-
-    # Return weeks as a list indexed by row position (matching pointIndex)
-    return df_plot["Week"].tolist()
-
-
 def _get_event_from_violin_click(violin_click_data: dict | None) -> str | None:
     """Extract the selected event from violin chart click data.
 
@@ -134,71 +100,98 @@ def _get_event_from_violin_click(violin_click_data: dict | None) -> str | None:
 
 
 @callback(
-    [
-        Output("heatmap-emergency", "figure"),
-        Output("heatmap-icu", "figure"),
-        Output("heatmap-surgery", "figure"),
-        Output("heatmap-general-medicine", "figure"),
-    ],
+    Output({"type": HEATMAP_GRAPH_TYPE, "service": ALL}, "figure"),
     [
         Input("heatmap-attribute-radio", "value"),
         Input("time-range-store", "data"),
         Input("services-checklist", "value"),
+        Input("data-version-store", "data"),
     ],
     prevent_initial_call=True,
+    **background_options("heatmaps-grid"),
 )
-def update_heatmaps_cb(attribute: str, time_range_data: dict | None, selected_services: list[str] | None):
-    """Update all 4 heatmaps based on attribute selection, time range, and selected services."""
-    # Extract week range from Store data
-    week_range = None
-    if time_range_data:
-        week_range = (time_range_data["start"], time_range_data["end"])
+@instrument_callback
+def update_heatmaps_cb(
+    attribute: str, time_range_data: dict | None, selected_services: list[str] | None, data_rows: int | None
+):
+    """Update the heatmap of every service based on attribute selection, time range, and selected services.
+
+    data_rows (data-version-store) only triggers a redraw after live ingestion; the
+    figure cache is already keyed on the data version.
+    """
+    week_range = snap_week_range(time_range_data)
 
     # Normalize selected services (empty list means all services)
-    services = normalize_services(selected_services)
+    services = list(canonical_services(normalize_services(selected_services)))
+    # One figure per matched graph, in the order Dash lists them
+    heatmap_services = tuple(output["id"]["service"] for output in ctx.outputs_list)
 
-    # Define the services and their display names
-    figures = []
-    for service_id, fig in heatmap_figs.items():
-        z_values, x_labels, y_labels = get_heatmap_data(attribute, service_id, week_range)
-        fig = update_heatmap(fig, z_values, x_labels, y_labels, services, service_id)
-        figures.append(fig)
+    def build():
+        # One prefix-sum lookup returns the count matrices of all services
+        current = dash_data.snapshot()
+        counts = get_heatmap_counts(attribute, week_range, current)
+        x_labels, y_labels = get_heatmap_labels(attribute)
+        bases = get_heatmap_bases()
 
-    return figures
+        figures = []
+        for service_id in heatmap_services:
+            z_values = counts[current["SERVICE_INDEX"][service_id]].tolist()
+            fig = update_heatmap(clone_figure(bases[service_id]), z_values, x_labels, y_labels, services, service_id)
+            figures.append(fig)
+        return figures
+
+    return FIGURE_CACHE.get_or_build(("heatmaps", attribute, week_range, tuple(services), heatmap_services), build)
 
 
 @callback(
-    Output("line-chart", "figure"),
+    [
+        Output("line-chart", "figure"),
+        Output("selected-weeks-store", "data"),
+    ],
     [
         Input("metric-checklist", "value"),
         Input("services-checklist", "value"),
         Input("scatter-plot", "selectedData"),
         Input("violin-chart", "clickData"),
+        Input("time-range-store", "data"),
+        Input("data-version-store", "data"),
     ],
     [
         State("line-chart", "relayoutData"),
-        State("line-chart", "figure"),
+        State("selected-weeks-store", "data"),
     ],
 )
+@instrument_callback
 def update_line_chart_cb(
     selected_metrics: list[str],
     selected_services: list[str] | None,
     scatter_selected_data: dict | None,
     violin_click_data: dict | None,
+    time_range_data: dict | None,
+    data_rows: int | None,
     relayout_data: dict | None,
-    current_fig: dict | None,
-) -> Figure:
+    selected_weeks: list[int] | None,
+) -> tuple[dict | Patch, list[int]]:
     """Update line chart based on metric selection and scatter plot selection.
 
     Preserves legend visibility via uirevision and vertical lines when non-scatter inputs trigger.
+    A scatter selection does not change any trace, so it is answered with a dash.Patch
+    that only replaces the week markers (shapes, annotations) and the x-axis range.
+    The marked weeks are kept in selected-weeks-store, so the current figure never
+    has to be sent back to the server to recover them.
 
     Args:
         selected_metrics: List of selected metrics from checklist
         selected_services: List of selected services from checklist
         scatter_selected_data: Selected data from scatter plot matrix (contains week information)
         violin_click_data: Click data from violin chart (contains event information)
+        time_range_data: Week window of the zoom/pan; re-picks the time level of the traces
+        data_rows: Row count of the data shown (changes after live ingestion; redraws the traces)
         relayout_data: Current layout state to preserve zoom/pan
-        current_fig: Current figure state to preserve vertical lines (shapes)
+        selected_weeks: Weeks currently marked with vertical lines (None before any selection)
+
+    Returns:
+        Compacted figure (or Patch) for the line chart, and the marked weeks for selected-weeks-store
     """
     services = normalize_services(selected_services)
 
@@ -220,54 +213,46 @@ def update_line_chart_cb(
     # Determine which input triggered the callback
     triggered_id = ctx.triggered_id
 
-    # Extract selected weeks from scatter plot selection using pointIndex
-    # Note: px.scatter_matrix (splom) doesn't support customdata in selectedData,
-    # so we use pointIndex to look up weeks from the filtered data
-    selected_weeks = None
-    existing_shapes = None
-
     # Check if scatter plot has a non-empty selection
     has_scatter_selection = (
         scatter_selected_data and "points" in scatter_selected_data and len(scatter_selected_data["points"]) > 0
     )
 
-    if triggered_id == "scatter-plot" and has_scatter_selection:
-        # Scatter plot triggered with actual selection - calculate new vertical lines
-        week_lookup = _get_scatter_week_lookup(services, time_range)
-
-        weeks = []
-        for point in scatter_selected_data["points"]:
-            if "pointIndex" in point:
-                idx = point["pointIndex"]
-                if idx < len(week_lookup):
-                    weeks.append(int(week_lookup[idx]))
-
-        if weeks:
-            selected_weeks = sorted(set(weeks))
-        else:
-            # Points exist but couldn't map to valid weeks - preserve existing shapes
-            if current_fig and "layout" in current_fig:
-                existing_shapes = current_fig["layout"].get("shapes", [])
-    else:
-        # Non-scatter trigger or empty/cleared selection - preserve existing vertical lines
-        if current_fig and "layout" in current_fig:
-            existing_shapes = current_fig["layout"].get("shapes", [])
+    if triggered_id == "scatter-plot":
+        # A scatter selection never changes the traces: only patch the week markers.
+        # Note: splom doesn't support customdata in selectedData, so the weeks are
+        # looked up from (curveNumber, pointIndex) in the splom's selection index
+        if has_scatter_selection:
+            _, selected_weeks = decode_selection(scatter_selected_data["points"], time_range)
+
+            if selected_weeks.size:
+                weeks = np.unique(selected_weeks).tolist()
+                return patch_line_chart_markers(weeks, xaxis_range), weeks
+
+        # Empty/cleared selection, or points that couldn't map to valid weeks - keep the current markers
+        return no_update, no_update
+
+    # A zoom/pan only matters when the time level or window of the traces can change
+    if triggered_id == "time-range-store" and time_view_is_static():
+        return no_update, no_update
 
     # Extract selected event from violin chart click
     selected_event = None
     if triggered_id == "violin-chart":
         selected_event = _get_event_from_violin_click(violin_click_data)
 
-    # Use the pre-initialized figure and update it using batch_update
-    return update_line_chart(
-        linechart_fig,
+    # Build on a private clone of the base figure so concurrent requests never share state;
+    # the vertical lines of the marked weeks are redrawn from the store
+    fig = update_line_chart(
+        clone_figure(get_linechart_base()),
         selected_metrics,
         services,
         xaxis_range,
         selected_weeks,
-        existing_shapes,
+        None,
         selected_event,
     )
+    return compact_figure(fig), no_update
 
 
 @callback(
@@ -276,13 +261,17 @@ def update_line_chart_cb(
         Input("violin-metric-radio", "value"),
         Input("time-range-store", "data"),
         Input("services-checklist", "value"),
+        Input("data-version-store", "data"),
     ],
     prevent_initial_call=True,
+    **background_options("violin-chart"),
 )
+@instrument_callback
 def update_violin_chart_cb(
     selected_metric: str,
     time_range_data: dict | None,
     selected_services: list[str] | None,
+    data_rows: int | None,
 ):
     """Update violin chart based on metric, time range, and service selection.
 
@@ -290,18 +279,18 @@ def update_violin_chart_cb(
         selected_metric: Selected metric (satisfaction, morale, ratio)
         time_range_data: Time range from line chart zoom/pan
         selected_services: Selected services from global filter
+        data_rows: Row count of the data shown (changes after live ingestion)
     """
 
-    # 1. Filter by Time Range (if available)
-    data = SERVICES_DATA.copy()
-
-    if time_range_data:
-        start = time_range_data["start"]
-        end = time_range_data["end"]
-        data = data[(data["week"] >= start) & (data["week"] <= end)]
+    # Densities are computed on the weeks of the time range (snapped to whole weeks)
+    week_range = snap_week_range(time_range_data)
+    services = list(canonical_services(selected_services))
 
-    # Use the pre-initialized figure and update it using batch_update
-    return update_violin_chart(violin_fig, selected_metric, selected_services)
+    # Build on a private clone of the base figure so concurrent requests never share state
+    return FIGURE_CACHE.get_or_build(
+        ("violin", selected_metric, tuple(services), week_range),
+        lambda: update_violin_chart(clone_figure(get_violin_base()), selected_metric, services, week_range),
+    )
 
 
 @callback(
@@ -310,12 +299,16 @@ def update_violin_chart_cb(
         Input("services-checklist", "value"),
         Input("time-range-store", "data"),
         Input("violin-chart", "clickData"),
+        Input("data-version-store", "data"),
     ],
+    **background_options("scatter-plot"),
 )
+@instrument_callback
 def update_scatter_plot_cb(
     selected_services: list[str] | None,
     time_range_data: dict | None,
     violin_click_data: dict | None,
+    data_rows: int | None,
 ):
     """Update scatter plot based on service selection, time range, and violin click.
 
@@ -323,22 +316,60 @@ def update_scatter_plot_cb(
         selected_services: Selected services from global filter
         time_range_data: Time range from line chart zoom/pan
         violin_click_data: Click data from violin chart
+        data_rows: Row count of the data shown (changes after live ingestion)
     """
 
     # 1. Handle Time Range
-    time_range = None
-    if time_range_data:
-        time_range = (time_range_data["start"], time_range_data["end"])
+    time_range = snap_week_range(time_range_data)
 
     # Normalize Services
-    services_list = normalize_services(selected_services)
+    services_list = list(canonical_services(normalize_services(selected_services)))
 
     # Handle Event Selection via Click
     selected_event = None
     if ctx.triggered_id == "violin-chart":
         selected_event = _get_event_from_violin_click(violin_click_data)
 
-    return update_scatter_plot(scatterplot_fig, services_list, time_range, selected_event)
+    # Build on a private clone of the base figure so concurrent requests never share state
+    return FIGURE_CACHE.get_or_build(
+        ("scatter", tuple(services_list), time_range, selected_event),
+        lambda: update_scatter_plot(clone_figure(get_scatterplot_base()), services_list, time_range, selected_event),
+    )
+
+
+# Live ingestion: a cheap periodic check of the server's row count. Only when it
+# differs from the one the page was drawn from does the store change, which redraws
+# the views through their data-version-store input
+@callback(
+    [
+        Output("data-version-store", "data"),
+        Output("time-range-config", "data"),
+    ],
+    Input("data-version-interval", "n_intervals"),
+    [
+        State("data-version-store", "data"),
+        State("time-range-config", "data"),
+    ],
+    prevent_initial_call=True,
+)
+@instrument_callback
+def check_data_version(n_intervals: int, data_rows: int | None, time_range_config: dict):
+    """Store the server's row count when new rows were ingested since the last check.
+
+    Args:
+        n_intervals: Tick count of data-version-interval
+        data_rows: Row count the page currently shows
+        time_range_config: Settings of the clientside time range callback
+
+    Returns:
+        The new row count and time_range_config with the new week bounds, or no_update twice
+    """
+    data = dash_data.snapshot()
+    rows = data["DATA_ROWS"]
+    if rows == data_rows:
+        return no_update, no_update
+    weeks = data["WEEKS"]
+    return rows, {**time_range_config, "min_week": weeks[0], "max_week": weeks[-1]}
 
 
 # =========================================================
@@ -350,6 +381,7 @@ def update_scatter_plot_cb(
     State("sidebar-overlay", "style"),
     prevent_initial_call=True,
 )
+@instrument_callback
 def toggle_sidebar(open_clicks, close_clicks, current_style):
     """
     Toggle the sidebar visibility by changing the 'left' CSS property.
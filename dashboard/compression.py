@@ -0,0 +1,94 @@
+import gzip
+import os
+
+import flask
+
+from dashboard.metrics import observe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ============================================
+# RESPONSE COMPRESSION
+# ============================================
+# Figure JSON is very repetitive (template, colours, hover strings) and compresses
+# 5-10x. Responses of at least COMPRESS_MIN_BYTES are compressed with brotli when the
+# package is installed and the client accepts it, with gzip otherwise. For callback
+# responses the size on the wire is recorded per callback next to the raw size
+# (hospitools_callback_compressed_bytes vs hospitools_callback_response_bytes on
+# /metrics). Set HOSPITOOLS_COMPRESSION=0 when a reverse proxy already compresses.
+
+COMPRESSION = os.environ.get("HOSPITOOLS_COMPRESSION", "1") == "1"
+
+# Smaller bodies fit in one packet either way; compressing them only costs CPU
+COMPRESS_MIN_BYTES = int(os.environ.get("HOSPITOOLS_COMPRESS_MIN_BYTES", "1024"))
+
+GZIP_LEVEL = 6
+# Lowest brotli quality that beats gzip -6 on every figure, at about the same speed
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = frozenset(
+    {
+        "application/json",
+        "application/javascript",
+        "text/javascript",
+        "text/html",
+        "text/css",
+        "text/plain",
+        "image/svg+xml",
+    }
+)
+
+
+def _choose_encoding(request: flask.Request) -> str | None:
+    """Best encoding accepted by the client: br if available, then gzip."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with "br" or "gzip"."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_response(response: flask.Response) -> flask.Response:
+    """Flask after_request hook: compress eligible responses in place."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    encoding = _choose_encoding(flask.request)
+    if encoding is not None and len(body) >= COMPRESS_MIN_BYTES:
+        body = compress_body(body, encoding)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+
+    callback_id = flask.g.get("callback_id")
+    if callback_id is not None and flask.request.path.endswith("_dash-update-component"):
+        observe("compressed_bytes", callback_id, len(body))
+    return response
+
+
+def register_compression(server: flask.Flask) -> None:
+    """Compress the responses of the Flask server (no-op with HOSPITOOLS_COMPRESSION=0).
+
+    Register it before register_metrics: Flask runs after_request hooks in reverse
+    order, so the metrics hook still sees the raw body.
+    """
+    if COMPRESSION:
+        server.after_request(_compress_response)
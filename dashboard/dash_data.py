@@ -1,14 +1,47 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from dashboard.ingest import PATIENTS_TABLE, SERVICES_TABLE, TableFeed, TableRewritten, concat_rows, read_table
+from dashboard.live import LIVE_INGEST
+from dashboard.shared_data import SHARED_DATA, share_array, share_value
+
 # ============================================
 # IMPORT HOSPITAL DATA
 # ============================================
 
-SERVICES_DATA = pd.read_csv(Path(__file__).parent.parent / "data" / "df_services_weekly_prepped.csv")
-PATIENTS_DATA = pd.read_csv(Path(__file__).parent.parent / "data" / "df_patients_prepped.csv")
+# Directory with the prepped CSVs (or their columnar copies, see dashboard.ingest);
+# HOSPITOOLS_DATA_DIR points the dashboard at another extract
+DATA_DIR = Path(os.environ.get("HOSPITOOLS_DATA_DIR", Path(__file__).parent.parent / "data"))
+
+# Columns read from each table; everything else (patient names, ...) is never loaded
+SERVICES_LOAD_COLUMNS = [
+    "week",
+    "service",
+    "event",
+    "available_beds",
+    "patients_request",
+    "patients_admitted",
+    "patients_refused",
+    "staff_morale",
+    "satisfaction_from_patients",
+    "doctors_count",
+    "nurses_count",
+]
+PATIENTS_LOAD_COLUMNS = ["service", "week", "satisfaction_bin", "age_bin", "length_of_stay"]
+
+# The CSVs and everything derived from them are loaded by load_data(), on first
+# access of one of the data names below (module __getattr__) or from a warm-up hook.
+# Importing this module only defines constants and functions. They are kept in one
+# snapshot dict that is replaced as a whole when new data comes in (see DEFERRED
+# LOADING); code reading several of them together should take snapshot() once.
 
 # ============================================
 # SAMPLE DATA GENERATION
@@ -16,11 +49,12 @@ PATIENTS_DATA = pd.read_csv(Path(__file__).parent.parent / "data" / "df_patients
 
 np.random.seed(42)
 
-# Generate date range for 52 weeks
+# Dates start here; WEEKS/DATES cover every week in the services data (52 for the shipped extract)
 START_DATE = datetime(2025, 1, 1)
-DATES = [START_DATE + timedelta(weeks=i) for i in range(52)]
-WEEKS = list(range(1, 53))
 
+# Display names of the known services, in the order they are shown. The services
+# themselves come from the data (SERVICES): these first, then any other in the order
+# it first appears
 SERVICES_MAPPING = {
     "emergency": "Emergency",
     "ICU": "ICU",
@@ -28,118 +62,195 @@ SERVICES_MAPPING = {
     "general_medicine": "General Medicine",
 }
 
-# Stream Graph Data (multiple categories over time)
-SERVICES = list(SERVICES_MAPPING.keys())
-STREAM_DATA = pd.DataFrame(
-    {
-        "Week": WEEKS * len(SERVICES),
-        "Date": DATES * len(SERVICES),
-        "Category": np.repeat(SERVICES, 52),
-        "Patient Satisfaction": np.concatenate(
-            [
-                SERVICES_DATA[SERVICES_DATA["service"] == "emergency"][
-                    "satisfaction_from_patients"
-                ].tolist(),  # Emergency - upward trend
-                SERVICES_DATA[SERVICES_DATA["service"] == "ICU"][
-                    "satisfaction_from_patients"
-                ].tolist(),  # ICU - moderate growth
-                SERVICES_DATA[SERVICES_DATA["service"] == "surgery"][
-                    "satisfaction_from_patients"
-                ].tolist(),  # Surgery - volatile
-                SERVICES_DATA[SERVICES_DATA["service"] == "general_medicine"][
-                    "satisfaction_from_patients"
-                ].tolist(),  # General Medicine - slight decline
-            ]
-        ),
-        "Staff Morale": np.concatenate(
-            [
-                SERVICES_DATA[SERVICES_DATA["service"] == "emergency"][
-                    "staff_morale"
-                ].tolist(),  # Emergency - upward trend
-                SERVICES_DATA[SERVICES_DATA["service"] == "ICU"]["staff_morale"].tolist(),  # ICU - moderate growth
-                SERVICES_DATA[SERVICES_DATA["service"] == "surgery"]["staff_morale"].tolist(),  # Surgery - volatile
-                SERVICES_DATA[SERVICES_DATA["service"] == "general_medicine"][
-                    "staff_morale"
-                ].tolist(),  # General Medicine - slight decline
-            ]
-        ),
-        "Available Beds": np.concatenate(
-            [
-                SERVICES_DATA[SERVICES_DATA["service"] == "emergency"]["available_beds"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "ICU"]["available_beds"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "surgery"]["available_beds"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "general_medicine"]["available_beds"].tolist(),
-            ]
-        ),
-        "Patient Requests": np.concatenate(
-            [
-                SERVICES_DATA[SERVICES_DATA["service"] == "emergency"]["patients_request"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "ICU"]["patients_request"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "surgery"]["patients_request"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "general_medicine"]["patients_request"].tolist(),
-            ]
-        ),
-        "Patient Admissions": np.concatenate(
-            [
-                SERVICES_DATA[SERVICES_DATA["service"] == "emergency"]["patients_admitted"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "ICU"]["patients_admitted"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "surgery"]["patients_admitted"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "general_medicine"]["patients_admitted"].tolist(),
-            ]
-        ),
-        "Patient Refusals": np.concatenate(
-            [
-                SERVICES_DATA[SERVICES_DATA["service"] == "emergency"]["patients_refused"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "ICU"]["patients_refused"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "surgery"]["patients_refused"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "general_medicine"]["patients_refused"].tolist(),
-            ]
-        ),
-        "event": np.concatenate(
-            [
-                SERVICES_DATA[SERVICES_DATA["service"] == "emergency"]["event"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "ICU"]["event"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "surgery"]["event"].tolist(),
-                SERVICES_DATA[SERVICES_DATA["service"] == "general_medicine"]["event"].tolist(),
-            ]
-        ),
-    }
-)
 
-# Scatter Plot Data
+def service_label(service: str) -> str:
+    """Display name of a service ("ward_5" -> "Ward 5" when it has none in SERVICES_MAPPING)."""
+    return SERVICES_MAPPING.get(service, service.replace("_", " ").title())
 
-SCATTER_DATA = SERVICES_DATA.copy()
 
-SCATTER_DATA["Category"] = SCATTER_DATA["service"].map(SERVICES_MAPPING)
+def _data_services(services_data: pd.DataFrame, patients_data: pd.DataFrame) -> list[str]:
+    """Services of both tables: the known ones in SERVICES_MAPPING order, then the others."""
+    present = pd.unique(pd.concat([services_data["service"], patients_data["service"]], ignore_index=True))
+    present = [str(service) for service in present if not pd.isna(service)]
+    return [service for service in SERVICES_MAPPING if service in present] + [
+        service for service in present if service not in SERVICES_MAPPING
+    ]
 
-SCATTER_DATA["Refused/Admitted Ratio"] = SCATTER_DATA["patients_refused"] / SCATTER_DATA["patients_admitted"].replace(
-    0, 1
-)
 
-total_staff = SCATTER_DATA["doctors_count"] + SCATTER_DATA["nurses_count"]
-SCATTER_DATA["Staff/Patient Ratio"] = total_staff / SCATTER_DATA["patients_admitted"].replace(0, 1)
+# Events in the order used on the violin chart x-axis (EVENT_MAP below)
+EVENT_CATEGORIES = ["donation", "flu", "strike", "none"]
+# Event label per event code; code -1 (missing week) wraps around to "unknown"
+EVENT_LABELS = np.array(EVENT_CATEGORIES + ["unknown"])
 
-SCATTER_DATA.rename(
-    columns={
-        "satisfaction_from_patients": "Satisfaction",
-        "staff_morale": "Morale",
-        "week": "Week",
-    },
-    inplace=True,
-)
+# ============================================
+# SERVICE x WEEK x METRIC CUBE
+# ============================================
 
-# Select only the columns needed for the Scatter Plot Matrix
-SCATTER_DATA = SCATTER_DATA[
-    [
-        "Week",
-        "Category",
-        "Satisfaction",
-        "Morale",
-        "Refused/Admitted Ratio",
-        "Staff/Patient Ratio",
-        "event",
-    ]
+# Metric axis of the cube. The order matters: SCATTER_DATA is a contiguous column
+# slice of the cube so that it can be a zero-copy view.
+CUBE_METRICS = [
+    "available_beds",
+    "patients_request",
+    "patients_admitted",
+    "patients_refused",
+    "staff_morale",
+    "satisfaction_from_patients",
+    "ratio",
+    "staff_ratio",
+    "doctors_count",
+    "nurses_count",
 ]
+METRIC_INDEX = {metric: i for i, metric in enumerate(CUBE_METRICS)}
+
+STREAM_COLUMNS = {
+    "available_beds": "Available Beds",
+    "patients_request": "Patient Requests",
+    "patients_admitted": "Patient Admissions",
+    "patients_refused": "Patient Refusals",
+    "staff_morale": "Staff Morale",
+    "satisfaction_from_patients": "Patient Satisfaction",
+}
+SCATTER_COLUMNS = {
+    "staff_morale": "Morale",
+    "satisfaction_from_patients": "Satisfaction",
+    "ratio": "Refused/Admitted Ratio",
+    "staff_ratio": "Staff/Patient Ratio",
+}
+
+
+def _build_services_cube(
+    services_data: pd.DataFrame, weeks: list[int], services: list[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Scatter the weekly services table into a dense (service, week, metric) cube in one pass.
+
+    Rows for services outside services are ignored. Missing (service, week) cells stay NaN
+    in the cube and get event code -1.
+
+    Args:
+        services_data: Weekly services table as read from the CSV
+        weeks: Contiguous week numbers of the cube's week axis
+        services: Services of the cube's service axis
+
+    Returns:
+        tuple: (cube of shape (services, weeks, metrics), event codes of shape (services, weeks))
+    """
+    service_idx = pd.Categorical(services_data["service"], categories=services).codes
+    week_idx = services_data["week"].to_numpy() - weeks[0]
+    event_idx = pd.Categorical(services_data["event"], categories=EVENT_CATEGORIES).codes
+    valid = service_idx >= 0
+    service_idx, week_idx = service_idx[valid], week_idx[valid]
+
+    cube = np.full((len(services), len(weeks), len(CUBE_METRICS)), np.nan)
+    raw_metrics = [m for m in CUBE_METRICS if m in services_data.columns]
+    raw_idx = [METRIC_INDEX[m] for m in raw_metrics]
+    cube[service_idx[:, None], week_idx[:, None], raw_idx] = services_data.loc[valid, raw_metrics].to_numpy(dtype=float)
+
+    # Derived ratios are computed in place on the cube
+    admitted = cube[..., METRIC_INDEX["patients_admitted"]]
+    admitted = np.where(admitted == 0, 1, admitted)
+    cube[..., METRIC_INDEX["ratio"]] = cube[..., METRIC_INDEX["patients_refused"]] / admitted
+    total_staff = cube[..., METRIC_INDEX["doctors_count"]] + cube[..., METRIC_INDEX["nurses_count"]]
+    cube[..., METRIC_INDEX["staff_ratio"]] = total_staff / admitted
+
+    event_codes = np.full((len(services), len(weeks)), -1, dtype=np.int8)
+    event_codes[service_idx, week_idx] = event_idx[valid]
+
+    return cube, event_codes
+
+
+def _cube_frame(cube: np.ndarray, columns: dict[str, str]) -> pd.DataFrame:
+    """Wrap a contiguous metric slice of the cube as a DataFrame without copying.
+
+    Args:
+        cube: Cube returned by _build_services_cube
+        columns: Mapping from cube metric to column name, in cube order
+
+    Returns:
+        DataFrame with one row per (service, week), service-major
+    """
+    metrics = list(columns)
+    first = METRIC_INDEX[metrics[0]]
+    assert metrics == CUBE_METRICS[first : first + len(metrics)], "cube columns must be contiguous"
+
+    values = cube.reshape(-1, len(CUBE_METRICS))[:, first : first + len(metrics)]
+    return pd.DataFrame(values, columns=list(columns.values()), copy=False)
+
+
+STREAM_METRICS = {column: metric for metric, column in STREAM_COLUMNS.items()}
+
+
+# ============================================
+# TIME PYRAMID
+# ============================================
+
+# Aggregation levels of the line/stream chart, finest first
+TIME_LEVELS = ["week", "month", "quarter", "year"]
+
+
+def _time_buckets(dates: list[datetime], level: str) -> np.ndarray:
+    """Bucket number of every week at an aggregation level (non-decreasing, starting at 0)."""
+    years = np.array([d.year for d in dates])
+    months = np.array([d.month for d in dates])
+    keys = {
+        "week": np.arange(len(dates)),
+        "month": years * 12 + months - 1,
+        "quarter": years * 4 + (months - 1) // 3,
+        "year": years,
+    }[level]
+    return np.unique(keys, return_inverse=True)[1]
+
+
+def _build_time_pyramid(
+    cube: np.ndarray, event_codes: np.ndarray, weeks: list[int], dates: list[datetime]
+) -> dict[str, dict]:
+    """Pre-aggregate the cube per month, quarter and year of the week dates.
+
+    Each level holds the NaN-aware mean of every metric per (service, bucket), the
+    bucket's mean week (x position on the week axis), its first and last week, and
+    the bucket's event: the most frequent event other than "none", if any.
+
+    Args:
+        cube: Cube returned by _build_services_cube
+        event_codes: Event codes returned by _build_services_cube
+        weeks: Week numbers of the cube's week axis
+        dates: Start date of every week
+
+    Returns:
+        Mapping from level to {"x", "first_week", "last_week", "cube", "event_codes"}
+    """
+    weeks = np.asarray(weeks)
+    none_code = EVENT_CATEGORIES.index("none")
+    event_onehot = (event_codes[..., None] == np.arange(len(EVENT_CATEGORIES))).astype(np.int32)
+
+    pyramid = {}
+    for level in TIME_LEVELS:
+        bucket = _time_buckets(dates, level)
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        sizes = np.diff(np.r_[starts, len(weeks)])
+
+        present = ~np.isnan(cube)
+        sums = np.add.reduceat(np.where(present, cube, 0.0), starts, axis=1)
+        counts = np.add.reduceat(present, starts, axis=1)
+        with np.errstate(invalid="ignore"):
+            means = sums / counts
+
+        event_counts = np.add.reduceat(event_onehot, starts, axis=1)
+        other_counts = event_counts.copy()
+        other_counts[..., none_code] = 0
+        codes = np.where(
+            other_counts.sum(axis=-1) > 0,
+            other_counts.argmax(axis=-1),
+            np.where(event_counts[..., none_code] > 0, none_code, -1),
+        ).astype(np.int8)
+
+        pyramid[level] = {
+            "x": weeks if level == "week" else np.add.reduceat(weeks, starts) / sizes,
+            "first_week": weeks[starts],
+            "last_week": weeks[starts + sizes - 1],
+            "cube": means,
+            "event_codes": codes,
+        }
+    return pyramid
 
 
 # Heatmap Data - Real Patient Data
@@ -159,6 +270,85 @@ AGE_BINS = [
 LENGTH_OF_STAY_BINS = list(range(1, 15))  # 1 to 14 days
 
 
+# Row bins per heatmap attribute; length of stay gets a zero-row for 0 days (not in LENGTH_OF_STAY_BINS)
+HEATMAP_ROW_BINS = {
+    "age_bin": AGE_BINS,
+    "length_of_stay": [0] + LENGTH_OF_STAY_BINS,
+}
+
+
+def _build_heatmap_prefix_counts(
+    patients: pd.DataFrame, row_attribute: str, weeks: list[int], services: list[str]
+) -> np.ndarray:
+    """Count patients per (service, week, row bin, satisfaction bin), cumulative over weeks.
+
+    The week axis has a leading zero slab, so the counts for weeks [a, b] are
+    ``prefix[:, b - first + 1] - prefix[:, a - first]``. Patients whose service or
+    bins are not on the heatmap axes are left out, like the crosstab reindex did.
+
+    Args:
+        patients: Patient table with service, week, satisfaction_bin and row_attribute columns
+        row_attribute: "age_bin" or "length_of_stay"
+        weeks: Contiguous week numbers of the week axis
+        services: Services of the service axis
+
+    Returns:
+        Array of shape (services, weeks + 1, row bins, satisfaction bins)
+    """
+    row_bins = HEATMAP_ROW_BINS[row_attribute]
+    shape = (len(services), len(weeks), len(row_bins), len(SATISFACTION_BINS))
+
+    service_idx = pd.Categorical(patients["service"], categories=services).codes
+    week_idx = patients["week"].to_numpy() - weeks[0]
+    row_idx = pd.Categorical(patients[row_attribute], categories=row_bins).codes
+    col_idx = pd.Categorical(patients["satisfaction_bin"], categories=SATISFACTION_BINS).codes
+    valid = (service_idx >= 0) & (row_idx >= 0) & (col_idx >= 0)
+
+    flat_idx = np.ravel_multi_index(
+        (service_idx[valid], week_idx[valid], row_idx[valid], col_idx[valid]),
+        shape,
+    )
+    counts = np.bincount(flat_idx, minlength=np.prod(shape)).reshape(shape)
+
+    prefix = np.zeros((shape[0], shape[1] + 1, shape[2], shape[3]), dtype=np.int32)
+    np.cumsum(counts, axis=1, out=prefix[:, 1:])
+    return prefix
+
+
+def _heatmap_week_bounds(heatmap_weeks: list[int], week_range) -> tuple[int, int]:
+    """Map a (possibly fractional) week range to [lo, hi) positions on the prefix week axis."""
+    if week_range is None:
+        return 0, len(heatmap_weeks)
+
+    min_week, max_week = week_range
+    first = heatmap_weeks[0]
+    lo = min(max(int(np.ceil(min_week)) - first, 0), len(heatmap_weeks))
+    hi = min(max(int(np.floor(max_week)) - first + 1, 0), len(heatmap_weeks))
+    return lo, max(lo, hi)
+
+
+def get_heatmap_labels(row_attribute="age_bin"):
+    """Return the (x_labels, y_labels) of the heatmaps for a row attribute."""
+    return SATISFACTION_BINS, [str(b) for b in HEATMAP_ROW_BINS[row_attribute]]
+
+
+def get_heatmap_counts(row_attribute="age_bin", week_range=None, data: dict | None = None) -> np.ndarray:
+    """Patient count matrices of every service for a week range, in O(bins).
+
+    Args:
+        row_attribute: "age_bin" or "length_of_stay" - what to show on Y-axis
+        week_range: Optional tuple (min_week, max_week) to filter by weeks
+        data: Data snapshot to count from (the current one when None)
+
+    Returns:
+        Array of shape (services, row bins, satisfaction bins), ordered like the snapshot's SERVICES
+    """
+    data = data if data is not None else snapshot()
+    lo, hi = _heatmap_week_bounds(data["HEATMAP_WEEKS"], week_range)
+    prefix = data["HEATMAP_PREFIX_COUNTS"][row_attribute]
+    return prefix[:, hi] - prefix[:, lo]
+
+
 def get_heatmap_data(row_attribute="age_bin", service_filter=None, week_range=None):
     """
     Create a crosstab (patient count matrix) for heatmap visualization.
@@ -171,48 +361,406 @@ def get_heatmap_data(row_attribute="age_bin", service_filter=None, week_range=No
     Returns:
         tuple: (z_values, x_labels, y_labels)
     """
-    df_show = PATIENTS_DATA
-
-    # Apply week range filter if specified
-    if week_range is not None:
-        min_week, max_week = week_range
-        df_show = df_show[(df_show["week"] >= min_week) & (df_show["week"] <= max_week)]
+    data = snapshot()
+    counts = get_heatmap_counts(row_attribute, week_range, data)
 
     # Apply service filter if specified
-    if service_filter is not None:
-        if isinstance(service_filter, str):
-            df_show = df_show[df_show["service"] == service_filter]
-        elif isinstance(service_filter, list) and len(service_filter) > 0:
-            df_show = df_show[df_show["service"].isin(service_filter)]
-
-    # Create crosstab (count of patients in each cell)
-    if row_attribute == "age_bin":
-        crosstab = pd.crosstab(df_show["age_bin"], df_show["satisfaction_bin"])
-        # Ensure all bins are present and in correct order
-        crosstab = crosstab.reindex(index=AGE_BINS, columns=SATISFACTION_BINS, fill_value=0)
-        y_labels = AGE_BINS
-    else:  # length_of_stay
-        crosstab = pd.crosstab(df_show["length_of_stay"], df_show["satisfaction_bin"])
-        # Insert a zero-row for a length of stay of 0 (not in LENGTH_OF_STAY_BINS)
-        full_index = [0] + LENGTH_OF_STAY_BINS
-        crosstab = crosstab.reindex(index=full_index, columns=SATISFACTION_BINS, fill_value=0)
-        y_labels = [str(d) for d in full_index]
-
-    z_values = crosstab.values.tolist()
-    x_labels = SATISFACTION_BINS
+    if isinstance(service_filter, str):
+        service_filter = [service_filter]
+    if service_filter:
+        service_index = data["SERVICE_INDEX"]
+        counts = counts[[service_index[s] for s in service_filter if s in service_index]]
 
-    return z_values, x_labels, y_labels
+    z_values = counts.sum(axis=0).tolist()
+    x_labels, y_labels = get_heatmap_labels(row_attribute)
 
+    return z_values, x_labels, y_labels
 
-# Violin Chart Data
 
-VIOLIN_DATA = SERVICES_DATA.copy()
+# Violin Chart Labels
 
 EVENTS = ["Donation", "Flu", "Strike", "None"]
-EVENT_MAP = {"donation": 0, "flu": 1, "strike": 2, "none": 3}
+EVENT_MAP = {event: i for i, event in enumerate(EVENT_CATEGORIES)}
 METRIC_DISPLAY_NAME = {
     "satisfaction_from_patients": "Patient Satisfaction",
     "staff_morale": "Staff Morale",
     "ratio": "Refused/Admitted Ratio",
 }
-VIOLIN_DATA["ratio"] = VIOLIN_DATA["patients_refused"] / VIOLIN_DATA["patients_admitted"].replace(0, 1)
+
+
+# ============================================
+# DEFERRED LOADING
+# ============================================
+
+# Module attributes that only exist once load_data() has run
+LAZY_DATA_NAMES = frozenset(
+    {
+        "SERVICES_DATA",
+        "PATIENTS_DATA",
+        "SERVICES",
+        "SERVICE_INDEX",
+        "WEEKS",
+        "DATES",
+        "SERVICES_CUBE",
+        "EVENT_CODES",
+        "SCATTER_DATA",
+        "HEATMAP_WEEKS",
+        "HEATMAP_PREFIX_COUNTS",
+        "TIME_PYRAMID",
+        "DATA_ROWS",
+    }
+)
+
+# Data moved to shared memory in pre-fork mode (dashboard.shared_data). The cube and
+# event codes are shared as soon as they are built; the scatter frame over them follows
+SHARED_DATA_NAMES = ["SERVICES_DATA", "PATIENTS_DATA", "HEATMAP_PREFIX_COUNTS", "TIME_PYRAMID"]
+
+# Held by whoever builds or replaces the snapshot; readers never take it
+_load_lock = threading.Lock()
+
+
+def _new_load_lock() -> None:
+    global _load_lock
+    _load_lock = threading.Lock()
+
+
+# Background callback jobs are forked from a multi-threaded worker (possibly in the
+# middle of a load or ingestion): the job process must not inherit a held lock
+os.register_at_fork(after_in_child=_new_load_lock)
+
+# The loaded data, name -> value (None until load_data has run). It is never changed
+# in place: new data builds a new dict, which replaces this one in a single assignment
+_snapshot = None
+
+# Incremental readers of the data files in live mode (see _read_tables)
+_feeds = None
+
+# Seconds spent in load_data (None until it has run), and in the last live update
+LOAD_SECONDS = None
+INGEST_SECONDS = None
+
+# Incremented whenever the data is (re)loaded; caches of derived results compare against it
+DATA_VERSION = 0
+
+
+def _read_tables() -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Read both datasets, through TableFeeds in live mode so later polls only read new rows."""
+    global _feeds
+    if not LIVE_INGEST:
+        return (
+            read_table(DATA_DIR, SERVICES_TABLE, SERVICES_LOAD_COLUMNS),
+            read_table(DATA_DIR, PATIENTS_TABLE, PATIENTS_LOAD_COLUMNS),
+        )
+    _feeds = {
+        SERVICES_TABLE: TableFeed(DATA_DIR, SERVICES_TABLE, SERVICES_LOAD_COLUMNS),
+        PATIENTS_TABLE: TableFeed(DATA_DIR, PATIENTS_TABLE, PATIENTS_LOAD_COLUMNS),
+    }
+    return _feeds[SERVICES_TABLE].read_new(), _feeds[PATIENTS_TABLE].read_new()
+
+
+def _week_dates(weeks: list[int]) -> list[datetime]:
+    return [START_DATE + timedelta(weeks=week - weeks[0]) for week in weeks]
+
+
+def _cube_data(
+    cube: np.ndarray, event_codes: np.ndarray, services: list[str], weeks: list[int], dates: list[datetime]
+) -> dict:
+    """The cube, its week axis and the scatter frame built on it (a view, no copy).
+
+    The line and violin charts read the cube (and the time pyramid) directly.
+    """
+    # Per-row labels (service-major, week-minor)
+    row_weeks = np.tile(np.asarray(weeks, dtype=np.int64), len(services))
+    row_services = pd.Categorical.from_codes(np.repeat(np.arange(len(services)), len(weeks)), categories=services)
+    row_events = pd.Categorical.from_codes(event_codes.reshape(-1), categories=EVENT_CATEGORIES)
+
+    # Scatter Plot Data (only the columns needed for the Scatter Plot Matrix)
+    scatter_data = _cube_frame(cube, SCATTER_COLUMNS)
+    scatter_data.insert(0, "Week", row_weeks)
+    scatter_data.insert(1, "Category", row_services.rename_categories(service_label))
+    scatter_data["event"] = row_events
+
+    return {
+        "SERVICES": services,
+        "SERVICE_INDEX": {service: i for i, service in enumerate(services)},
+        "WEEKS": weeks,
+        "DATES": dates,
+        "SERVICES_CUBE": cube,
+        "EVENT_CODES": event_codes,
+        "SCATTER_DATA": scatter_data,
+    }
+
+
+def _build_data() -> dict:
+    """Read both datasets and build every structure derived from them.
+
+    Returns:
+        Mapping from module attribute name to value
+    """
+    services_data, patients_data = _read_tables()
+
+    services = _data_services(services_data, patients_data)
+    weeks = list(range(int(services_data["week"].min()), int(services_data["week"].max()) + 1))
+    dates = _week_dates(weeks)
+    cube, event_codes = _build_services_cube(services_data, weeks, services)
+    if SHARED_DATA:
+        # Shared before the frames below are built on it, so that they are views of it
+        cube, event_codes = share_array(cube), share_array(event_codes)
+
+    # Heatmap Data - Real Patient Data
+    heatmap_weeks = list(range(int(patients_data["week"].min()), int(patients_data["week"].max()) + 1))
+    heatmap_prefix_counts = {
+        attribute: _build_heatmap_prefix_counts(patients_data, attribute, heatmap_weeks, services)
+        for attribute in HEATMAP_ROW_BINS
+    }
+
+    data = {
+        "SERVICES_DATA": services_data,
+        "PATIENTS_DATA": patients_data,
+        **_cube_data(cube, event_codes, services, weeks, dates),
+        "HEATMAP_WEEKS": heatmap_weeks,
+        "HEATMAP_PREFIX_COUNTS": heatmap_prefix_counts,
+        "TIME_PYRAMID": _build_time_pyramid(cube, event_codes, weeks, dates),
+        "DATA_ROWS": len(services_data) + len(patients_data),
+    }
+    if SHARED_DATA:
+        for name in SHARED_DATA_NAMES:
+            data[name] = share_value(data[name])
+    return data
+
+
+def load_data() -> None:
+    """Load the datasets into the module namespace, once (safe to call from any thread)."""
+    global _snapshot, LOAD_SECONDS, DATA_VERSION
+    if _snapshot is not None:
+        return
+    with _load_lock:
+        if _snapshot is not None:
+            return
+        start = time.perf_counter()
+        data = _build_data()
+        data["DATA_VERSION"] = DATA_VERSION + 1
+        LOAD_SECONDS = time.perf_counter() - start
+        _snapshot = data
+        DATA_VERSION = data["DATA_VERSION"]
+
+
+def snapshot() -> dict:
+    """The current data (loaded on first use), name -> value; never modified in place.
+
+    A caller that reads several names takes the snapshot once, so that all of them
+    come from the same version of the data even if new data is swapped in meanwhile.
+    Its "DATA_VERSION" is the version of that data (the module's DATA_VERSION may
+    already be newer).
+    """
+    load_data()
+    return _snapshot
+
+
+class VersionCache:
+    """Cache of build(current, *args) keyed on the version of the snapshot current.
+
+    The caller passes the snapshot it works on, so that a result is always keyed on
+    the version of the data it was built from. Reading dash_data.DATA_VERSION and the
+    data separately could pair one version with the data of the next. The maxsize
+    least recently used results are kept.
+    """
+
+    def __init__(self, build, maxsize: int):
+        functools.update_wrapper(self, build)
+        self._build = build
+        self.maxsize = maxsize
+        self._results = OrderedDict()  # (data version, *args) -> result
+        self._lock = threading.Lock()
+        # Background callback jobs are forked from a multi-threaded worker
+        os.register_at_fork(after_in_child=self._new_lock)
+
+    def _new_lock(self) -> None:
+        self._lock = threading.Lock()
+
+    def __call__(self, current: dict, *args):
+        key = (current["DATA_VERSION"], *args)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        # Built outside the lock: a concurrent miss may build it too
+        result = self._build(current, *args)
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+
+def cache_per_version(maxsize: int = 1):
+    """Decorator: cache a function of a snapshot (and hashable args) in a VersionCache."""
+    return lambda build: VersionCache(build, maxsize)
+
+
+def __getattr__(name: str):
+    # Only called for names missing from the module: the data names live in the snapshot
+    if name in LAZY_DATA_NAMES:
+        return snapshot()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ============================================
+# LIVE INGESTION
+# ============================================
+# In live mode (dashboard.live) a poller calls ingest_new_rows(), which reads only the
+# rows appended since the previous poll and folds them into a new snapshot:
+# - weekly service rows are scattered into a copy of the cube, grown along the week
+#   axis when they bring new weeks (a row for an existing service-week replaces it);
+#   the scatter frame over the cube is rebuilt as a view, and the time pyramid only
+#   re-aggregates from the start of the calendar year of the earliest new row;
+# - patient rows are counted on their own and added to the heatmap prefix counts;
+# - rows of a service the data did not have yet change the service axis of every
+#   array, so everything is loaded again, as after a rewritten file.
+# Arrays of the current snapshot are never written (they may be read-only shared
+# memory, and requests may be reading them): every update works on copies, which
+# stay private to the process. Once built, the new snapshot replaces the old one in
+# one assignment and DATA_VERSION is bumped, which drops the caches of derived results.
+
+
+def _grow_weeks(array: np.ndarray, axis: int, offset: int, length: int, fill) -> np.ndarray:
+    """Copy of array on a longer week axis: the old values at offset, fill elsewhere."""
+    shape = list(array.shape)
+    shape[axis] = length
+    grown = np.full(shape, fill, dtype=array.dtype)
+    index = [slice(None)] * array.ndim
+    index[axis] = slice(offset, offset + array.shape[axis])
+    grown[tuple(index)] = array
+    return grown
+
+
+def _merge_week_axis(old_weeks: list[int], rows: pd.DataFrame) -> tuple[list[int], int]:
+    """Week axis covering old_weeks and the rows' weeks, and where old_weeks start on it."""
+    first = min(old_weeks[0], int(rows["week"].min()))
+    last = max(old_weeks[-1], int(rows["week"].max()))
+    return list(range(first, last + 1)), old_weeks[0] - first
+
+
+def _update_time_pyramid(
+    pyramid: dict, cube: np.ndarray, event_codes: np.ndarray, weeks: list[int], dates: list[datetime], since_week: int
+) -> dict:
+    """Time pyramid with the buckets from the calendar year of since_week on rebuilt.
+
+    A year boundary is also a month and quarter boundary, so every bucket before it
+    is unchanged and kept; the buckets after it are aggregated again from the cube.
+    """
+    years = _time_buckets(dates, "year")
+    start = int(np.searchsorted(years, years[since_week - weeks[0]]))
+    tail = _build_time_pyramid(cube[:, start:], event_codes[:, start:], weeks[start:], dates[start:])
+
+    updated = {}
+    for level, buckets in pyramid.items():
+        keep = int(np.searchsorted(buckets["first_week"], weeks[start]))
+        updated[level] = {}
+        for key, values in buckets.items():
+            # Bucket axis: 0 for the per-bucket vectors, 1 for the (service, bucket, ...) arrays
+            axis = 0 if values.ndim == 1 else 1
+            kept = values[:keep] if axis == 0 else values[:, :keep]
+            updated[level][key] = np.concatenate([kept, tail[level][key]], axis=axis)
+    return updated
+
+
+def _apply_services_rows(data: dict, rows: pd.DataFrame) -> dict:
+    """Snapshot entries updated with new weekly service rows."""
+    weeks, offset = _merge_week_axis(data["WEEKS"], rows)
+    cube = _grow_weeks(data["SERVICES_CUBE"], 1, offset, len(weeks), np.nan)
+    event_codes = _grow_weeks(data["EVENT_CODES"], 1, offset, len(weeks), -1)
+
+    # Cube of the new rows alone over their week span, written over the copy
+    row_weeks = list(range(int(rows["week"].min()), int(rows["week"].max()) + 1))
+    row_cube, row_codes = _build_services_cube(rows, row_weeks, data["SERVICES"])
+    present = ~np.isnan(row_cube).all(axis=-1)
+    span = slice(row_weeks[0] - weeks[0], row_weeks[-1] - weeks[0] + 1)
+    cube[:, span][present] = row_cube[present]
+    event_codes[:, span][present] = row_codes[present]
+
+    dates = _week_dates(weeks)
+    if offset:
+        # Earlier weeks shift every date: aggregate the whole history again
+        pyramid = _build_time_pyramid(cube, event_codes, weeks, dates)
+    else:
+        pyramid = _update_time_pyramid(data["TIME_PYRAMID"], cube, event_codes, weeks, dates, row_weeks[0])
+
+    return {
+        "SERVICES_DATA": concat_rows([data["SERVICES_DATA"], rows]),
+        **_cube_data(cube, event_codes, data["SERVICES"], weeks, dates),
+        "TIME_PYRAMID": pyramid,
+    }
+
+
+def _apply_patient_rows(data: dict, rows: pd.DataFrame) -> dict:
+    """Snapshot entries updated with new patient rows."""
+    old_weeks = data["HEATMAP_WEEKS"]
+    weeks, offset = _merge_week_axis(old_weeks, rows)
+
+    prefix_counts = {}
+    for attribute, prefix in data["HEATMAP_PREFIX_COUNTS"].items():
+        # Before the old weeks the cumulative counts are 0, after them they stay at the total
+        grown = _grow_weeks(prefix, 1, offset, len(weeks) + 1, 0)
+        grown[:, offset + prefix.shape[1] :] = prefix[:, -1:]
+        prefix_counts[attribute] = grown + _build_heatmap_prefix_counts(rows, attribute, weeks, data["SERVICES"])
+
+    return {
+        "PATIENTS_DATA": concat_rows([data["PATIENTS_DATA"], rows]),
+        "HEATMAP_WEEKS": weeks,
+        "HEATMAP_PREFIX_COUNTS": prefix_counts,
+    }
+
+
+def _has_new_services(data: dict, *rows: pd.DataFrame | None) -> bool:
+    """True if any of the new rows belongs to a service outside the snapshot's SERVICES."""
+    known = data["SERVICES"]
+    return any(not frame["service"].dropna().isin(known).all() for frame in rows if frame is not None)
+
+
+def ingest_new_rows() -> int:
+    """Fold the rows appended to the data files since the last call into a new snapshot.
+
+    Only meaningful in live mode (HOSPITOOLS_LIVE_INGEST=1), where the data was read
+    through TableFeeds. If a file was rewritten instead of appended, or new rows bring
+    a new service, everything is loaded again.
+
+    Returns:
+        Number of rows ingested: the new ones, or all of them when everything was
+        loaded again (0 when nothing changed and the snapshot was kept)
+    """
+    global _snapshot, INGEST_SECONDS, DATA_VERSION
+    load_data()
+    if _feeds is None:
+        return 0
+    with _load_lock:
+        start = time.perf_counter()
+        data = _snapshot
+        try:
+            services_rows = _feeds[SERVICES_TABLE].read_new()
+            patient_rows = _feeds[PATIENTS_TABLE].read_new()
+        except TableRewritten:
+            updated = _build_data()
+            ingested = updated["DATA_ROWS"]
+        else:
+            if services_rows is None and patient_rows is None:
+                return 0
+            if _has_new_services(data, services_rows, patient_rows):
+                updated = _build_data()
+                ingested = updated["DATA_ROWS"]
+            else:
+                updated = dict(data)
+                ingested = 0
+                if services_rows is not None:
+                    updated.update(_apply_services_rows(data, services_rows))
+                    ingested += len(services_rows)
+                if patient_rows is not None:
+                    updated.update(_apply_patient_rows(data, patient_rows))
+                    ingested += len(patient_rows)
+                updated["DATA_ROWS"] = len(updated["SERVICES_DATA"]) + len(updated["PATIENTS_DATA"])
+
+        updated["DATA_VERSION"] = DATA_VERSION + 1
+        INGEST_SECONDS = time.perf_counter() - start
+        _snapshot = updated
+        DATA_VERSION = updated["DATA_VERSION"]
+        return ingested
@@ -0,0 +1,101 @@
+import json
+import os
+
+import plotly
+from plotly import graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+# ============================================
+# IMMUTABLE BASE FIGURES
+# ============================================
+# The module-level figures (linechart_fig, scatterplot_fig, ...) are only used as the
+# initial figures of the layout. Callbacks must never mutate them: under a threaded
+# server two requests would write into the same object. Instead, every chart freezes
+# its default figure once at import and each callback builds on a fresh clone.
+#
+# Validating a clone costs more than the rest of a callback (the template alone takes
+# ~15 ms), and plotly has no public way to skip it: clones of data that was already
+# validated are built with its private _validate flag as it is in these plotly
+# releases (bounded in requirements.txt, covered by tests/test_figure_base.py).
+# With any other release they go through the public, validating constructors.
+SUPPORTED_PLOTLY = ("6", "7")
+SKIP_REVALIDATION = plotly.__version__.split(".")[0] in SUPPORTED_PLOTLY
+
+
+def freeze_figure(fig: go.Figure, with_data: bool = True) -> str:
+    """Snapshot a figure as a JSON string that can be shared read-only between threads.
+
+    Args:
+        fig: Figure to freeze
+        with_data: Keep the traces (needed when the update path restyles existing traces)
+
+    Returns:
+        JSON string of the figure
+    """
+    frozen = {"layout": fig.layout.to_plotly_json()}
+    if with_data:
+        frozen["data"] = [trace.to_plotly_json() for trace in fig.data]
+    return json.dumps(frozen, cls=PlotlyJSONEncoder)
+
+
+def clone_figure(frozen: str) -> go.Figure:
+    """Create a private, mutable figure from a frozen base figure.
+
+    The base was validated when it was built, so validation is skipped while the
+    clone is constructed (roughly ten times cheaper than go.Figure(fig)) and
+    switched back on afterwards, so later updates are still validated and
+    magic-underscore paths like xaxis_title keep being normalized.
+
+    Args:
+        frozen: JSON string returned by freeze_figure
+
+    Returns:
+        New Plotly figure owned by the caller
+    """
+    if not SKIP_REVALIDATION:
+        return go.Figure(json.loads(frozen))
+    fig = go.Figure(json.loads(frozen), _validate=False)
+    fig._validate = True
+    fig.layout._validate = True
+    for trace in fig.data:
+        trace._validate = True
+    return fig
+
+
+def trusted_trace(trace_type: type, props: dict):
+    """Create a trace from properties known to be valid, skipping validation as clone_figure does.
+
+    Args:
+        trace_type: Plotly trace class, e.g. go.Splom
+        props: Valid trace properties (e.g. cached ones the chart module builds itself)
+
+    Returns:
+        New trace owned by the caller, validating later updates
+    """
+    if not SKIP_REVALIDATION:
+        return trace_type(props)
+    trace = trace_type(props, _validate=False)
+    trace._validate = True
+    return trace
+
+
+# ============================================
+# WEBGL MODE
+# ============================================
+# SVG traces get slow in the browser with many points. Above this number of points
+# in a chart, the scatter matrix switches to lighter GL splom settings.
+# HOSPITOOLS_WEBGL_POINTS=0 always uses WebGL.
+#
+# The line chart has a threshold of its own: it is decimated to at most
+# LINE_MAX_POINTS points per trace (dashboard.linechart), which makes
+# (4 services + average) * 2 metrics * 400 = 4000 points at most, so the shared
+# threshold would never be reached. Above LINE_WEBGL_POINT_THRESHOLD points its
+# lines and markers are drawn with Scattergl.
+
+WEBGL_POINT_THRESHOLD = int(os.environ.get("HOSPITOOLS_WEBGL_POINTS", "5000"))
+LINE_WEBGL_POINT_THRESHOLD = int(os.environ.get("HOSPITOOLS_LINE_WEBGL_POINTS", "1500"))
+
+
+def use_webgl(n_points: int, threshold: int = WEBGL_POINT_THRESHOLD) -> bool:
+    """Whether a chart with n_points points should render with WebGL."""
+    return n_points > threshold
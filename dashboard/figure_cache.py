@@ -0,0 +1,164 @@
+import contextlib
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from dashboard import dash_data
+from dashboard.metrics import add_collector
+from dashboard.serialization import compact_result, dumps, loads
+
+# ============================================
+# FIGURE CACHE
+# ============================================
+# Most callback requests repeat a filter state some user already asked for. Callbacks
+# key their result on the canonical filter state (services in SERVICES order, integer
+# week range, metric, event) and the cache keeps the serialized result, compacted by
+# dashboard.serialization: a JSON string is immutable, so it can be shared between
+# threads, and its length is the memory it costs. Every hit is answered with a freshly
+# parsed copy. Entries are evicted least recently used first once the byte budget is
+# exceeded, and the whole cache is dropped when dash_data.DATA_VERSION changes (data
+# reloaded).
+#
+# A background callback job (dashboard.background) works on the cache of the worker
+# it was forked from: what it looks up and builds there is captured and merged into
+# the worker's cache when the worker collects the job's result.
+
+# Budget for the serialized figures held in memory
+FIGURE_CACHE_BYTES = int(float(os.environ.get("HOSPITOOLS_FIGURE_CACHE_MB", "64")) * 2**20)
+
+
+class FigureCache:
+    """Thread-safe LRU cache of serialized callback results with a byte budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> JSON string
+        self._lock = threading.Lock()
+        # Background callback jobs are forked from a multi-threaded worker: a lock held
+        # by another thread at that moment would never be released in the job process
+        os.register_at_fork(after_in_child=self._new_lock)
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._captured = None  # lookups of the running background job (see capture)
+
+    def _new_lock(self) -> None:
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], object]):
+        """Return the result cached for key, building and caching it on a miss.
+
+        Args:
+            key: Canonical filter state
+            build: Zero-argument function computing the result (a figure, or a list of them)
+
+        Returns:
+            The result as plain JSON data (dicts/lists), private to the caller
+        """
+        dash_data.load_data()
+        with self._lock:
+            self._check_version()
+            frozen = self._entries.get(key)
+            if frozen is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                version = self._version
+            if self._captured is not None:
+                self._captured["hits" if frozen is not None else "misses"] += 1
+
+        if frozen is None:
+            # Built outside the lock: concurrent misses on different keys don't wait
+            frozen = dumps(compact_result(build()))
+            with self._lock:
+                if version == self._version:
+                    self._store(key, frozen)
+                    if self._captured is not None:
+                        self._captured["entries"].append((key, frozen))
+        return loads(frozen)
+
+    @contextlib.contextmanager
+    def capture(self):
+        """Collect the hits, misses and new entries of the enclosed block (for merge).
+
+        Yields:
+            Dict with the data version, the hit and miss counts and the (key, JSON) entries
+        """
+        self._captured = captured = {"version": dash_data.DATA_VERSION, "hits": 0, "misses": 0, "entries": []}
+        try:
+            yield captured
+        finally:
+            self._captured = None
+
+    def merge(self, captured: dict) -> None:
+        """Add what capture collected in another process to the counters and entries."""
+        with self._lock:
+            self._check_version()
+            self.hits += captured["hits"]
+            self.misses += captured["misses"]
+            if captured["version"] == self._version:
+                for key, frozen in captured["entries"]:
+                    self._store(key, frozen)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _check_version(self) -> None:
+        # Caller holds the lock
+        if self._version != dash_data.DATA_VERSION:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = dash_data.DATA_VERSION
+
+    def _store(self, key: Hashable, frozen: str) -> None:
+        # Caller holds the lock. Results larger than the whole budget are not kept
+        if len(frozen) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = frozen
+        self._bytes += len(frozen)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+
+FIGURE_CACHE = FigureCache(FIGURE_CACHE_BYTES)
+
+
+def _render_cache_metrics() -> list[str]:
+    stats = FIGURE_CACHE.stats()
+    lines = []
+    for name, kind, help_text, value in (
+        ("hits_total", "counter", "Callback results served from the figure cache", stats["hits"]),
+        ("misses_total", "counter", "Callback results built because they were not cached", stats["misses"]),
+        ("evictions_total", "counter", "Entries evicted to stay within the byte budget", stats["evictions"]),
+        ("entries", "gauge", "Entries in the figure cache", stats["entries"]),
+        ("bytes", "gauge", "Serialized bytes held by the figure cache", stats["bytes"]),
+        ("max_bytes", "gauge", "Byte budget of the figure cache", stats["max_bytes"]),
+    ):
+        metric = f"hospitools_figure_cache_{name}"
+        lines += [f"# HELP {metric} {help_text}.", f"# TYPE {metric} {kind}", f"{metric} {value}"]
+    return lines
+
+
+add_collector(_render_cache_metrics)
@@ -1,12 +1,64 @@
+import functools
+
+import numpy as np
 from plotly import graph_objects as go
+from plotly.colors import hex_to_rgb
 
-from dashboard.dash_data import get_heatmap_data, SERVICES
+from dashboard import dash_data
+from dashboard.dash_data import get_heatmap_counts, get_heatmap_labels, service_label
+from dashboard.figure_base import freeze_figure
 from dashboard.style import HEATMAP_COLORSCALE, PLOTLY_TEMPLATE, MAIN_COLORS
 
 # Get border color from MAIN_COLORS
 MAIN_COLORS.setdefault("border", "#d0dce8")
 
 
+# ============================================
+# COUNT LABELS
+# ============================================
+# Every cell shows its patient count, in white on the darker half of the colour scale
+# and in the text colour elsewhere. Plotly heatmaps take one text colour per trace, so
+# the dark-cell labels live on a second, fully transparent heatmap over the first one.
+# Both label matrices come from one NumPy comparison, whatever the number of bins.
+
+LABEL_FONT = dict(size=10, weight=500)
+LIGHT_LABEL_COLOR = "#ffffff"
+TRANSPARENT_COLORSCALE = [[0, "rgba(0, 0, 0, 0)"], [1, "rgba(0, 0, 0, 0)"]]
+
+
+def _label_color(hex_color: str, opacity: float) -> str:
+    """Hex colour, faded to rgba like the heatmap when its service is not selected."""
+    if opacity >= 1.0:
+        return hex_color
+    r, g, b = hex_to_rgb(hex_color)
+    return f"rgba({r}, {g}, {b}, {opacity})"
+
+
+def _count_labels(z_values) -> tuple[list, list]:
+    """Label matrices for the light cells and the dark cells ("" where the other one applies)."""
+    z = np.asarray(z_values)
+    max_val = z.max() if z.size else 0
+    # A cell is dark above half the largest count
+    on_dark = z > max_val / 2 if max_val > 0 else np.zeros(z.shape, dtype=bool)
+    labels = z.astype(str)
+    return np.where(on_dark, "", labels).tolist(), np.where(on_dark, labels, "").tolist()
+
+
+def _set_count_labels(fig, z_values, opacity: float) -> None:
+    """Write the count labels of both heatmap layers."""
+    light_cells, dark_cells = _count_labels(z_values)
+    fig.data[0].update(
+        text=light_cells,
+        texttemplate="%{text}",
+        textfont=dict(color=_label_color(MAIN_COLORS["text"], opacity), **LABEL_FONT),
+    )
+    fig.data[1].update(
+        text=dark_cells,
+        texttemplate="%{text}",
+        textfont=dict(color=_label_color(LIGHT_LABEL_COLOR, opacity), **LABEL_FONT),
+    )
+
+
 def create_heatmap(z_values, x_labels, y_labels, title, selected_services: list[str], current_service: str):
     """Create a single heatmap
 
@@ -18,9 +70,6 @@ def create_heatmap(z_values, x_labels, y_labels, title, selected_services: list[
         selected_services: List of currently selected services
         current_service: The service ID for this specific heatmap
     """
-    # Find max value for determining text color threshold
-    max_val = max(max(row) for row in z_values) if z_values and z_values[0] else 1
-
     # Calculate opacity based on service selection
     # If no services selected (empty list) or current service is selected, show at full opacity
     # Otherwise, fade out
@@ -44,38 +93,18 @@ def create_heatmap(z_values, x_labels, y_labels, title, selected_services: list[
         )
     )
 
-    # Add patient count as text annotations with dynamic color based on cell darkness
-    # Apply same opacity to annotations as the heatmap itself
-    annotations = []
-    for i, row in enumerate(z_values):
-        for j, val in enumerate(row):
-            if i < len(y_labels) and j < len(x_labels):
-                # Use white text on dark cells (high values), dark text on light cells
-                cell_darkness = val / max_val if max_val > 0 else 0
-                base_text_color = "#ffffff" if cell_darkness > 0.5 else MAIN_COLORS["text"]
-
-                # Apply opacity to text color by converting to rgba
-                if opacity < 1.0:
-                    # Convert hex to rgba with opacity
-                    if base_text_color == "#ffffff":
-                        text_color = f"rgba(255, 255, 255, {opacity})"
-                    else:
-                        # Parse hex color and apply opacity
-                        hex_color = base_text_color.lstrip("#")
-                        r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-                        text_color = f"rgba({r}, {g}, {b}, {opacity})"
-                else:
-                    text_color = base_text_color
-
-                annotations.append(
-                    dict(
-                        x=x_labels[j],
-                        y=y_labels[i],
-                        text=str(val),
-                        showarrow=False,
-                        font=dict(color=text_color, size=10, weight=500),
-                    )
-                )
+    # Cell counts are drawn by the heatmap itself; a transparent copy carries the white labels
+    fig.add_trace(
+        go.Heatmap(
+            z=z_values,
+            x=x_labels,
+            y=y_labels,
+            colorscale=TRANSPARENT_COLORSCALE,
+            showscale=False,
+            hoverinfo="skip",
+        )
+    )
+    _set_count_labels(fig, z_values, opacity)
 
     fig.update_layout(
         template=PLOTLY_TEMPLATE,
@@ -97,7 +126,6 @@ def create_heatmap(z_values, x_labels, y_labels, title, selected_services: list[
             linecolor=MAIN_COLORS["border"],
             linewidth=1,
         ),
-        annotations=annotations,
     )
 
     return fig
@@ -118,55 +146,50 @@ def update_heatmap(fig, z_values, x_labels, y_labels, selected_services: list[st
     # Calculate opacity based on service selection
     opacity = 1.0 if not selected_services or current_service in selected_services else 0.3
 
-    # 1. Update the data trace (z-values, x_labels, y_labels, and opacity)
-    fig.update_traces(z=z_values, x=x_labels, y=y_labels, opacity=opacity, selector=dict(type="heatmap"))
-
-    # 2. Recalculate annotations efficiently
-    max_val = max(max(row) for row in z_values) if z_values and z_values[0] else 1
-    new_annotations = []
-
-    for i, row in enumerate(z_values):
-        for j, val in enumerate(row):
-            if i < len(y_labels) and j < len(x_labels):
-                cell_darkness = val / max_val if max_val > 0 else 0
-                base_text_color = "#ffffff" if cell_darkness > 0.5 else MAIN_COLORS["text"]
-
-                # Apply opacity to text color
-                if opacity < 1.0:
-                    if base_text_color == "#ffffff":
-                        text_color = f"rgba(255, 255, 255, {opacity})"
-                    else:
-                        hex_color = base_text_color.lstrip("#")
-                        r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-                        text_color = f"rgba({r}, {g}, {b}, {opacity})"
-                else:
-                    text_color = base_text_color
-
-                new_annotations.append(
-                    dict(
-                        x=x_labels[j],
-                        y=y_labels[i],
-                        text=str(val),
-                        showarrow=False,
-                        font=dict(color=text_color, size=10, weight=500),
-                    )
-                )
-    # 3. Use batch_update to push layout changes in one go
+    # 1. Update both heatmap layers (z-values, labels, and opacity)
     with fig.batch_update():
-        fig.layout.annotations = new_annotations
+        fig.update_traces(z=z_values, x=x_labels, y=y_labels, selector=dict(type="heatmap"))
+        fig.data[0].opacity = opacity
+
+        # 2. Recompute the count labels and their colours in one pass
+        _set_count_labels(fig, z_values, opacity)
 
     return fig
 
 
-heatmap_fig_1 = create_heatmap(*get_heatmap_data("age_bin", "emergency"), "Emergency", SERVICES, "emergency")
-heatmap_fig_2 = create_heatmap(*get_heatmap_data("age_bin", "ICU"), "ICU", SERVICES, "ICU")
-heatmap_fig_3 = create_heatmap(*get_heatmap_data("age_bin", "surgery"), "Surgery", SERVICES, "surgery")
-heatmap_fig_4 = create_heatmap(
-    *get_heatmap_data("age_bin", "general_medicine"), "General Medicine", SERVICES, "general_medicine"
-)
-heatmap_figs = {
-    "emergency": heatmap_fig_1,
-    "ICU": heatmap_fig_2,
-    "surgery": heatmap_fig_3,
-    "general_medicine": heatmap_fig_4,
-}
+# Heatmap graphs use pattern-matching ids, one per service of the data, so that a single
+# callback output ({"type": HEATMAP_GRAPH_TYPE, "service": ALL}) updates all of them
+HEATMAP_GRAPH_TYPE = "heatmap"
+
+
+def heatmap_graph_id(service_id: str) -> dict:
+    """Component id of the heatmap graph of a service."""
+    return {"type": HEATMAP_GRAPH_TYPE, "service": service_id}
+
+
+@functools.cache
+def get_heatmap_figs() -> dict[str, go.Figure]:
+    """Pre-initialized figure per service with default values (built on first use)."""
+    current = dash_data.snapshot()
+    counts = get_heatmap_counts("age_bin", data=current)
+    x_labels, y_labels = get_heatmap_labels("age_bin")
+    return {
+        service_id: create_heatmap(
+            counts[i].tolist(),
+            x_labels,
+            y_labels,
+            service_label(service_id),
+            current["SERVICES"],
+            service_id,
+        )
+        for i, service_id in enumerate(current["SERVICES"])
+    }
+
+
+@functools.cache
+def get_heatmap_bases() -> dict[str, str]:
+    """Frozen default figures: callbacks build each response on a fresh clone of these.
+
+    The heatmap trace is restyled in place, so the data is kept.
+    """
+    return {service_id: freeze_figure(fig) for service_id, fig in get_heatmap_figs().items()}
@@ -0,0 +1,285 @@
+import argparse
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# ============================================
+# COLUMNAR STORAGE
+# ============================================
+# The prepped CSVs can be converted once to Feather (Arrow IPC, uncompressed, so it
+# is memory-mapped on load and only the pages of the requested columns are read) or
+# Parquet next to the CSVs:
+#
+#     python -m dashboard.ingest data --format feather
+#
+# read_table prefers the columnar file whenever it is at least as new as its CSV,
+# reads only the requested columns and returns compact dtypes: categoricals for the
+# strings, small integers for counts, weeks and scores. The CSV path applies the same
+# projection and dtypes, so both give the same frames. Either way the frame holds its
+# own copy of the data: to_pandas() copies the columns out of the Arrow buffers. The
+# columnar path needs pyarrow (optional); without it the CSVs are used.
+
+SERVICES_TABLE = "df_services_weekly_prepped"
+PATIENTS_TABLE = "df_patients_prepped"
+
+# Column dtypes per table. Scores are 0-100 and fit int8; weeks grow with the history
+TABLE_DTYPES = {
+    SERVICES_TABLE: {
+        "week": "int32",
+        "service": "category",
+        "available_beds": "int16",
+        "patients_request": "int32",
+        "patients_admitted": "int16",
+        "patients_refused": "int32",
+        "staff_morale": "int8",
+        "event": "category",
+        "satisfaction_from_patients": "int8",
+        "doctors_count": "int16",
+        "nurses_count": "int16",
+        "satisfaction_bin": "category",
+    },
+    PATIENTS_TABLE: {
+        "name": "string",
+        "age": "int8",
+        "service": "category",
+        "satisfaction": "int8",
+        "length_of_stay": "int8",
+        "week": "int32",
+        "satisfaction_bin": "category",
+        "age_bin": "category",
+    },
+}
+
+FORMATS = {"feather": ".feather", "parquet": ".parquet"}
+
+
+def _pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def columnar_path(data_dir: Path, table: str) -> Path | None:
+    """Columnar file of a table that is at least as new as its CSV, if there is one."""
+    csv_path = Path(data_dir) / f"{table}.csv"
+    for suffix in FORMATS.values():
+        path = Path(data_dir) / f"{table}{suffix}"
+        if path.exists() and (not csv_path.exists() or path.stat().st_mtime >= csv_path.stat().st_mtime):
+            return path
+    return None
+
+
+def _column_dtypes(table: str, columns: list[str] | None) -> dict:
+    return {c: t for c, t in TABLE_DTYPES[table].items() if columns is None or c in columns}
+
+
+def _read_arrow(path: Path, columns: list[str] | None):
+    """Arrow table of a Feather or Parquet file (memory-mapped: only the requested columns are read)."""
+    if path.suffix == FORMATS["feather"]:
+        from pyarrow import feather
+
+        return feather.read_table(path, columns=columns, memory_map=True)
+    from pyarrow import parquet
+
+    return parquet.read_table(path, columns=columns, memory_map=True)
+
+
+def _arrow_to_frame(arrow_table, table: str) -> pd.DataFrame:
+    """DataFrame of an Arrow table, cast to the dtypes of TABLE_DTYPES."""
+    frame = arrow_table.to_pandas()
+    # Files written by another tool may use other types; cast to the expected ones
+    dtypes = TABLE_DTYPES[table]
+    return frame.astype({c: t for c, t in dtypes.items() if c in frame.columns and frame[c].dtype != t})
+
+
+def read_table(data_dir: Path, table: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """Read a dataset with only the requested columns, in the dtypes of TABLE_DTYPES.
+
+    Args:
+        data_dir: Directory with the CSVs and/or their columnar conversions
+        table: SERVICES_TABLE or PATIENTS_TABLE
+        columns: Columns to load (all when None)
+
+    Returns:
+        DataFrame with the requested columns
+    """
+    path = columnar_path(data_dir, table) if _pyarrow_available() else None
+
+    if path is None:
+        return pd.read_csv(
+            Path(data_dir) / f"{table}.csv",
+            usecols=columns,
+            dtype=_column_dtypes(table, columns),
+        )
+    return _arrow_to_frame(_read_arrow(path, columns), table)
+
+
+# ============================================
+# LIVE FEEDS
+# ============================================
+# With live ingestion (dashboard.live) a table is its base file plus any part files
+# dropped next to it ({table}-<anything>.csv/.parquet/.feather, read in name order),
+# and every one of them may grow. A TableFeed remembers how far each file has been
+# read, so each poll only parses the new rows: a byte offset for CSVs (complete
+# lines only; a half-written row waits for the next poll) and a row count for
+# columnar files, which cannot be appended in place and are re-read, keeping only
+# the rows past the count. A file that shrank was rewritten rather than appended:
+# TableRewritten tells the caller to rebuild from scratch.
+
+
+class TableRewritten(Exception):
+    """A data file shrank since it was last read, so its rows cannot be read incrementally."""
+
+
+def concat_rows(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate row batches of a table, keeping categorical columns categorical.
+
+    pandas turns categoricals with different categories into object columns; here
+    the categories are unioned instead.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for name, column in frames[0].items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            columns[name] = union_categoricals([frame[name] for frame in frames])
+        else:
+            columns[name] = pd.concat([frame[name] for frame in frames], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+class TableFeed:
+    """Reads the rows appended to a table's files since the previous read."""
+
+    def __init__(self, data_dir: Path, table: str, columns: list[str] | None = None):
+        self.data_dir = Path(data_dir)
+        self.table = table
+        self.columns = columns
+        # The base file is chosen once, like read_table would; switching format
+        # halfway would read every row again
+        columnar = columnar_path(data_dir, table) if _pyarrow_available() else None
+        self.base_path = columnar or self.data_dir / f"{table}.csv"
+        self._positions = {}  # path -> bytes (CSV) or rows (columnar) already read
+        self._headers = {}  # CSV path -> column names of its header line
+        self._signatures = {}  # path -> (size, mtime) when last read
+
+    def _paths(self) -> list[Path]:
+        suffixes = {".csv", *(FORMATS.values() if _pyarrow_available() else ())}
+        parts = [path for path in self.data_dir.glob(f"{self.table}-*") if path.suffix in suffixes]
+        return [self.base_path, *sorted(parts)]
+
+    def _read_csv(self, path: Path, size: int) -> pd.DataFrame | None:
+        start = self._positions.get(path, 0)
+        if size < start:
+            raise TableRewritten(path)
+        with open(path, "rb") as file:
+            file.seek(start)
+            chunk = file.read(size - start)
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        if not chunk:
+            return None
+        self._positions[path] = start + len(chunk)
+
+        if path not in self._headers:
+            header, chunk = chunk.split(b"\n", 1)
+            self._headers[path] = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+            if not chunk:
+                return None
+        return pd.read_csv(
+            io.BytesIO(chunk),
+            header=None,
+            names=self._headers[path],
+            usecols=self.columns,
+            dtype=_column_dtypes(self.table, self.columns),
+        )
+
+    def _read_columnar(self, path: Path, size: int) -> pd.DataFrame | None:
+        start = self._positions.get(path, 0)
+        arrow_table = _read_arrow(path, self.columns)
+        if arrow_table.num_rows < start:
+            raise TableRewritten(path)
+        if arrow_table.num_rows == start:
+            return None
+        self._positions[path] = arrow_table.num_rows
+        # Only the new rows are converted to pandas
+        return _arrow_to_frame(arrow_table.slice(start), self.table)
+
+    def read_new(self) -> pd.DataFrame | None:
+        """Rows added to any file of the table since the last call (all rows on the first).
+
+        Returns:
+            The new rows, or None when there are none
+
+        Raises:
+            TableRewritten: A file shrank (rewritten in place)
+        """
+        batches = []
+        for path in self._paths():
+            if not path.exists():
+                continue
+            stat = path.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._signatures.get(path) == signature:
+                continue  # Untouched since the last read
+            read = self._read_csv if path.suffix == ".csv" else self._read_columnar
+            batch = read(path, stat.st_size)
+            self._signatures[path] = signature
+            if batch is not None:
+                batches.append(batch)
+        return concat_rows(batches) if batches else None
+
+
+def convert_to_columnar(data_dir: Path, fmt: str = "feather") -> list[Path]:
+    """Write a columnar copy of every CSV table in data_dir.
+
+    Args:
+        data_dir: Directory with the prepped CSVs
+        fmt: "feather" (uncompressed, memory-mappable) or "parquet"
+
+    Returns:
+        Paths of the written files
+    """
+    import pyarrow as pa
+
+    written = []
+    for table in TABLE_DTYPES:
+        csv_path = Path(data_dir) / f"{table}.csv"
+        if not csv_path.exists():
+            continue
+        frame = pd.read_csv(csv_path, dtype=TABLE_DTYPES[table])
+        arrow_table = pa.Table.from_pandas(frame, preserve_index=False)
+
+        path = csv_path.with_suffix(FORMATS[fmt])
+        if fmt == "feather":
+            from pyarrow import feather
+
+            feather.write_feather(arrow_table, path, compression="uncompressed")
+        else:
+            from pyarrow import parquet
+
+            parquet.write_table(arrow_table, path)
+        written.append(path)
+    return written
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert the prepped CSVs to a columnar format")
+    parser.add_argument("data_dir", type=Path, nargs="?", default=Path(__file__).parent.parent / "data")
+    parser.add_argument("--format", choices=list(FORMATS), default="feather")
+    args = parser.parse_args()
+
+    if not _pyarrow_available():
+        print("pyarrow is required for the columnar format (pip install pyarrow)", file=sys.stderr)
+        return 1
+    for path in convert_to_columnar(args.data_dir, args.format):
+        print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,21 @@
+import functools
+import os
+
 from dash import dcc, html
 
-from dashboard.dash_data import (
-    SERVICES,
-    SERVICES_MAPPING,
-)
-from dashboard.heatmap import (
-    heatmap_fig_1,
-    heatmap_fig_2,
-    heatmap_fig_3,
-    heatmap_fig_4,
-)
-from dashboard.linechart import linechart_fig
-from dashboard.scatterplot_matrix import scatterplot_fig
-from dashboard.violinchart import violin_fig
+from dashboard import dash_data
+from dashboard.dash_data import service_label
+from dashboard.heatmap import get_heatmap_figs, heatmap_graph_id
+from dashboard.linechart import get_linechart_fig
+from dashboard.live import INGEST_POLL_S, LIVE_INGEST
+from dashboard.scatterplot_matrix import get_scatterplot_fig
+from dashboard.serialization import compact_figure
+from dashboard.violinchart import get_violin_fig
 from dashboard.style import MAIN_COLORS
 
+# Trailing-edge debounce (ms) before a line-chart zoom/pan updates the shared time range
+TIME_RANGE_DEBOUNCE_MS = int(os.environ.get("HOSPITOOLS_TIME_RANGE_DEBOUNCE_MS", "250"))
+
 # =========================================
 # 1. FLOATING FILTER BUTTON (TOP LEFT)
 # =========================================
@@ -75,10 +76,11 @@ SIDEBAR_OVERLAY = html.Div(
             "Select Services:",
             style={"fontWeight": "bold", "marginBottom": "8px", "display": "block"},
         ),
+        # Options (the services of the data) and value filled in by serve_layout
         dcc.Checklist(
             id="services-checklist",
-            options=[{"label": label, "value": service} for service, label in SERVICES_MAPPING.items()],
-            value=[SERVICES[0]],
+            options=[],
+            value=[],
             className="custom-checklist",
             style={
                 "display": "flex",
@@ -214,7 +216,6 @@ LINECHART_CARD = html.Div(
         ),
         dcc.Graph(
             id="line-chart",
-            figure=linechart_fig,
             config={"responsive": False},
             style={"height": "600px"},
         ),
@@ -263,7 +264,6 @@ SCATTER_PLOT_CARD = html.Div(
         ),
         dcc.Graph(
             id="scatter-plot",
-            figure=scatterplot_fig,
             config={"responsive": True},
             style={"height": "800px"},
         ),
@@ -314,34 +314,14 @@ HEATMAPS_CONTAINER = html.Div(
             ],
             className="graph-card-header",
         ),
-        # 2x2 Grid of Heatmaps - one for each service
+        # Two-column grid of heatmaps - one for each service, added by serve_layout
         html.Div(
-            [
-                dcc.Graph(
-                    id="heatmap-emergency",
-                    figure=heatmap_fig_1,
-                    config={"responsive": True},
-                ),
-                dcc.Graph(
-                    id="heatmap-icu",
-                    figure=heatmap_fig_2,
-                    config={"responsive": True},
-                ),
-                dcc.Graph(
-                    id="heatmap-surgery",
-                    figure=heatmap_fig_3,
-                    config={"responsive": True},
-                ),
-                dcc.Graph(
-                    id="heatmap-general-medicine",
-                    figure=heatmap_fig_4,
-                    config={"responsive": True},
-                ),
-            ],
+            id="heatmaps-grid",
+            children=[],
             style={
                 "display": "grid",
                 "gridTemplateColumns": "1fr 1fr",
-                "gridTemplateRows": "1fr 1fr",
+                "gridAutoRows": "1fr",
                 "gap": "10px",
                 "flex": "1",
             },
@@ -431,7 +411,6 @@ VIOLIN_CHART_CONTAINER = html.Div(
         ),
         dcc.Graph(
             id="violin-chart",
-            figure=violin_fig,
             config={"responsive": False},
             style={"height": "400px"},
         ),
@@ -459,6 +438,28 @@ LAYOUT = html.Div(
             style={"paddingLeft": "80px", "paddingTop": "10px"},
         ),
         dcc.Store(id="time-range-store", data=None),
+        # Weeks brushed on the scatter plot, marked on the line chart (per browser session)
+        dcc.Store(id="selected-weeks-store", data=None),
+        # Read by the clientside time range callback (assets/time_range.js)
+        dcc.Store(
+            id="time-range-config",
+            data={
+                "debounce_ms": TIME_RANGE_DEBOUNCE_MS,
+                # Filled in by serve_layout once the data is loaded
+                "min_week": None,
+                "max_week": None,
+            },
+        ),
+        # Live ingestion (HOSPITOOLS_LIVE_INGEST=1): every INGEST_POLL_S seconds the page
+        # compares the row count it was drawn from with the server's and, when they
+        # differ, stores the new count, which redraws every chart
+        dcc.Interval(
+            id="data-version-interval",
+            interval=INGEST_POLL_S * 1000,
+            disabled=not LIVE_INGEST,
+        ),
+        # Filled in by serve_layout once the data is loaded
+        dcc.Store(id="data-version-store", data=None),
         # Main Container
         html.Div(
             [
@@ -503,3 +504,47 @@ LAYOUT = html.Div(
     ],
     style={"backgroundColor": MAIN_COLORS["bg"], "minHeight": "100vh"},
 )
+
+
+# =========================================
+# 8. DEFAULT FIGURES
+# =========================================
+
+# Graph id -> builder of its default figure; serve_layout attaches them (and the
+# heatmaps, one per service) on first use
+DEFAULT_FIGURES = {
+    "line-chart": get_linechart_fig,
+    "scatter-plot": get_scatterplot_fig,
+    "violin-chart": get_violin_fig,
+}
+
+
+@functools.cache
+def serve_layout() -> html.Div:
+    """Complete LAYOUT with the services, default figures and week bounds (built on first call).
+
+    Loads the data and builds every default figure if that has not happened yet, so
+    it can be used both eagerly at startup and as a Dash layout function.
+    """
+    services = dash_data.SERVICES
+    checklist = LAYOUT["services-checklist"]
+    checklist.options = [{"label": service_label(service), "value": service} for service in services]
+    checklist.value = [services[0]]
+    for graph_id, get_figure in DEFAULT_FIGURES.items():
+        LAYOUT[graph_id].figure = compact_figure(get_figure())
+    LAYOUT["heatmaps-grid"].children = [
+        dcc.Graph(id=heatmap_graph_id(service_id), figure=compact_figure(fig), config={"responsive": True})
+        for service_id, fig in get_heatmap_figs().items()
+    ]
+    LAYOUT["time-range-config"].data.update(min_week=dash_data.WEEKS[0], max_week=dash_data.WEEKS[-1])
+    # The layout is built once: with live ingestion, a page loaded later starts from
+    # this row count and catches up on its first data version check
+    LAYOUT["data-version-store"].data = dash_data.DATA_ROWS
+    return LAYOUT
+
+
+def validation_layout() -> html.Div:
+    """Id-only copy of LAYOUT for callback validation, built without loading any data."""
+    return html.Div(
+        [type(component)(id=component.id) for component in LAYOUT._traverse() if getattr(component, "id", None)]
+    )
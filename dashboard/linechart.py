@@ -1,6 +1,16 @@
-import plotly.express as px
+import functools
+
+import numpy as np
+from dash import Patch
+from plotly.colors import hex_to_rgb
 from plotly.subplots import go
-from dashboard.dash_data import STREAM_DATA, SERVICES
+from dashboard import dash_data
+from dashboard.dash_data import (
+    EVENT_LABELS,
+    METRIC_INDEX,
+    STREAM_METRICS,
+)
+from dashboard.figure_base import LINE_WEBGL_POINT_THRESHOLD, freeze_figure, use_webgl
 from dashboard.style import (
     CHART_COLORS,
     PLOTLY_TEMPLATE,
@@ -13,6 +23,71 @@ EVENT_MATCH_OPACITY = 0.9
 EVENT_NO_MATCH_OPACITY = 0.1
 DEFAULT_MARKER_OPACITY = 0.8
 
+# Default visible week range of the x-axis
+DEFAULT_XAXIS_RANGE = [1, 52]
+
+# Upper bound on the points per trace: the time level is chosen to stay below it
+LINE_MAX_POINTS = 400
+
+
+def select_time_view(xaxis_range: list[float] | None = None) -> dict:
+    """Pick the finest time level whose points around the visible range fit LINE_MAX_POINTS.
+
+    A level whose whole history fits is sent completely. Otherwise only a window is
+    sent: the visible range padded by its own width on both sides, so short pans
+    don't show empty space. With a short history this is always the complete week
+    level, as before.
+
+    Args:
+        xaxis_range: Visible [min, max] week range (default view when None)
+
+    Returns:
+        dict with the cube index of every service, the level name, its bucket x
+        positions, cube and event codes restricted to the window, whether the window
+        is the whole history, and the first and last week of the history
+    """
+    lo, hi = xaxis_range if xaxis_range is not None else DEFAULT_XAXIS_RANGE
+    span = max(hi - lo, 1)
+    window_lo, window_hi = lo - span, hi + span
+
+    # Pyramid and weeks from one snapshot, even if live ingestion swaps in a new one
+    current = dash_data.snapshot()
+    pyramid = current["TIME_PYRAMID"]
+    for level in dash_data.TIME_LEVELS:
+        data = pyramid[level]
+        if len(data["x"]) <= LINE_MAX_POINTS:
+            start, stop = 0, len(data["x"])
+            break
+        start = int(np.searchsorted(data["last_week"], window_lo, side="left"))
+        stop = int(np.searchsorted(data["first_week"], window_hi, side="right"))
+        if stop - start <= LINE_MAX_POINTS or level == dash_data.TIME_LEVELS[-1]:
+            break
+
+    return {
+        "service_index": current["SERVICE_INDEX"],
+        "level": level,
+        "x": data["x"][start:stop],
+        "cube": data["cube"][:, start:stop],
+        "event_codes": data["event_codes"][:, start:stop],
+        "complete": start == 0 and stop == len(data["x"]),
+        "history": (current["WEEKS"][0], current["WEEKS"][-1]),
+    }
+
+
+def time_view_is_static() -> bool:
+    """True when every x-axis range gets the complete week level (short histories)."""
+    return len(dash_data.WEEKS) <= LINE_MAX_POINTS
+
+
+def _xaxis_config(xaxis_range: list[float] | None, view: dict) -> dict:
+    """x-axis settings, preserving the zoom range; the rangeslider always spans the whole history."""
+    xaxis_config = dict(rangeslider=dict(visible=True), type="linear", range=list(DEFAULT_XAXIS_RANGE))
+    if xaxis_range is not None:
+        xaxis_config["range"] = xaxis_range
+    if not view["complete"]:
+        xaxis_config["rangeslider"]["range"] = list(view["history"])
+    return xaxis_config
+
 
 def _apply_event_styling(fig: go.Figure, selected_event: str | None) -> None:
     """Apply event-based opacity styling to figure traces.
@@ -55,12 +130,23 @@ def _apply_event_styling(fig: go.Figure, selected_event: str | None) -> None:
                 trace.marker.opacity = DEFAULT_MARKER_OPACITY
 
 
-def _create_lines(fig, selected_metrics, selected_services, metric_labels):
-    """Create lines for each service and selected metric"""
+def _create_lines(fig, selected_metrics, selected_services, metric_labels, view):
+    """Create lines for each service and selected metric at the time level of view"""
+    # Points of coarser levels are period means, placed at the period's mean week
+    week_format = "%{x}" if view["level"] == "week" else f"%{{x:.1f}} ({view['level']} mean)"
+
+    # Many points: draw the lines with WebGL (the stream graph stays SVG, Scattergl can't stack)
+    n_points = (len(selected_services) + 1) * len(selected_metrics) * len(view["x"])
+    line_trace = go.Scattergl if use_webgl(n_points, LINE_WEBGL_POINT_THRESHOLD) else go.Scatter
+
     # Add lines for each service and selected metric
     num_available_colors = len(CHART_COLORS) - 1
     for i, cat in enumerate(selected_services):
-        cat_data = STREAM_DATA[STREAM_DATA["Category"] == cat]
+        service_idx = view["service_index"][cat]
+
+        # Prepare customdata with event information for event-based highlighting
+        # customdata format: just the event value for each point
+        customdata = EVENT_LABELS[view["event_codes"][service_idx]]
 
         for j, metric in enumerate(selected_metrics):
             # Use different line styles if multiple metrics are selected
@@ -70,14 +156,10 @@ def _create_lines(fig, selected_metrics, selected_services, metric_labels):
                 dash="solid" if j == 0 else "dash",
             )
 
-            # Prepare customdata with event information for event-based highlighting
-            # customdata format: just the event value for each point
-            customdata = cat_data["event"].tolist()
-
             fig.add_trace(
-                go.Scatter(
-                    x=cat_data["Week"],
-                    y=cat_data[metric],
+                line_trace(
+                    x=view["x"],
+                    y=view["cube"][service_idx, :, METRIC_INDEX[STREAM_METRICS[metric]]],
                     name=f"{cat} - {metric_labels[metric]}",
                     mode="lines+markers",
                     line=line_style,
@@ -85,19 +167,19 @@ def _create_lines(fig, selected_metrics, selected_services, metric_labels):
                     customdata=customdata,
                     hovertemplate=(
                         f"<b>{cat}</b><br>{metric_labels[metric]}<br>"
-                        "Week: %{x}<br>Value: %{y:.1f}<br>"
+                        f"Week: {week_format}<br>Value: %{{y:.1f}}<br>"
                         "Event: %{customdata}<extra></extra>"
                     ),
                 )
             )
 
-    # Add trend lines for each selected metric
+    # Add trend lines for each selected metric (average over all services per week)
     for j, metric in enumerate(selected_metrics):
-        avg_by_week = STREAM_DATA.groupby("Week")[metric].mean().reset_index()
+        avg_by_week = np.nanmean(view["cube"][:, :, METRIC_INDEX[STREAM_METRICS[metric]]], axis=0)
         fig.add_trace(
-            go.Scatter(
-                x=avg_by_week["Week"],
-                y=avg_by_week[metric],
+            line_trace(
+                x=view["x"],
+                y=avg_by_week,
                 name=f"Avg - {metric_labels[metric]}",
                 mode="lines",
                 line=dict(
@@ -106,7 +188,8 @@ def _create_lines(fig, selected_metrics, selected_services, metric_labels):
                     dash="dot" if j == 0 else "longdashdot",
                 ),
                 hovertemplate=(
-                    f"<b>Average {metric_labels[metric]}</b><br>" "Week: %{x}<br>Value: %{y:.1f}<extra></extra>"
+                    f"<b>Average {metric_labels[metric]}</b><br>"
+                    f"Week: {week_format}<br>Value: %{{y:.1f}}<extra></extra>"
                 ),
             )
         )
@@ -185,27 +268,52 @@ def _create_vertical_lines_shapes(
     return shapes, annotations
 
 
-def _create_stream_graph(fig, selected_services):
-    """Create stream graph for each service"""
-    if not selected_services:
-        return
+def patch_line_chart_markers(selected_weeks: list[int], xaxis_range: list[float] | None = None) -> Patch:
+    """Build a partial update that only redraws the selected-week markers.
+
+    Used for trace-neutral triggers (a scatter brush), so the browser keeps its
+    traces and only receives the shapes, annotations and x-axis range.
+
+    Args:
+        selected_weeks: List of week numbers where vertical lines should be drawn
+        xaxis_range: Optional list [min, max] to preserve x-axis zoom state (weeks)
+
+    Returns:
+        dash.Patch for the line chart figure
+    """
+    shapes, annotations = _create_vertical_lines_shapes(selected_weeks)
 
-    # Filter data for selected services
-    filtered_df = STREAM_DATA[STREAM_DATA["Category"].isin(selected_services)]
-    if filtered_df.empty:
+    patch = Patch()
+    patch["layout"]["shapes"] = shapes
+    patch["layout"]["annotations"] = annotations
+    if xaxis_range is not None:
+        patch["layout"]["xaxis"]["range"] = xaxis_range
+    return patch
+
+
+def _create_stream_graph(fig, selected_services, view):
+    """Create stream graph for each service at the time level of view"""
+    if not selected_services:
         return
 
-    # Sum values by Week for all selected services
+    # Sum values by Week for all selected services, straight from the cube
     metrics = [
         "Available Beds",
         "Patient Requests",
         "Patient Admissions",
         "Patient Refusals",
     ]
-    stream_df = filtered_df.groupby("Week")[metrics].sum().reset_index()
+    service_idx = [view["service_index"][s] for s in selected_services if s in view["service_index"]]
+    if not service_idx:
+        return
+    metric_idx = [METRIC_INDEX[STREAM_METRICS[m]] for m in metrics]
+    cube = view["cube"]
+    weekly_sums = np.nansum(cube[np.ix_(service_idx, range(cube.shape[1]), metric_idx)], axis=0)
+    stream_data = dict(zip(metrics, weekly_sums.T))
+    stream_data["Week"] = view["x"]
 
     # Calculate scaling factor to keep total height around 0-55
-    total_per_week = stream_df[metrics].sum(axis=1)
+    total_per_week = weekly_sums.sum(axis=1)
     max_total = total_per_week.max()
     scaling_factor = 55 / max_total if max_total > 0 else 1
 
@@ -217,7 +325,7 @@ def _create_stream_graph(fig, selected_services):
     # This centers the subsequent stacked traces around y=30
     fig.add_trace(
         go.Scatter(
-            x=stream_df["Week"],
+            x=stream_data["Week"],
             y=baseline,
             mode="none",
             stackgroup="one",
@@ -233,20 +341,20 @@ def _create_stream_graph(fig, selected_services):
     stream_colors = []
     for i in range(len(metrics)):
         color_hex = STREAM_GRAPH_COLORS[i % num_available_colors]
-        rgb = px.colors.hex_to_rgb(color_hex)
+        rgb = hex_to_rgb(color_hex)
         stream_colors.append(f"rgba({rgb[0]}, {rgb[1]}, {rgb[2]}, 0.3)")
 
     for i, metric in enumerate(metrics):
         fig.add_trace(
             go.Scatter(
-                x=stream_df["Week"],
-                y=stream_df[metric] * scaling_factor,
+                x=stream_data["Week"],
+                y=stream_data[metric] * scaling_factor,
                 name=f"Total {metric}",
                 stackgroup="one",
                 mode="none",
                 fillcolor=stream_colors[i % len(stream_colors)],
                 hovertemplate=f"<b>{metric}</b><br>Sum: %{{customdata:.0f}}<extra></extra>",
-                customdata=stream_df[metric],
+                customdata=stream_data[metric],
             )
         )
 
@@ -278,8 +386,9 @@ def create_line_chart(
         "Staff Morale": "Staff Morale",
     }
 
-    _create_stream_graph(fig, selected_services)
-    _create_lines(fig, selected_metrics, selected_services, metric_labels)
+    view = select_time_view(xaxis_range)
+    _create_stream_graph(fig, selected_services, view)
+    _create_lines(fig, selected_metrics, selected_services, metric_labels, view)
 
     # Apply event-based highlighting if an event is selected
     _apply_event_styling(fig, selected_event)
@@ -294,9 +403,7 @@ def create_line_chart(
 
     # Build xaxis config, preserving range if provided
     # Default range is 1-52 (weeks) to avoid empty space on the chart
-    xaxis_config = dict(rangeslider=dict(visible=True), type="linear", range=[1, 52])
-    if xaxis_range is not None:
-        xaxis_config["range"] = xaxis_range
+    xaxis_config = _xaxis_config(xaxis_range, view)
 
     fig.update_layout(
         # uirevision preserves legend visibility and other UI state when constant
@@ -352,8 +459,9 @@ def update_line_chart(
         fig.data = []
 
         # Rebuild the chart
-        _create_stream_graph(fig, selected_services)
-        _create_lines(fig, selected_metrics, selected_services, metric_labels)
+        view = select_time_view(xaxis_range)
+        _create_stream_graph(fig, selected_services, view)
+        _create_lines(fig, selected_metrics, selected_services, metric_labels, view)
 
         # Apply event-based highlighting if an event is selected
         _apply_event_styling(fig, selected_event)
@@ -383,9 +491,7 @@ def update_line_chart(
 
         # Build xaxis config, preserving range if provided
         # Default range is 1-52 (weeks) to avoid empty space on the chart
-        xaxis_config = dict(rangeslider=dict(visible=True), type="linear", range=[1, 52])
-        if xaxis_range is not None:
-            xaxis_config["range"] = xaxis_range
+        xaxis_config = _xaxis_config(xaxis_range, view)
 
         # Update layout settings
         fig.update_layout(
@@ -410,12 +516,20 @@ def update_line_chart(
     return fig
 
 
-# Create pre-initialized figure with default values
-linechart_fig = create_line_chart(
-    selected_metrics=["Patient Satisfaction"],
-    selected_services=[SERVICES[0]],
-    xaxis_range=None,
-    selected_weeks=None,
-    existing_shapes=None,
-    selected_event=None,
-)
+@functools.cache
+def get_linechart_fig() -> go.Figure:
+    """Pre-initialized figure with default values (built on first use)."""
+    return create_line_chart(
+        selected_metrics=["Patient Satisfaction"],
+        selected_services=[dash_data.SERVICES[0]],
+        xaxis_range=None,
+        selected_weeks=None,
+        existing_shapes=None,
+        selected_event=None,
+    )
+
+
+@functools.cache
+def get_linechart_base() -> str:
+    """Frozen default layout: callbacks build each response on a fresh clone of it."""
+    return freeze_figure(get_linechart_fig(), with_data=False)
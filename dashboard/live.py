@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+import time
+
+import flask
+
+from dashboard.metrics import add_collector
+
+# ============================================
+# LIVE INGESTION
+# ============================================
+# With HOSPITOOLS_LIVE_INGEST=1 the data files are watched while the app runs: new
+# rows appended to the CSVs (or new part files, see dashboard.ingest) are folded into
+# the loaded data every HOSPITOOLS_INGEST_POLL_S seconds by dash_data.ingest_new_rows,
+# without reading the history again or restarting anything. Open dashboards poll the
+# row count on the same period (a dcc.Interval, see callbacks.check_data_version) and
+# redraw their views when it changed.
+#
+# The watcher thread starts with the first request a process serves. Under the
+# pre-fork server that is in every worker rather than in the master (threads do not
+# survive a fork), and each worker folds the new rows into its own copy. Workers
+# poll independently, so for a moment two of them may answer from different data.
+
+LIVE_INGEST = os.environ.get("HOSPITOOLS_LIVE_INGEST", "0") == "1"
+
+# Seconds between two looks at the data files (and between two version checks in the browser)
+INGEST_POLL_S = float(os.environ.get("HOSPITOOLS_INGEST_POLL_S", "10"))
+
+_watcher_lock = threading.Lock()
+_watcher_pid = None
+
+
+def _watch() -> None:
+    from dashboard import dash_data
+
+    while True:
+        time.sleep(INGEST_POLL_S)
+        try:
+            rows = dash_data.ingest_new_rows()
+        except Exception as error:
+            # A malformed batch must not stop the watcher; it is retried on the next poll
+            print(f"HospiTools live ingestion failed: {error!r}", file=sys.stderr)
+        else:
+            if rows:
+                print(
+                    f"HospiTools ingested {rows} rows in {dash_data.INGEST_SECONDS * 1e3:.0f} ms "
+                    f"(data version {dash_data.DATA_VERSION})",
+                    file=sys.stderr,
+                )
+
+
+def start_watcher() -> bool:
+    """Start the watcher thread of this process, if it is not running yet.
+
+    Returns:
+        True if a thread was started
+    """
+    global _watcher_pid
+    with _watcher_lock:
+        # Compared by pid: a forked child inherits the flag but not the thread
+        if _watcher_pid == os.getpid():
+            return False
+        threading.Thread(target=_watch, name="hospitools-live-ingest", daemon=True).start()
+        _watcher_pid = os.getpid()
+        return True
+
+
+def _ensure_watcher() -> None:
+    # Flask before_request hook: must return None, or Flask would take it as the response
+    if _watcher_pid != os.getpid():
+        start_watcher()
+
+
+def _render_ingest_metrics() -> list[str]:
+    from dashboard import dash_data
+
+    # NaN until the first ingestion that found rows
+    ingest_seconds = dash_data.INGEST_SECONDS if dash_data.INGEST_SECONDS is not None else float("nan")
+    lines = []
+    for name, help_text, value in (
+        ("data_version", "Data snapshots loaded or ingested by this process", dash_data.DATA_VERSION),
+        ("data_rows", "Rows of the current data snapshot", dash_data.snapshot()["DATA_ROWS"]),
+        ("ingest_seconds", "Duration of the last live ingestion that found new rows", ingest_seconds),
+    ):
+        metric = f"hospitools_{name}"
+        lines += [f"# HELP {metric} {help_text}.", f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return lines
+
+
+def register_live_ingest(server: flask.Flask) -> None:
+    """Start the watcher with the first request served (no-op unless HOSPITOOLS_LIVE_INGEST=1).
+
+    Also reports the data version, row count and last ingestion time on /metrics.
+    """
+    if LIVE_INGEST:
+        server.before_request(_ensure_watcher)
+        add_collector(_render_ingest_metrics)
@@ -0,0 +1,236 @@
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import flask
+from dash import ctx
+
+# ============================================
+# CALLBACK INSTRUMENTATION
+# ============================================
+# Every server callback is wrapped with instrument_callback, which records wall time,
+# CPU time and the triggering input. The serialized response size is taken from the
+# Flask response of /_dash-update-component (the size after compression is recorded
+# by dashboard.compression). Everything is exposed in Prometheus text format on
+# /metrics (see register_metrics).
+#
+# Background callbacks run in a job process: there the samples are collected with
+# capture_samples instead, handed to the worker with the job's result, and recorded
+# by it with record_samples (see dashboard.background).
+
+# Histogram bucket upper bounds per measure
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+BYTES_BUCKETS = [1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6]
+QUANTILES = [0.5, 0.95, 0.99]
+
+# Number of most recent samples the p50/p95/p99 are computed from
+RECENT_SAMPLES = 2048
+
+MEASURES = {
+    "duration_seconds": ("Callback wall time", DURATION_BUCKETS),
+    "cpu_seconds": ("Callback CPU time of the request thread", DURATION_BUCKETS),
+    "response_bytes": ("Serialized callback response size", BYTES_BUCKETS),
+    "compressed_bytes": ("Callback response size sent, after compression", BYTES_BUCKETS),
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (measure, callback) -> histogram dict
+_triggers = {}  # (callback, trigger) -> count
+_collectors = []  # functions returning extra exposition lines
+_captured = None  # samples of the running background job (see capture_samples)
+
+
+def _new_lock() -> None:
+    global _lock
+    _lock = threading.Lock()
+
+
+# Background callback jobs are forked from a multi-threaded worker: a lock held by
+# another thread at that moment would never be released in the job process
+os.register_at_fork(after_in_child=_new_lock)
+
+
+def add_collector(render) -> None:
+    """Append the exposition lines returned by render() to every /metrics response."""
+    _collectors.append(render)
+
+
+def _new_histogram(buckets: list[float]) -> dict:
+    return {
+        "buckets": buckets,
+        "counts": [0] * (len(buckets) + 1),
+        "sum": 0.0,
+        "count": 0,
+        "recent": deque(maxlen=RECENT_SAMPLES),
+    }
+
+
+def observe(measure: str, callback_id: str, value: float) -> None:
+    """Record one sample of a measure for a callback."""
+    if _captured is not None:
+        _captured.append(("observe", measure, callback_id, value))
+        return
+    with _lock:
+        histogram = _histograms.get((measure, callback_id))
+        if histogram is None:
+            histogram = _histograms[(measure, callback_id)] = _new_histogram(MEASURES[measure][1])
+        histogram["counts"][bisect.bisect_left(histogram["buckets"], value)] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+        histogram["recent"].append(value)
+
+
+def count_trigger(callback_id: str, trigger: str) -> None:
+    """Count one invocation of a callback by a triggering input."""
+    if _captured is not None:
+        _captured.append(("trigger", trigger, callback_id, 1))
+        return
+    with _lock:
+        key = (callback_id, trigger)
+        _triggers[key] = _triggers.get(key, 0) + 1
+
+
+@contextlib.contextmanager
+def capture_samples():
+    """Collect the samples of the enclosed block instead of recording them.
+
+    Yields:
+        The list the samples are appended to, for record_samples in another process
+    """
+    global _captured
+    _captured = samples = []
+    try:
+        yield samples
+    finally:
+        _captured = None
+
+
+def record_samples(samples: list[tuple]) -> None:
+    """Record samples collected by capture_samples."""
+    for kind, name, callback_id, value in samples:
+        if kind == "trigger":
+            count_trigger(callback_id, name)
+        else:
+            observe(name, callback_id, value)
+
+
+def attribute_response(callback_id: str) -> None:
+    """Record the size of the current callback response under callback_id."""
+    if flask.has_request_context():
+        flask.g.callback_id = callback_id
+
+
+def _trigger_label() -> str:
+    """Name of the input that triggered the current callback ("initial" on page load)."""
+    triggered_id = ctx.triggered_id
+    if triggered_id is None:
+        return "initial"
+    if isinstance(triggered_id, str):
+        return triggered_id
+    return json.dumps(dict(triggered_id), sort_keys=True)
+
+
+def instrument_callback(func):
+    """Record wall time, CPU time and triggering input of a Dash callback.
+
+    Place it directly under the @callback decorator so the registered function is
+    the instrumented one. The callback id used in the metrics is the function name.
+    """
+    callback_id = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attribute_response(callback_id)
+        count_trigger(callback_id, _trigger_label())
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe("cpu_seconds", callback_id, time.thread_time() - cpu_start)
+            observe("duration_seconds", callback_id, time.perf_counter() - wall_start)
+
+    return wrapper
+
+
+def _record_response_size(response: flask.Response) -> flask.Response:
+    """Flask after_request hook: record the serialized size of callback responses."""
+    callback_id = flask.g.get("callback_id")
+    if callback_id is not None and flask.request.path.endswith("_dash-update-component"):
+        observe("response_bytes", callback_id, len(response.get_data()))
+    return response
+
+
+def _quantile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def render_metrics() -> str:
+    """Render all recorded callback metrics in the Prometheus text exposition format.
+
+    Each measure is exported as a cumulative histogram (mergeable across workers) and
+    as a summary of the most recent samples with the p50/p95/p99 per callback id.
+    """
+    with _lock:
+        histograms = {
+            key: {**h, "counts": list(h["counts"]), "recent": sorted(h["recent"])} for key, h in _histograms.items()
+        }
+        triggers = dict(_triggers)
+
+    lines = []
+    for measure, (help_text, buckets) in MEASURES.items():
+        name = f"hospitools_callback_{measure}"
+        entries = sorted((cb, h) for (m, cb), h in histograms.items() if m == measure)
+
+        lines += [f"# HELP {name} {help_text}.", f"# TYPE {name} histogram"]
+        for callback_id, h in entries:
+            cumulative = 0
+            for upper, count in zip(buckets + [float("inf")], h["counts"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{callback="{callback_id}",le="{_format_value(upper)}"}} {cumulative}')
+            lines.append(f'{name}_sum{{callback="{callback_id}"}} {_format_value(h["sum"])}')
+            lines.append(f'{name}_count{{callback="{callback_id}"}} {h["count"]}')
+
+        recent = f"{name}_recent"
+        lines += [f"# HELP {recent} {help_text}, last {RECENT_SAMPLES} calls.", f"# TYPE {recent} summary"]
+        for callback_id, h in entries:
+            for q in QUANTILES:
+                value = _format_value(_quantile(h["recent"], q))
+                lines.append(f'{recent}{{callback="{callback_id}",quantile="{q}"}} {value}')
+            lines.append(f'{recent}_sum{{callback="{callback_id}"}} {_format_value(sum(h["recent"]))}')
+            lines.append(f'{recent}_count{{callback="{callback_id}"}} {len(h["recent"])}')
+
+    name = "hospitools_callback_triggers_total"
+    lines += [f"# HELP {name} Callback invocations per triggering input.", f"# TYPE {name} counter"]
+    for (callback_id, trigger), count in sorted(triggers.items()):
+        trigger = trigger.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'{name}{{callback="{callback_id}",trigger="{trigger}"}} {count}')
+
+    for render in _collectors:
+        lines += render()
+
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics(server: flask.Flask) -> None:
+    """Record callback response sizes and expose the /metrics route on the Flask server."""
+    server.after_request(_record_response_size)
+    server.add_url_rule(
+        "/metrics",
+        "hospitools_metrics",
+        lambda: flask.Response(render_metrics(), mimetype="text/plain; version=0.0.4"),
+    )
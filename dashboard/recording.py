@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import flask
+
+# ============================================
+# SESSION RECORDING
+# ============================================
+# With HOSPITOOLS_RECORD_SESSIONS=<dir>, every page load starts a session file in that
+# directory, and what the user does on the page is appended to it as steps that
+# benchmarks/load_test.py can replay. A step is every value the page sent that
+# changed since its previous callback request: the inputs that triggered the callback
+# and state such as the line chart's relayoutData. One action fans out to several
+# callbacks carrying the same change, but it is recorded once. The page is told apart
+# by a cookie set with its layout. Background callback polls are not recorded: they
+# carry no values.
+#
+# Session files are JSON Lines: a header, then one line per step. The header is
+# written under the lock when the session is registered (once per page), so it is
+# always the first line. Each step is appended with a single write outside the lock,
+# so concurrent requests may append their steps out of order; read_session sorts
+# them. A page idle for SESSION_IDLE_S is forgotten; if it comes back, it continues
+# in a new file.
+#
+#     {"format": 1, "recorded": "2026-10-17T09:30:00"}
+#     {"at_s": 2.41, "changed": {"services-checklist.value": ["ICU"]}}
+
+RECORD_DIR = os.environ.get("HOSPITOOLS_RECORD_SESSIONS", "")
+
+SESSION_COOKIE = "hospitools_session"
+SESSION_FORMAT = 1
+SESSION_IDLE_S = 30 * 60
+
+_lock = threading.Lock()
+_sessions = {}  # session id -> {"path", "started", "last", "known" values, "last_step" changes}
+
+
+def _append_lines(path: Path, records: list[dict]) -> None:
+    # One write per call: lines of concurrent calls never interleave
+    data = "".join(json.dumps(record) + "\n" for record in records).encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def write_session(path: Path, session: dict) -> None:
+    """Write a session dict ({"format", "recorded", "steps"}) as a session file."""
+    header = {key: value for key, value in session.items() if key != "steps"}
+    path.write_text("".join(json.dumps(record) + "\n" for record in [header] + session["steps"]))
+
+
+def read_session(path: Path) -> dict:
+    """Read a session file into a session dict, with its steps in time order.
+
+    Raises:
+        ValueError: The file is not a session file of SESSION_FORMAT
+    """
+    records = [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+    if not records or records[0].get("format") != SESSION_FORMAT:
+        raise ValueError(f"{path} is not a session file (format {SESSION_FORMAT})")
+    return {**records[0], "steps": sorted(records[1:], key=lambda step: step["at_s"])}
+
+
+def _new_session(session_id: str, now: float) -> dict:
+    """Register a session and start its file with the header (caller holds the lock)."""
+    # Pages idle for too long are forgotten, so the registry stays bounded
+    for idle_id in [key for key, entry in _sessions.items() if now - entry["last"] > SESSION_IDLE_S]:
+        del _sessions[idle_id]
+
+    started = datetime.now()
+    entry = {
+        "path": Path(RECORD_DIR) / f"session-{started:%Y%m%d-%H%M%S}-{session_id[:8]}.jsonl",
+        "started": now,
+        "last": now,
+        "known": {},
+        "last_step": {},
+    }
+    _sessions[session_id] = entry
+    _append_lines(entry["path"], [{"format": SESSION_FORMAT, "recorded": started.isoformat(timespec="seconds")}])
+    return entry
+
+
+def _changes(body: dict, known: dict) -> dict:
+    """Values of the request that triggered it or differ from the page's previous ones."""
+    changed_ids = set(body.get("changedPropIds", []))
+    changes = {}
+    for spec in body.get("inputs", []) + body.get("state", []):
+        # Wildcard inputs (lists of specs) and pattern-matching ids are driven by the server
+        if isinstance(spec, list) or not isinstance(spec.get("id"), str):
+            continue
+        key = f"{spec['id']}.{spec['property']}"
+        value = spec.get("value")
+        if key in changed_ids or (key in known and known[key] != value):
+            changes[key] = value
+        known[key] = value
+    return changes
+
+
+def _record_request() -> None:
+    # Flask before_request hook: must return None, or Flask would take it as the response
+    if not flask.request.path.endswith("_dash-update-component") or "cacheKey" in flask.request.args:
+        return
+    body = flask.request.get_json(silent=True)
+    session_id = flask.request.cookies.get(SESSION_COOKIE)
+    if not body or not session_id:
+        return
+
+    now = time.monotonic()
+    with _lock:
+        entry = _sessions.get(session_id)
+        if entry is None:
+            # A page loaded before a restart (or idle for long) continues in a new file
+            entry = _new_session(session_id, now)
+        entry["last"] = now
+        changes = _changes(body, entry["known"])
+        last = entry["last_step"]
+        if all(key in last and last[key] == value for key, value in changes.items()):
+            return  # Nothing new, or another callback of the last recorded action
+        entry["last_step"] = changes
+        step = {"at_s": round(now - entry["started"], 3), "changed": changes}
+    _append_lines(entry["path"], [step])
+
+
+def _start_session(response: flask.Response) -> flask.Response:
+    """Flask after_request hook: a new session (and cookie) for every layout served."""
+    if flask.request.path.endswith("_dash-layout") and response.status_code == 200:
+        session_id = uuid.uuid4().hex
+        with _lock:
+            _new_session(session_id, time.monotonic())
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="Lax")
+    return response
+
+
+def register_session_recording(server: flask.Flask) -> None:
+    """Record the sessions of the Flask server (no-op unless HOSPITOOLS_RECORD_SESSIONS is set)."""
+    if RECORD_DIR:
+        Path(RECORD_DIR).mkdir(parents=True, exist_ok=True)
+        server.before_request(_record_request)
+        server.after_request(_start_session)
@@ -1,7 +1,11 @@
-import plotly.express as px
+import functools
+
+import numpy as np
 import plotly.graph_objects as go
+from dashboard import dash_data
+from dashboard.figure_base import freeze_figure, trusted_trace, use_webgl
 from dashboard.style import CHART_COLORS, PLOTLY_TEMPLATE, MAIN_COLORS
-from dashboard.dash_data import SCATTER_DATA, SERVICES_MAPPING
+from dashboard.dash_data import EVENT_LABELS, service_label
 
 # Constants
 DIMENSIONS = ["Satisfaction", "Morale", "Refused/Admitted Ratio", "Staff/Patient Ratio"]
@@ -37,6 +41,14 @@ DEFAULT_MARKER_STYLE = dict(
 )
 UNSELECTED_MARKER_STYLE = dict(opacity=UNSELECTED_OPACITY, color="grey")
 
+# Lighter splom settings above the WebGL point threshold: no marker outlines, smaller
+# markers and only the lower half of the matrix (the upper half mirrors it)
+GL_SPLOM_STYLE = dict(
+    marker=dict(size=4, line=dict(width=0)),
+    showupperhalf=False,
+    diagonal=dict(visible=False),
+)
+
 # Empty figure annotation
 EMPTY_FIGURE_ANNOTATION = {
     "text": "No Data (Check Filters)",
@@ -47,31 +59,125 @@ EMPTY_FIGURE_ANNOTATION = {
 }
 
 
-def _filter_scatter_data(selected_services=None, time_range=None):
-    """Filter scatter plot data based on service and time range selections.
+def _trace_style(service_rank: int) -> dict:
+    """Marker styling of a visible category trace (colors follow the rank among visible traces)."""
+    return dict(
+        marker=dict(DEFAULT_MARKER_STYLE, color=CHART_COLORS[service_rank % len(CHART_COLORS)], symbol="circle"),
+        unselected=dict(marker=UNSELECTED_MARKER_STYLE),
+    )
+
+
+@dash_data.cache_per_version()
+def _category_traces(current: dict) -> tuple[dict, ...]:
+    """One static splom trace per category over the full SCATTER_DATA, built once per data version.
+
+    Trace i holds every week of the snapshot's SERVICES[i] in week order, so
+    curveNumber is the service index and pointIndex the row within that service.
+    Filters never touch these arrays: they only set visibility, selectedpoints and
+    marker opacity.
 
     Args:
-        selected_services: Optional list of service IDs to filter by
-        time_range: Optional tuple (start_week, end_week) to filter by time
+        current: Data snapshot (dash_data.snapshot()) the traces are built from
+
+    Returns:
+        Tuple of trace dicts (without styling), ordered like the snapshot's SERVICES
+    """
+    data = current["SCATTER_DATA"]
+    codes = data["Category"].cat.codes.to_numpy()
+    events = EVENT_LABELS[current["EVENT_CODES"]]
+
+    traces = []
+    for i, service in enumerate(current["SERVICES"]):
+        rows = data[codes == i]
+        label = service_label(service)
+        traces.append(
+            dict(
+                type="splom",
+                name=label,
+                legendgroup=label,
+                showlegend=True,
+                dimensions=[
+                    dict(axis=dict(matches=True), label=dimension, values=rows[dimension].to_numpy())
+                    for dimension in DIMENSIONS
+                ],
+                customdata=np.column_stack([rows["Week"].to_numpy().astype(object), events[i].astype(object)]),
+                hovertemplate=(
+                    f"Category={label}<br>%{{xaxis.title.text}}=%{{x}}<br>%{{yaxis.title.text}}=%{{y}}<br>"
+                    "Week=%{customdata[0]}<br>event=%{customdata[1]}<extra></extra>"
+                ),
+            )
+        )
+    return tuple(traces)
+
+
+@dash_data.cache_per_version()
+def _selection_index(current: dict) -> tuple[np.ndarray, np.ndarray]:
+    """SCATTER_DATA row id and week of every (curveNumber, pointIndex) of the splom.
+
+    Built from the same rows as _category_traces, once per data version.
+
+    Args:
+        current: Data snapshot (dash_data.snapshot()) the index is built from
+
+    Returns:
+        (row_ids, weeks), both of shape (services, points per trace)
+    """
+    data = current["SCATTER_DATA"]
+    codes = data["Category"].cat.codes.to_numpy()
+    row_ids = np.stack([np.flatnonzero(codes == i) for i in range(len(current["SERVICES"]))])
+    return row_ids, data["Week"].to_numpy()[row_ids]
+
+
+def decode_selection(points: list[dict], time_range=None) -> tuple[np.ndarray, np.ndarray]:
+    """Map selected splom points to SCATTER_DATA row ids and weeks, in one vectorized lookup.
+
+    Points of a trace that is not a category trace or past its end are dropped, and
+    so are points outside the time range: they are drawn unselected, so brushing over
+    them must not select their weeks.
+
+    Args:
+        points: selectedData["points"] of the scatter plot (curveNumber, pointIndex)
+        time_range: Optional (min_week, max_week) of the scatter plot
 
     Returns:
-        Filtered DataFrame
+        (row_ids, weeks) of the valid selected points, in selection order
     """
-    df_plot = SCATTER_DATA[DIMENSIONS + ["Category", "Week", "event"]]
+    row_ids, weeks = _selection_index(dash_data.snapshot())
+    curve = np.fromiter((point.get("curveNumber", 0) for point in points), dtype=np.int64, count=len(points))
+    index = np.fromiter((point.get("pointIndex", -1) for point in points), dtype=np.int64, count=len(points))
+
+    valid = (curve >= 0) & (curve < row_ids.shape[0]) & (index >= 0) & (index < row_ids.shape[1])
+    curve, index = curve[valid], index[valid]
+    selected_rows, selected_weeks = row_ids[curve, index], weeks[curve, index]
+    if time_range:
+        in_window = (selected_weeks >= time_range[0]) & (selected_weeks <= time_range[1])
+        selected_rows, selected_weeks = selected_rows[in_window], selected_weeks[in_window]
+    return selected_rows, selected_weeks
 
-    if selected_services:
-        selected_labels = [
-            SERVICES_MAPPING[s] for s in selected_services if s in SERVICES_MAPPING
-        ]
-        df_plot = df_plot[df_plot["Category"].isin(selected_labels)]
 
+def _point_masks(current, selected_services, time_range, selected_event):
+    """NumPy masks for a filter state, over the weeks of the data snapshot current.
+
+    Returns:
+        tuple: (visible mask per service, in-window mask per week, per-point event opacity
+        of shape (services, weeks) or None)
+    """
+    weeks = np.asarray(current["WEEKS"])
+    codes = current["EVENT_CODES"]
+
+    services = current["SERVICES"]
+    visible = np.array([s in (selected_services or services) for s in services])
+    in_window = np.ones(len(weeks), dtype=bool)
     if time_range:
         start_week, end_week = time_range
-        df_plot = df_plot[
-            (df_plot["Week"] >= start_week) & (df_plot["Week"] <= end_week)
-        ]
+        in_window = (weeks >= start_week) & (weeks <= end_week)
+
+    opacity = None
+    if selected_event:
+        match = EVENT_LABELS[codes] == str(selected_event).lower()
+        opacity = np.where(match, EVENT_MATCH_OPACITY, EVENT_NO_MATCH_OPACITY)
 
-    return df_plot
+    return visible, in_window, opacity
 
 
 def _create_empty_figure():
@@ -86,37 +192,6 @@ def _create_empty_figure():
     return fig
 
 
-def _apply_event_styling(fig, selected_event):
-    """Apply event-based opacity styling to figure traces.
-
-    Args:
-        fig: Plotly figure to style
-        selected_event: Event name to highlight (None for default styling)
-    """
-    if selected_event:
-        target_event = str(selected_event).lower()
-
-        for trace in fig.data:
-            try:
-                trace_events = trace.customdata[:, 1]
-                opacity_array = [
-                    (
-                        EVENT_MATCH_OPACITY
-                        if str(evt).lower() == target_event
-                        else EVENT_NO_MATCH_OPACITY
-                    )
-                    for evt in trace_events
-                ]
-                trace.marker.opacity = opacity_array
-            except Exception:
-                pass
-    else:
-        fig.update_traces(
-            marker=DEFAULT_MARKER_STYLE,
-            unselected=dict(marker=UNSELECTED_MARKER_STYLE),
-        )
-
-
 def _apply_layout_config(fig):
     """Apply standard layout configuration to figure.
 
@@ -128,24 +203,49 @@ def _apply_layout_config(fig):
     fig.update_yaxes(showgrid=True, gridcolor=MAIN_COLORS["grid"])
 
 
-def _build_scatter_matrix(df_plot):
-    """Build scatter matrix from filtered data.
+def _add_splom_traces(fig, selected_services, time_range, selected_event) -> bool:
+    """Add the category traces to fig with the filter state applied as masks.
 
-    Args:
-        df_plot: Filtered DataFrame with scatter plot data
+    Services outside the selection are hidden, weeks outside the time range are left
+    unselected (drawn faintly, like a brushed-out point) and a selected event sets a
+    per-point opacity.
 
     Returns:
-        Plotly figure with scatter matrix
+        False (and adds nothing) if no point passes the filters
     """
-    fig = px.scatter_matrix(
-        df_plot,
-        dimensions=DIMENSIONS,
-        color="Category",
-        color_discrete_sequence=CHART_COLORS,
-        hover_data={"Week": True, "event": True},
-        height=SCATTER_HEIGHT,
-    )
-    return fig
+    # Traces and masks from one snapshot: their point counts must match
+    current = dash_data.snapshot()
+    traces = _category_traces(current)
+    visible, in_window, opacity = _point_masks(current, selected_services, time_range, selected_event)
+    if not visible.any() or not in_window.any():
+        return False
+
+    selected_points = None if in_window.all() else np.flatnonzero(in_window)
+    gl_mode = use_webgl(int(visible.sum()) * len(in_window) * len(DIMENSIONS))
+    rank = 0
+    for i, static in enumerate(traces):
+        if not visible[i]:
+            # Placeholder without data: keeps curveNumber equal to the service index
+            fig.add_trace(go.Splom(name=static["name"], legendgroup=static["legendgroup"], visible=False))
+            continue
+
+        trace = trusted_trace(go.Splom, static)
+        trace.update(_trace_style(rank))
+        if gl_mode:
+            trace.update(GL_SPLOM_STYLE)
+        rank += 1
+        if opacity is not None:
+            trace.marker.opacity = opacity[i]
+        if selected_points is not None:
+            trace.selectedpoints = selected_points
+        fig.add_trace(trace)
+    return True
+
+
+def _configure_splom_layout(fig):
+    """Legend and axis settings of the matrix, as set up by plotly express before."""
+    fig.update_layout(height=SCATTER_HEIGHT, legend=dict(title=dict(text="Category"), tracegroupgap=0))
+    _apply_layout_config(fig)
 
 
 def create_scatter_plot(selected_services=None, time_range=None, selected_event=None):
@@ -159,14 +259,11 @@ def create_scatter_plot(selected_services=None, time_range=None, selected_event=
     Returns:
         Plotly figure with scatter matrix
     """
-    df_plot = _filter_scatter_data(selected_services, time_range)
-
-    if df_plot.empty:
+    fig = go.Figure()
+    if not _add_splom_traces(fig, selected_services, time_range, selected_event):
         return _create_empty_figure()
 
-    fig = _build_scatter_matrix(df_plot)
-    _apply_event_styling(fig, selected_event)
-    _apply_layout_config(fig)
+    _configure_splom_layout(fig)
 
     return fig
 
@@ -185,12 +282,10 @@ def update_scatter_plot(
     Returns:
         Updated Plotly figure
     """
-    df_plot = _filter_scatter_data(selected_services, time_range)
-
     with fig.batch_update():
         fig.data = []
 
-        if df_plot.empty:
+        if not _add_splom_traces(fig, selected_services, time_range, selected_event):
             fig.update_layout(
                 template=PLOTLY_TEMPLATE,
                 xaxis={"visible": False},
@@ -199,15 +294,21 @@ def update_scatter_plot(
             )
             return fig
 
-        new_fig = _build_scatter_matrix(df_plot)
-        for trace in new_fig.data:
-            fig.add_trace(trace)
-
-        _apply_event_styling(fig, selected_event)
-        _apply_layout_config(fig)
+        # Clones of the base figure already carry the matrix layout; setting it again
+        # (template included) would cost more than the traces
+        if fig.layout.dragmode != LAYOUT_CONFIG["dragmode"]:
+            _configure_splom_layout(fig)
 
     return fig
 
 
-# Create pre-initialized figure with default values
-scatterplot_fig = create_scatter_plot()
+@functools.cache
+def get_scatterplot_fig() -> go.Figure:
+    """Pre-initialized figure with default values (built on first use)."""
+    return create_scatter_plot()
+
+
+@functools.cache
+def get_scatterplot_base() -> str:
+    """Frozen default layout: callbacks build each response on a fresh clone of it."""
+    return freeze_figure(get_scatterplot_fig(), with_data=False)
@@ -0,0 +1,191 @@
+import base64
+import json
+import os
+
+import numpy as np
+import plotly
+from plotly import graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from dashboard.figure_base import SUPPORTED_PLOTLY, WEBGL_POINT_THRESHOLD
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ============================================
+# COMPACT FIGURE SERIALIZATION
+# ============================================
+# Every figure leaving the server goes through compact_figure:
+# - integer-valued trace arrays (weeks, counts, integer metrics, even when stored as
+#   floats) are sent as plotly.js typed arrays, base64 binary in the smallest integer
+#   dtype, which the browser decodes without parsing numbers;
+# - other floats are rounded to FLOAT_DECIMALS places. They stay JSON numbers: once
+#   the response is compressed, short decimals are smaller than float32 binary (see
+#   benchmarks/bench_serialization.py). Only arrays past the WebGL threshold are sent
+#   as float32, where parsing speed in the browser matters more than bytes;
+# - the JSON is written by orjson when it is installed, much faster than the json
+#   module. Dash's own response encoding already picks orjson up through plotly's
+#   "auto" JSON engine.
+# HOSPITOOLS_FLOAT_DECIMALS sets the precision; HOSPITOOLS_TYPED_ARRAYS=0 sends every
+# array as a plain (still rounded) JSON list, e.g. to read responses by eye.
+#
+# compact_figure reads the figure's already validated trace and layout dicts in place
+# (the private fig._data and fig._layout) in the plotly releases figure_base supports
+# (SUPPORTED_PLOTLY). With any other release it goes through the public
+# fig.to_plotly_json(), which copies them.
+
+FLOAT_DECIMALS = int(os.environ.get("HOSPITOOLS_FLOAT_DECIMALS", "3"))
+TYPED_ARRAYS = os.environ.get("HOSPITOOLS_TYPED_ARRAYS", "1") == "1"
+
+READ_FIGURE_DICTS = plotly.__version__.split(".")[0] in SUPPORTED_PLOTLY
+
+# Below this many values the dtype/bdata wrapper is longer than the plain list
+TYPED_ARRAY_MIN_SIZE = 16
+
+# Trace attributes holding numeric data arrays (also looked up inside marker, line and
+# splom dimensions). Other numeric lists (domains, colorscales, ranges) are left alone
+TYPED_ARRAY_ATTRIBUTES = frozenset({"x", "y", "z", "customdata", "values", "opacity", "size", "color"})
+
+# float32 holds integers exactly up to 2**24: below that, values rounded to
+# FLOAT_DECIMALS places stay distinct and print back to the same decimals
+_FLOAT32_EXACT = 2**24
+
+# Smallest integer dtypes first; plotly.js has no 64-bit integer arrays
+_INT_DTYPES = [np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32]
+
+
+def _numeric_array(values) -> np.ndarray | None:
+    """values as an int/float array, or None when they are not purely numeric."""
+    array = np.asarray(values)
+    if array.dtype.kind == "O" and isinstance(values, list):
+        # Numbers with None gaps (violin outlines): None becomes NaN, written as null
+        if not all(item is None or isinstance(item, (int, float)) for item in values):
+            return None
+        array = np.array(values, dtype=float)
+    if array.dtype.kind not in "iuf" or array.size == 0:
+        return None
+    return array
+
+
+def _typed_array(array: np.ndarray) -> dict:
+    """plotly.js typed-array spec of an int8..uint32 or float32 array."""
+    little_endian = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    spec = {"dtype": array.dtype.str[1:], "bdata": base64.b64encode(little_endian).decode()}
+    if array.ndim > 1:
+        spec["shape"] = ", ".join(map(str, array.shape))
+    return spec
+
+
+def _typed_array_values(spec: dict) -> np.ndarray:
+    """The array of a typed-array spec, as plotly writes them for numpy arrays."""
+    array = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=np.dtype(spec["dtype"]).newbyteorder("<"))
+    if "shape" in spec:
+        array = array.reshape([int(n) for n in str(spec["shape"]).split(",")])
+    return array
+
+
+def _smallest_int(array: np.ndarray) -> np.ndarray | None:
+    """array in the smallest integer dtype holding its values, None past uint32."""
+    low, high = array.min(), array.max()
+    for dtype in _INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return array.astype(dtype)
+    return None
+
+
+def compact_array(values, decimals: int = FLOAT_DECIMALS):
+    """Encode a numeric data array as compactly as plotly.js can read it.
+
+    Args:
+        values: List or array of a trace attribute
+        decimals: Decimal places kept for non-integer floats
+
+    Returns:
+        A typed-array spec ({"dtype", "bdata"[, "shape"]}), a list of rounded numbers,
+        or values unchanged when they are not a numeric array
+    """
+    array = _numeric_array(values)
+    if array is None or array.size < TYPED_ARRAY_MIN_SIZE:
+        return values
+
+    if array.dtype.kind == "f":
+        finite = np.isfinite(array)
+        if not (finite.all() and np.array_equal(array, np.rint(array))):
+            array = np.round(array, decimals)
+            largest = np.abs(array[finite]).max(initial=0.0)
+            if TYPED_ARRAYS and array.size > WEBGL_POINT_THRESHOLD and largest * 10**decimals < _FLOAT32_EXACT:
+                return _typed_array(array.astype(np.float32))
+            return array.tolist()
+
+    narrow = _smallest_int(array)
+    if not TYPED_ARRAYS or narrow is None:
+        return array.tolist()
+    return _typed_array(narrow)
+
+
+def _compact_props(props: dict, decimals: int) -> dict:
+    """Copy of trace (or marker, line, dimension) properties with compacted data arrays."""
+    compacted = {}
+    for key, value in props.items():
+        if isinstance(value, dict) and "bdata" in value and key in TYPED_ARRAY_ATTRIBUTES:
+            # Encoded by plotly (arrays of cloned figures, to_plotly_json): compacted like the others
+            value = compact_array(_typed_array_values(value), decimals)
+        elif isinstance(value, dict) and "bdata" not in value:
+            value = _compact_props(value, decimals)
+        elif key == "dimensions" and isinstance(value, (list, tuple)):
+            value = [_compact_props(dimension, decimals) for dimension in value]
+        elif key in TYPED_ARRAY_ATTRIBUTES and isinstance(value, (list, tuple, np.ndarray)):
+            value = compact_array(value, decimals)
+        if isinstance(value, np.ndarray) and value.dtype.kind not in "biuf":
+            # orjson only writes numeric arrays; labels would send plotly's encoder down
+            # its slow pure-Python path
+            value = value.tolist()
+        compacted[key] = value
+    return compacted
+
+
+def compact_figure(fig: go.Figure, decimals: int = FLOAT_DECIMALS) -> dict:
+    """Figure dict with compacted trace arrays, ready for a Dash response or the cache.
+
+    The trace dicts are new, but the layout and the values that were not compacted
+    are the figure's own (no deep copy): serialize the result, don't modify it.
+
+    Args:
+        fig: Plotly figure (left unchanged)
+        decimals: Decimal places kept for non-integer floats
+
+    Returns:
+        Figure dict
+    """
+    if READ_FIGURE_DICTS:
+        traces, layout = fig._data, fig._layout
+    else:
+        plotly_json = fig.to_plotly_json()
+        traces, layout = plotly_json["data"], plotly_json["layout"]
+    return {"data": [_compact_props(trace, decimals) for trace in traces], "layout": layout}
+
+
+def compact_result(result):
+    """compact_figure applied to a callback result: a figure or a list/tuple of them."""
+    if isinstance(result, go.Figure):
+        return compact_figure(result)
+    if isinstance(result, (list, tuple)):
+        return type(result)(compact_result(item) for item in result)
+    return result
+
+
+def dumps(obj) -> str:
+    """JSON text of compacted figures and other plain data (orjson when installed)."""
+    # The "auto" engine is orjson when importable, with plotly's fallbacks for the
+    # values orjson cannot write directly
+    return to_json_plotly(obj, engine="auto")
+
+
+def loads(text: str):
+    """Parse JSON text written by dumps (orjson when installed)."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# SHARED DATA (PRE-FORK SERVING)
+# ============================================
+# A pre-fork server (gunicorn.conf.py: preload_app) imports the app once in the master,
+# which loads the data and builds the aggregates, then forks the workers. With
+# HOSPITOOLS_SHARED_DATA=1 every array of the loaded data is moved to a read-only
+# memory-mapped .npy file, by default in /dev/shm, so the workers map the same
+# physical pages: nothing the workers do (a pandas consolidation, a stray in-place
+# write) can turn them into private copies, and a write fails loudly instead. The
+# files are unlinked as soon as they are mapped; the mappings keep the memory alive
+# until the last process using it exits, and nothing is left behind if the server
+# is killed.
+
+SHARED_DATA = os.environ.get("HOSPITOOLS_SHARED_DATA", "0") == "1"
+
+# Directory of the mapped files; /dev/shm keeps them in RAM on Linux
+SHARED_DIR = Path(
+    os.environ.get("HOSPITOOLS_SHARED_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+)
+
+
+def share_array(array: np.ndarray) -> np.ndarray:
+    """Copy an array to a memory-mapped file and return a read-only view of the mapping.
+
+    Args:
+        array: Array of a fixed-size dtype (not object)
+
+    Returns:
+        Array with the same values, backed by memory shared with forked processes
+    """
+    handle, path = tempfile.mkstemp(prefix="hospitools-", suffix=".npy", dir=SHARED_DIR)
+    with os.fdopen(handle, "wb") as file:
+        np.save(file, np.ascontiguousarray(array), allow_pickle=False)
+    mapped = np.load(path, mmap_mode="r")
+    try:
+        os.unlink(path)
+    except OSError:
+        pass  # Windows cannot delete a mapped file; it is left in SHARED_DIR
+    # A plain ndarray view: results of arithmetic on it are ordinary arrays, not memmaps
+    return mapped.view(np.ndarray)
+
+
+def _share_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Rebuild a DataFrame on shared column arrays (categoricals share their codes)."""
+    columns = {}
+    for name, column in frame.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes = share_array(column.array.codes)
+            columns[name] = pd.Categorical.from_codes(codes, dtype=column.dtype, validate=False)
+        elif isinstance(column.dtype, np.dtype) and column.dtype != object:
+            columns[name] = share_array(column.to_numpy())
+        else:
+            # Strings and other object columns stay private
+            columns[name] = column.array
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+
+def share_value(value):
+    """Move the arrays of a loaded data value to shared memory.
+
+    Arrays and DataFrames are shared; dicts and lists are rebuilt with their items
+    shared; anything else is returned unchanged.
+    """
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return share_array(value)
+    if isinstance(value, pd.DataFrame):
+        return _share_frame(value)
+    if isinstance(value, dict):
+        return {key: share_value(item) for key, item in value.items()}
+    if isinstance(value, list) and any(isinstance(item, (np.ndarray, dict)) for item in value):
+        return [share_value(item) for item in value]
+    return value
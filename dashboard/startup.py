@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+
+# Imported first by app.py, so this is (close to) the start of the boot
+BOOT_START = time.perf_counter()
+
+# ============================================
+# STARTUP MODE AND BUDGET
+# ============================================
+# By default the data and every default figure are loaded at startup (warm_up), so
+# the first request is as fast as any other. With HOSPITOOLS_LAZY_INIT=1 nothing is
+# loaded until the first page load or callback needs it, which keeps worker restarts
+# and cold starts short; a server can still call warm_up() from a post-fork hook.
+
+LAZY_INIT = os.environ.get("HOSPITOOLS_LAZY_INIT", "0") == "1"
+
+# Seconds the boot (imports, plus the warm-up in eager mode) is expected to take
+STARTUP_BUDGET_S = float(os.environ.get("HOSPITOOLS_STARTUP_BUDGET_S", "5"))
+
+
+def warm_up() -> dict[str, float]:
+    """Load the data and build every default figure and layout now.
+
+    Returns:
+        Seconds spent per step ("data", "figures")
+    """
+    # Imported here so that importing this module stays cheap (see BOOT_START)
+    from dashboard import dash_data
+    from dashboard.heatmap import get_heatmap_bases
+    from dashboard.layout import serve_layout
+    from dashboard.linechart import get_linechart_base
+    from dashboard.scatterplot_matrix import get_scatterplot_base
+    from dashboard.violinchart import get_violin_base
+
+    timings = {}
+    start = time.perf_counter()
+    dash_data.load_data()
+    timings["data"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    serve_layout()
+    for get_base in (get_linechart_base, get_scatterplot_base, get_violin_base, get_heatmap_bases):
+        get_base()
+    timings["figures"] = time.perf_counter() - start
+    return timings
+
+
+def report_startup(timings: dict[str, float] | None = None) -> float:
+    """Print the boot time against STARTUP_BUDGET_S to stderr.
+
+    Args:
+        timings: Optional per-step breakdown (as returned by warm_up)
+
+    Returns:
+        Seconds since BOOT_START
+    """
+    elapsed = time.perf_counter() - BOOT_START
+    mode = "lazy" if LAZY_INIT else "eager"
+    steps = "".join(f", {step} {seconds:.2f}s" for step, seconds in (timings or {}).items())
+    status = "within" if elapsed <= STARTUP_BUDGET_S else "OVER"
+    print(
+        f"HospiTools startup ({mode}): {elapsed:.2f}s{steps} - {status} the {STARTUP_BUDGET_S:.1f}s budget",
+        file=sys.stderr,
+    )
+    return elapsed
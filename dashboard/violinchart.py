@@ -1,8 +1,19 @@
+import functools
+
+import numpy as np
+
 from plotly.subplots import go
-from dashboard.dash_data import EVENT_MAP, EVENTS, METRIC_DISPLAY_NAME, SERVICES, SERVICES_MAPPING, VIOLIN_DATA
+from dashboard import dash_data
+from dashboard.dash_data import EVENT_CATEGORIES, EVENTS, METRIC_DISPLAY_NAME, METRIC_INDEX, service_label
+from dashboard.figure_base import freeze_figure
 from dashboard.style import CHART_COLORS, PLOTLY_TEMPLATE, VIOLIN_CHART_COLORS
 
 
+def _service_colors() -> dict[str, str]:
+    """Chart colour of every service of the data, in SERVICES order."""
+    return {service: CHART_COLORS[i % len(CHART_COLORS)] for i, service in enumerate(dash_data.SERVICES)}
+
+
 def _calculate_violin_offsets(selected_services, total_group_width=0.8):
     """
     Calculate x-axis positioning offsets for violin plots.
@@ -19,6 +30,121 @@ def _calculate_violin_offsets(selected_services, total_group_width=0.8):
     return service_offsets, violin_width
 
 
+# ============================================
+# SERVER-SIDE DENSITIES
+# ============================================
+# The browser used to receive every (service, week) row and compute the kernel
+# densities itself. The densities, quartiles, fences and means are now computed here
+# per (service, event) with the rules of plotly.js violins (Gaussian kernel, Silverman
+# bandwidth, "soft" span of two bandwidths past the data, linear quartiles), and each
+# violin is drawn as a filled outline plus a box with precomputed statistics. The
+# payload grows with KDE_POINTS, not with the number of weeks.
+#
+# A filled scatter only hovers (and clicks) on its vertices, while go.Violin reacted
+# anywhere inside. An invisible bar over every violin restores that: bars hover on
+# their whole area, and their x (event code plus the service offset) decodes to the
+# event like the box's does, which keeps the click-to-filter interaction.
+
+# Maximum density samples per violin (plotly.js samples every third of a bandwidth)
+KDE_POINTS = 100
+# Inner box width relative to the violin, as in plotly.js
+BOX_WIDTH_FRACTION = 0.25
+OUTLINE_DECIMALS = 3
+BOX_STATS = ["q1", "median", "q3", "lowerfence", "upperfence", "mean"]
+
+
+def _kde_curve(values: np.ndarray) -> tuple[np.ndarray, np.ndarray] | None:
+    """Gaussian KDE of one violin on its soft span, or None when all values are equal."""
+    n = len(values)
+    q1, q3 = np.quantile(values, [0.25, 0.75])
+    value_span = values.max() - values.min()
+    if not value_span:
+        return None
+
+    silverman = 1.059 * min(values.std(ddof=1), (q3 - q1) / 1.349) * n**-0.2
+    bandwidth = max(silverman, value_span / 100)
+    low, high = values.min() - 2 * bandwidth, values.max() + 2 * bandwidth
+    steps = min(int(np.ceil((high - low) / (bandwidth / 3))), KDE_POINTS - 1)
+
+    grid = np.linspace(low, high, steps + 1)
+    z = (grid[:, None] - values[None, :]) / bandwidth
+    density = np.exp(-0.5 * z * z).sum(axis=1) / (n * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+@dash_data.cache_per_version(maxsize=64)
+def _violin_stats(data: dict, metric: str, week_range: tuple[int, int] | None) -> dict:
+    """Density curve and box statistics of every (service, event) with data.
+
+    Args:
+        data: Data snapshot (dash_data.snapshot()); results are cached per its version
+        metric: Cube metric shown on the y-axis
+        week_range: Inclusive integer week range, or None for the whole history
+
+    Returns:
+        {(service, event code): {"grid", "density", "q1", "median", "q3",
+        "lowerfence", "upperfence", "mean"}}
+    """
+    values = data["SERVICES_CUBE"][:, :, METRIC_INDEX[metric]]
+    codes = data["EVENT_CODES"]
+    if week_range is not None:
+        weeks = np.asarray(data["WEEKS"])
+        in_range = (weeks >= week_range[0]) & (weeks <= week_range[1])
+        values, codes = values[:, in_range], codes[:, in_range]
+
+    stats = {}
+    for s, service in enumerate(data["SERVICES"]):
+        finite = np.isfinite(values[s])
+        for code in range(len(EVENT_CATEGORIES)):
+            group = values[s][finite & (codes[s] == code)]
+            if not len(group):
+                continue
+            q1, median, q3 = np.quantile(group, [0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            curve = _kde_curve(group)
+            stats[service, code] = {
+                "grid": curve[0] if curve else None,
+                "density": curve[1] if curve else None,
+                "q1": q1,
+                "median": median,
+                "q3": q3,
+                "lowerfence": group[group >= q1 - 1.5 * iqr].min(),
+                "upperfence": group[group <= q3 + 1.5 * iqr].max(),
+                "mean": group.mean(),
+            }
+    return stats
+
+
+def _violin_outline(service_stats: dict, offset: float, violin_width: float) -> tuple[list, list, list]:
+    """Closed outlines and mean lines of one service's violins, separated by gaps.
+
+    Like plotly.js, every violin of a trace is scaled by the largest density of that
+    trace, so the widest violin spans violin_width.
+    """
+    curves = [stats for stats in service_stats.values() if stats["density"] is not None]
+    if not curves:
+        return [], [], []
+    half_width = violin_width / 2 / max(stats["density"].max() for stats in curves)
+
+    x, y, events = [], [], []
+    for code, stats in service_stats.items():
+        if stats["density"] is None:
+            continue
+        center = code + offset
+        width = stats["density"] * half_width
+        mean_width = np.interp(stats["mean"], stats["grid"], stats["density"]) * half_width
+        # Right side bottom-up, left side top-down, then the mean line
+        outline_x = np.concatenate(
+            [center + width, (center - width)[::-1], [None, center - mean_width, center + mean_width, None]]
+        )
+        outline_y = np.concatenate([stats["grid"], stats["grid"][::-1], [None, stats["mean"], stats["mean"], None]])
+        # Thousandths are below a pixel on both axes
+        x += [None if v is None else round(v, OUTLINE_DECIMALS) for v in outline_x]
+        y += [None if v is None else round(v, OUTLINE_DECIMALS) for v in outline_y]
+        events += [EVENT_CATEGORIES[code]] * len(outline_x)
+    return x, y, events
+
+
 def _add_violin_traces(
     fig,
     selected_services,
@@ -27,45 +153,74 @@ def _add_violin_traces(
     violin_width,
     metric,
     y_label,
+    week_range=None,
 ):
     """
     Add violin traces for ALL events (including None), split by service.
     """
+    stats = _violin_stats(dash_data.snapshot(), metric, week_range)
     for service in selected_services:
-        service_data = VIOLIN_DATA[VIOLIN_DATA["service"] == service]
+        service_stats = {code: s for (name, code), s in stats.items() if name == service}
 
-        if service_data.empty:
+        if not service_stats:
             continue
 
-        service_name = SERVICES_MAPPING.get(service, service)
+        service_name = service_label(service)
         color = service_colors.get(service, CHART_COLORS[0])
+        x, y, events = _violin_outline(service_stats, service_offsets[service], violin_width)
 
-        # Map events to integers and add offset
-        x_base = service_data["event"].map(EVENT_MAP)
-        x_values = x_base + service_offsets[service]
+        # Click targets over the violins (see SERVER-SIDE DENSITIES)
+        curves = {code: s for code, s in service_stats.items() if s["grid"] is not None}
+        fig.add_trace(
+            go.Bar(
+                x=[code + service_offsets[service] for code in curves],
+                base=[s["grid"][0] for s in curves.values()],
+                y=[s["grid"][-1] - s["grid"][0] for s in curves.values()],
+                width=violin_width,
+                name=service_name,
+                legendgroup=service_name,
+                showlegend=False,
+                marker=dict(color=color, opacity=0),
+                customdata=[EVENT_CATEGORIES[code] for code in curves],
+                hovertemplate=f"<b>{service_name}</b><br>Event: %{{customdata}}<extra></extra>",
+            )
+        )
 
         fig.add_trace(
-            go.Violin(
-                x=x_values,
-                y=service_data[metric],
+            go.Scatter(
+                x=x,
+                y=y,
+                mode="lines",
+                fill="toself",
                 name=service_name,
                 legendgroup=service_name,
-                scalegroup=service_name,
-                box_visible=True,
-                meanline_visible=True,
-                line_color=color,
+                line=dict(color=color, width=2),
                 fillcolor=color,
                 opacity=VIOLIN_CHART_COLORS["opacity"],
-                width=violin_width,
-                points=False,
-                # --- NEW: Add customdata for correct hover info ---
-                customdata=service_data["event"],
+                hoveron="points",
+                customdata=events,
                 hovertemplate=(
                     f"<b>{service_name}</b><br>" "Event: %{{customdata}}<br>" f"{y_label}: %{{y:.2f}}<extra></extra>"
                 ),
             )
         )
 
+        # Inner box plots from the precomputed quartiles
+        codes = list(service_stats)
+        fig.add_trace(
+            go.Box(
+                x=[code + service_offsets[service] for code in codes],
+                **{key: [service_stats[code][key] for code in codes] for key in BOX_STATS},
+                name=service_name,
+                legendgroup=service_name,
+                showlegend=False,
+                width=violin_width * BOX_WIDTH_FRACTION,
+                line_color=color,
+                fillcolor=color,
+                opacity=VIOLIN_CHART_COLORS["opacity"],
+            )
+        )
+
 
 def _configure_layout(fig, y_label, unique_events):
     """
@@ -80,6 +235,8 @@ def _configure_layout(fig, y_label, unique_events):
         xaxis_title="Event Type",
         yaxis_title=y_label,
         violinmode="overlay",
+        boxmode="overlay",
+        barmode="overlay",
         xaxis=dict(
             tickmode="array",
             tickvals=list(range(len(unique_events))),
@@ -88,18 +245,21 @@ def _configure_layout(fig, y_label, unique_events):
     )
 
 
-def create_violin_chart(metric: str, selected_services: list[str]) -> go.Figure:
+def create_violin_chart(
+    metric: str, selected_services: list[str], week_range: tuple[int, int] | None = None
+) -> go.Figure:
     """Create violin chart using real data, grouped by Event.
 
     Args:
         metric: Metric to display on y-axis
         selected_services: List of services to display
+        week_range: Inclusive integer week range of the samples (whole history when None)
     """
     # Calculate metric and get y-axis label
     y_label = METRIC_DISPLAY_NAME[metric]
 
     # Get service colors from style.py
-    service_colors = {service: CHART_COLORS[i % len(CHART_COLORS)] for i, service in enumerate(SERVICES_MAPPING.keys())}
+    service_colors = _service_colors()
 
     # Calculate violin positioning offsets
     service_offsets, violin_width = _calculate_violin_offsets(selected_services)
@@ -116,6 +276,7 @@ def create_violin_chart(metric: str, selected_services: list[str]) -> go.Figure:
         violin_width=violin_width,
         metric=metric,
         y_label=y_label,
+        week_range=week_range,
     )
 
     # Configure layout
@@ -124,13 +285,16 @@ def create_violin_chart(metric: str, selected_services: list[str]) -> go.Figure:
     return fig
 
 
-def update_violin_chart(fig: go.Figure, metric: str, selected_services: list[str]) -> go.Figure:
+def update_violin_chart(
+    fig: go.Figure, metric: str, selected_services: list[str], week_range: tuple[int, int] | None = None
+) -> go.Figure:
     """Update an existing violin chart figure instead of recreating it.
 
     Args:
         fig: Existing Plotly figure to update
         metric: Metric to display on y-axis
         selected_services: List of services to display
+        week_range: Inclusive integer week range of the samples (whole history when None)
 
     Returns:
         Updated Plotly figure
@@ -139,7 +303,7 @@ def update_violin_chart(fig: go.Figure, metric: str, selected_services: list[str
     y_label = METRIC_DISPLAY_NAME[metric]
 
     # Get service colors from style.py
-    service_colors = {service: CHART_COLORS[i % len(CHART_COLORS)] for i, service in enumerate(SERVICES_MAPPING.keys())}
+    service_colors = _service_colors()
 
     # Calculate violin positioning offsets
     service_offsets, violin_width = _calculate_violin_offsets(selected_services)
@@ -158,6 +322,7 @@ def update_violin_chart(fig: go.Figure, metric: str, selected_services: list[str
             violin_width=violin_width,
             metric=metric,
             y_label=y_label,
+            week_range=week_range,
         )
 
         # Configure layout
@@ -166,8 +331,16 @@ def update_violin_chart(fig: go.Figure, metric: str, selected_services: list[str
     return fig
 
 
-# Create pre-initialized figure with default values
-violin_fig = create_violin_chart(
-    metric="satisfaction_from_patients",
-    selected_services=SERVICES,
-)
+@functools.cache
+def get_violin_fig() -> go.Figure:
+    """Pre-initialized figure with default values (built on first use)."""
+    return create_violin_chart(
+        metric="satisfaction_from_patients",
+        selected_services=dash_data.SERVICES,
+    )
+
+
+@functools.cache
+def get_violin_base() -> str:
+    """Frozen default layout: callbacks build each response on a fresh clone of it."""
+    return freeze_figure(get_violin_fig(), with_data=False)
@@ -0,0 +1,21 @@
+# Pre-fork production server:
+#
+#     gunicorn -c gunicorn.conf.py app:server
+#
+# The app is imported once in the master (preload_app), which loads the data and
+# builds the default figures before the workers are forked. With
+# HOSPITOOLS_SHARED_DATA=1 (the default here) the data arrays are memory-mapped files
+# (dashboard.shared_data), so all workers read the same physical pages instead of
+# each holding a private copy. Leave HOSPITOOLS_LAZY_INIT unset: lazily loaded data
+# would be built again in every worker. With HOSPITOOLS_LIVE_INGEST=1 each worker
+# starts its own watcher on its first request and keeps the ingested rows private.
+
+import os
+
+# Read by dashboard.shared_data when the master imports the app
+os.environ.setdefault("HOSPITOOLS_SHARED_DATA", "1")
+
+bind = os.environ.get("HOSPITOOLS_BIND", "127.0.0.1:8050")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("HOSPITOOLS_WORKER_THREADS", "4"))
+preload_app = True
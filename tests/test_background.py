@@ -0,0 +1,182 @@
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Background mode is chosen when the app is imported, so it runs in its own process:
+# one call of every server callback, then the /metrics exposition on stdout
+CALL_EVERY_CALLBACK = """
+import json
+from app import server
+from benchmarks.dash_client import call_callback, find_dependency, load_dependencies, load_layout_ids
+
+client = server.test_client()
+dependencies = load_dependencies(client)
+layout_ids = load_layout_ids(client)
+values = {
+    "services-checklist.value": ["emergency"],
+    "metric-checklist.value": ["Patient Satisfaction"],
+    "time-range-store.data": {"start": 5, "end": 30},
+    "heatmap-attribute-radio.value": "age_bin",
+    "violin-metric-radio.value": "staff_morale",
+    "sidebar-overlay.style": {"left": "-350px"},
+    "time-range-config.data": {},
+}
+for output, changed in json.loads(CALLS):
+    status, _ = call_callback(client, find_dependency(dependencies, output), values, changed, layout_ids)
+    assert status == 200, (output, status)
+print(client.get("/metrics").get_data(as_text=True))
+"""
+
+CALLS = [
+    ('"type":"heatmap"', ["time-range-store.data"]),
+    ("line-chart.figure", ["metric-checklist.value"]),
+    ("violin-chart.figure", ["violin-metric-radio.value"]),
+    ("scatter-plot.figure", ["services-checklist.value"]),
+    ("data-version-store.data", ["data-version-interval.n_intervals"]),
+    ("sidebar-overlay.style", ["filter-button.n_clicks"]),
+]
+
+CALLBACKS = [
+    "update_heatmaps_cb",
+    "update_line_chart_cb",
+    "update_violin_chart_cb",
+    "update_scatter_plot_cb",
+    "check_data_version",
+    "toggle_sidebar",
+]
+VIEW_CALLBACKS = CALLBACKS[:4]
+
+
+def test_metrics_list_every_callback_in_background_mode(tmp_path):
+    pytest.importorskip("diskcache")
+    pytest.importorskip("multiprocess")
+    pytest.importorskip("psutil")
+    env = {
+        **os.environ,
+        "HOSPITOOLS_BACKGROUND_CALLBACKS": "1",
+        "HOSPITOOLS_BACKGROUND_CACHE_DIR": str(tmp_path),
+    }
+    script = f"CALLS = {json.dumps(CALLS)!r}\n" + CALL_EVERY_CALLBACK
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stderr
+    exposition = result.stdout
+
+    for callback_id in CALLBACKS:
+        assert f'hospitools_callback_duration_seconds_count{{callback="{callback_id}"}} 1' in exposition
+        assert f'hospitools_callback_cpu_seconds_count{{callback="{callback_id}"}} 1' in exposition
+    for callback_id in VIEW_CALLBACKS:
+        assert f'hospitools_callback_response_bytes_count{{callback="{callback_id}"}} 1' in exposition
+        assert f'hospitools_callback_compressed_bytes_count{{callback="{callback_id}"}} 1' in exposition
+    # The heatmap, violin and scatter jobs built their figures in the worker's cache
+    assert "hospitools_figure_cache_misses_total 3" in exposition
+    assert "hospitools_figure_cache_entries 3" in exposition
+
+
+# ============================================
+# StoredResultManager against the installed Dash
+# ============================================
+
+
+@pytest.fixture
+def manager(tmp_path):
+    diskcache = pytest.importorskip("diskcache")
+    pytest.importorskip("multiprocess")
+    pytest.importorskip("psutil")
+    from dashboard.background import StoredResultManager
+
+    return StoredResultManager(diskcache.Cache(str(tmp_path)), cache_by=[lambda: "version"])
+
+
+def _double(value):
+    return value * 2
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _start(manager, fn, key, *args):
+    job_fn = manager.make_job_fn(fn, progress=False)
+    return manager.call_job_fn(key, job_fn, list(args), {})
+
+
+def _wait_exit(job):
+    import psutil
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if psutil.Process(job).status() == psutil.STATUS_ZOMBIE:
+                return
+        except psutil.NoSuchProcess:
+            return
+        time.sleep(0.01)
+    raise TimeoutError(job)
+
+
+def test_dash_is_the_supported_release():
+    import dash
+
+    from dashboard.background import SUPPORTED_DASH
+
+    assert dash.__version__.split(".")[:2] == SUPPORTED_DASH.split(".")
+
+
+def test_overridden_methods_keep_their_signatures():
+    pytest.importorskip("diskcache")
+    from dash import DiskcacheManager
+
+    from dashboard.background import StoredResultManager
+
+    for name in ("call_job_fn", "make_job_fn", "get_result", "terminate_job", "job_running"):
+        overridden = inspect.signature(getattr(StoredResultManager, name))
+        assert overridden == inspect.signature(getattr(DiskcacheManager, name)), name
+
+
+def test_job_result_and_report(manager):
+    job = _start(manager, _double, "key", 21)
+    assert job > 0
+    _wait_exit(job)
+
+    # Finished but not collected: still running for Dash, so its next poll gets the result
+    assert manager.job_running(job)
+    assert manager.get_result("key", job) == 42
+    assert manager.handle.get("key-report") == {"callback_id": "_double"}
+    assert not manager.job_running(job)
+
+
+def test_stored_result_starts_no_job(manager):
+    manager.handle.set("key", 42)
+    job = _start(manager, _double, "key", 1)
+    assert job == 0
+    assert not manager.job_running(job)
+    manager.terminate_job(job)
+    assert manager.get_result("key", job) == 42
+    assert manager.result_ready("key")
+
+
+def test_error_results_are_not_kept(manager):
+    manager.handle.set("key", {"background_callback_error": {"msg": "failed", "tb": ""}})
+    assert "background_callback_error" in manager.get_result("key", None)
+    assert not manager.result_ready("key")
+
+
+def test_terminate_job_kills_the_process(manager):
+    job = _start(manager, _sleep, "key", 30)
+    assert manager.job_running(job)
+    manager.terminate_job(job)
+    _wait_exit(job)
+    assert not manager.job_running(job)
+    assert not manager.result_ready("key")
+    manager.terminate_job(job)  # Already gone
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.bench_callbacks import write_scaled_data
+from dashboard.dash_data import START_DATE
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The data directory is read when dash_data is imported, so the scaled data is loaded
+# in its own process. At 1000x the history runs about a thousand years past 2025,
+# beyond what datetime64[ns] can hold (2262). Prints the week count, the last date,
+# whether the dates and every time level of the pyramid keep increasing, and the
+# level the line chart picks for the whole history
+SCALED_DATES = """
+import json
+import numpy as np
+from dashboard import dash_data
+from dashboard.linechart import select_time_view
+
+current = dash_data.snapshot()
+dates = np.array([date.toordinal() for date in current["DATES"]])
+levels = {
+    level: bool((np.diff(buckets["first_week"]) > 0).all() and (np.diff(buckets["x"]) > 0).all())
+    for level, buckets in current["TIME_PYRAMID"].items()
+}
+view = select_time_view([current["WEEKS"][0], current["WEEKS"][-1]])
+print(
+    json.dumps(
+        {
+            "weeks": len(current["WEEKS"]),
+            "last_year": current["DATES"][-1].year,
+            "dates_increase": bool((np.diff(dates) == 7).all()),
+            "levels_increase": levels,
+            "years": len(current["TIME_PYRAMID"]["year"]["x"]),
+            "view": [view["level"], bool((np.diff(view["x"]) > 0).all())],
+        }
+    )
+)
+"""
+
+
+def test_dates_stay_monotonic_at_1000x(tmp_path):
+    write_scaled_data(1000, tmp_path)
+    env = {key: value for key, value in os.environ.items() if not key.startswith("HOSPITOOLS_")}
+    env["HOSPITOOLS_DATA_DIR"] = str(tmp_path)
+    result = subprocess.run(
+        [sys.executable, "-c", SCALED_DATES],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    loaded = json.loads(result.stdout.splitlines()[-1])
+
+    assert loaded["weeks"] == 52 * 1000
+    assert loaded["last_year"] > 2262
+    assert loaded["dates_increase"]
+    assert loaded["levels_increase"] == {"week": True, "month": True, "quarter": True, "year": True}
+    # One year bucket per calendar year from START_DATE on
+    assert loaded["years"] == loaded["last_year"] - START_DATE.year + 1
+    assert loaded["view"] == ["year", True]
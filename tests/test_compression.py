@@ -0,0 +1,88 @@
+import gzip
+import json
+
+import flask
+import pytest
+
+from dashboard import compression
+from dashboard.compression import COMPRESS_MIN_BYTES, register_compression
+
+needs_brotli = pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSION", True)
+    server = flask.Flask(__name__)
+
+    @server.route("/json/<int:size>")
+    def sized_json(size):
+        # A JSON string of exactly size bytes
+        return flask.Response(json.dumps("x" * (size - 2)), mimetype="application/json")
+
+    @server.route("/encoded")
+    def encoded():
+        body = gzip.compress(json.dumps("x" * 4000).encode())
+        return flask.Response(body, mimetype="application/json", headers={"Content-Encoding": "gzip"})
+
+    @server.route("/png")
+    def png():
+        return flask.Response(b"\x89PNG" + bytes(4000), mimetype="image/png")
+
+    register_compression(server)
+    return server.test_client()
+
+
+def test_threshold(client):
+    small = client.get(f"/json/{COMPRESS_MIN_BYTES - 1}", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert len(small.data) == COMPRESS_MIN_BYTES - 1
+
+    large = client.get(f"/json/{COMPRESS_MIN_BYTES}", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert len(gzip.decompress(large.data)) == COMPRESS_MIN_BYTES
+    # Both vary with the request's encodings, compressed or not
+    assert small.headers["Vary"] == large.headers["Vary"] == "Accept-Encoding"
+
+
+@needs_brotli
+def test_brotli_is_preferred_over_gzip(client):
+    response = client.get("/json/5000", headers={"Accept-Encoding": "gzip, deflate, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert compression.brotli.decompress(response.data) == json.dumps("x" * 4998).encode()
+
+    refused = client.get("/json/5000", headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert refused.headers["Content-Encoding"] == "gzip"
+
+
+def test_gzip_without_brotli(client, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = client.get("/json/5000", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+def test_identity_when_nothing_is_accepted(client):
+    for headers in ({}, {"Accept-Encoding": "identity"}, {"Accept-Encoding": "gzip;q=0"}):
+        response = client.get("/json/5000", headers=headers)
+        assert "Content-Encoding" not in response.headers
+        assert len(response.data) == 5000
+        assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_encoded_and_binary_responses_are_left_alone(client):
+    encoded = client.get("/encoded", headers={"Accept-Encoding": "gzip, br"})
+    assert encoded.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(encoded.data)) == "x" * 4000
+
+    png = client.get("/png", headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in png.headers
+    assert png.data.startswith(b"\x89PNG")
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSION", False)
+    server = flask.Flask(__name__)
+    server.add_url_rule("/big", "big", lambda: flask.Response("x" * 5000, mimetype="text/plain"))
+    register_compression(server)
+    response = server.test_client().get("/big", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
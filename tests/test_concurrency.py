@@ -0,0 +1,90 @@
+import json
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import server
+from benchmarks.dash_client import call_callback, find_dependency, load_dependencies, load_layout_ids
+from dashboard.figure_cache import FIGURE_CACHE
+
+# Every scenario is first answered sequentially to get a reference response; then all
+# scenarios are replayed in random order from a thread pool and every response must
+# match its reference. Shared, mutated figures show up as mismatches. The concurrent
+# phase runs with a figure cache that keeps nothing, so every figure is built under
+# threads instead of being answered from what the reference pass cached.
+
+THREADS = 16
+SCENARIOS = 40
+ROUNDS = 3
+SEED = 65
+
+SERVICE_CHOICES = [["emergency"], ["ICU", "surgery"], ["general_medicine"], []]
+METRIC_CHOICES = [["Patient Satisfaction"], ["Staff Morale"], ["Patient Satisfaction", "Staff Morale"]]
+TIME_RANGES = [None, {"start": 5, "end": 30}, {"start": 20.4, "end": 48.7}]
+VIOLIN_CLICKS = [None, {"points": [{"x": 0.1}]}, {"points": [{"x": 2.2}]}]
+# Lasso payloads as the splom sends them: a trace (service) and a row within it
+SCATTER_SELECTIONS = [
+    None,
+    {"points": [{"curveNumber": 0, "pointIndex": 3}, {"curveNumber": 2, "pointIndex": 12}]},
+    {"points": [{"curveNumber": 3, "pointIndex": i} for i in range(10, 30)]},
+]
+CALLS = [
+    ('"type":"heatmap"', ["time-range-store.data"]),
+    ("line-chart.figure", ["scatter-plot.selectedData"]),
+    ("line-chart.figure", ["violin-chart.clickData"]),
+    ("line-chart.figure", ["metric-checklist.value"]),
+    ("violin-chart.figure", ["violin-metric-radio.value"]),
+    ("scatter-plot.figure", ["violin-chart.clickData"]),
+    ("scatter-plot.figure", ["services-checklist.value"]),
+]
+
+
+def build_scenarios(count: int, seed: int) -> list[tuple[str, dict, list[str]]]:
+    """Draw random (output, input values, changed props) scenarios for every view callback."""
+    rng = random.Random(seed)
+    scenarios = []
+    for _ in range(count):
+        values = {
+            "services-checklist.value": rng.choice(SERVICE_CHOICES),
+            "metric-checklist.value": rng.choice(METRIC_CHOICES),
+            "time-range-store.data": rng.choice(TIME_RANGES),
+            "heatmap-attribute-radio.value": rng.choice(["age_bin", "length_of_stay"]),
+            "violin-metric-radio.value": rng.choice(["satisfaction_from_patients", "staff_morale", "ratio"]),
+            "violin-chart.clickData": rng.choice(VIOLIN_CLICKS),
+            "scatter-plot.selectedData": rng.choice(SCATTER_SELECTIONS),
+        }
+        output, changed = rng.choice(CALLS)
+        scenarios.append((output, values, changed))
+    return scenarios
+
+
+def test_concurrent_responses_match_sequential_ones(monkeypatch):
+    dependencies = load_dependencies(server.test_client())
+    layout_ids = load_layout_ids(server.test_client())
+    scenarios = build_scenarios(SCENARIOS, SEED)
+    local = threading.local()
+
+    def run(index: int):
+        if not hasattr(local, "client"):
+            local.client = server.test_client()
+        output, values, changed = scenarios[index]
+        status, body = call_callback(local.client, find_dependency(dependencies, output), values, changed, layout_ids)
+        return status, json.loads(body) if status == 200 else None
+
+    reference = [run(i) for i in range(len(scenarios))]
+    assert all(status in (200, 204) for status, _ in reference)
+
+    # Nothing fits in a zero budget: every cached view is built again under threads
+    monkeypatch.setattr(FIGURE_CACHE, "max_bytes", 0)
+    FIGURE_CACHE.clear()
+    hits, misses = FIGURE_CACHE.hits, FIGURE_CACHE.misses
+    jobs = list(range(len(scenarios))) * ROUNDS
+    random.Random(SEED).shuffle(jobs)
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(run, jobs))
+
+    assert FIGURE_CACHE.hits == hits
+    # The line chart is not cached; every other request built its figure
+    assert FIGURE_CACHE.misses - misses == sum(scenarios[index][0] != "line-chart.figure" for index in jobs)
+    mismatched = [scenarios[index][:1] for index, result in zip(jobs, results) if result != reference[index]]
+    assert mismatched == []
@@ -0,0 +1,170 @@
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard import dash_data
+from dashboard.scatterplot_matrix import _selection_index, decode_selection
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_version_cache_keys_on_the_snapshot_passed():
+    builds = []
+
+    @dash_data.cache_per_version(maxsize=2)
+    def rows(current, scale):
+        builds.append(current["DATA_VERSION"])
+        return current["rows"] * scale
+
+    old, new = {"DATA_VERSION": 1, "rows": 10}, {"DATA_VERSION": 2, "rows": 20}
+    assert rows(old, 2) == 20
+    assert rows(new, 2) == 40
+    # Still answered from the data of each version, whatever was built last
+    assert rows(old, 2) == 20
+    assert builds == [1, 2]
+    rows(new, 3)
+    rows(new, 2)  # Least recently used: evicted by the two others
+    assert builds == [1, 2, 2, 2]
+
+
+def test_selection_index_matches_the_snapshot():
+    current = dash_data.snapshot()
+    assert current["DATA_VERSION"] == dash_data.DATA_VERSION
+    row_ids, weeks = _selection_index(current)
+    data = current["SCATTER_DATA"]
+    assert (data["Week"].to_numpy()[row_ids] == weeks).all()
+
+    points = [{"curveNumber": 1, "pointIndex": 0}, {"curveNumber": 9, "pointIndex": 0}]
+    selected_rows, _ = decode_selection(points)
+    assert selected_rows.tolist() == [row_ids[1, 0]]
+
+
+def test_scatter_frame_is_a_view_of_the_cube_matching_the_table():
+    current = dash_data.snapshot()
+    scatter = current["SCATTER_DATA"]
+    cube = current["SERVICES_CUBE"]
+    for column in dash_data.SCATTER_COLUMNS.values():
+        assert np.shares_memory(scatter[column].to_numpy(), cube)
+
+    # The frame as it used to be derived from the weekly table, in service-major order
+    table = current["SERVICES_DATA"]
+    admitted = table["patients_admitted"].replace(0, 1)
+    expected = pd.DataFrame(
+        {
+            "Week": table["week"].astype(np.int64),
+            "Category": table["service"].astype(str).map(dash_data.service_label),
+            "Morale": table["staff_morale"].astype(float),
+            "Satisfaction": table["satisfaction_from_patients"].astype(float),
+            "Refused/Admitted Ratio": table["patients_refused"] / admitted,
+            "Staff/Patient Ratio": (table["doctors_count"] + table["nurses_count"]) / admitted,
+            "event": table["event"].astype(str),
+        }
+    )
+    order = [dash_data.service_label(service) for service in current["SERVICES"]]
+    expected["Category"] = pd.Categorical(expected["Category"], categories=order)
+    expected = expected.sort_values(["Category", "Week"], ignore_index=True)
+    actual = scatter.assign(event=scatter["event"].astype(str))
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_categorical=False)
+
+
+def _crosstab_counts(patients, row_attribute, services, week_range) -> list:
+    # The crosstab of the filtered patients the heatmaps were first drawn from
+    if week_range is not None:
+        weeks = patients["week"]
+        patients = patients[(weeks >= math.ceil(week_range[0])) & (weeks <= math.floor(week_range[1]))]
+    if services:
+        patients = patients[patients["service"].isin(services)]
+    table = pd.crosstab(patients[row_attribute], patients["satisfaction_bin"])
+    x_labels, _ = dash_data.get_heatmap_labels(row_attribute)
+    table = table.reindex(index=dash_data.HEATMAP_ROW_BINS[row_attribute], columns=x_labels, fill_value=0)
+    return table.fillna(0).astype(int).to_numpy().tolist()
+
+
+@pytest.mark.parametrize("row_attribute", list(dash_data.HEATMAP_ROW_BINS))
+def test_heatmap_counts_match_a_crosstab(row_attribute):
+    current = dash_data.snapshot()
+    patients = current["PATIENTS_DATA"]
+    first, last = current["HEATMAP_WEEKS"][0], current["HEATMAP_WEEKS"][-1]
+    rng = random.Random(65)
+    week_ranges = [None, (first - 10, last + 10), (20.4, 20.6), (30, 12), (last + 1, last + 5), (first, first)]
+    for _ in range(20):
+        week_ranges.append(tuple(sorted(rng.uniform(first - 3, last + 3) for _ in range(2))))
+    service_choices = [None, [current["SERVICES"][0]], current["SERVICES"][1:3], current["SERVICES"], ["no_such_ward"]]
+
+    for week_range in week_ranges:
+        counts = dash_data.get_heatmap_counts(row_attribute, week_range)
+        for s, service in enumerate(current["SERVICES"]):
+            assert counts[s].tolist() == _crosstab_counts(patients, row_attribute, [service], week_range)
+        for services in service_choices:
+            z_values, _, _ = dash_data.get_heatmap_data(row_attribute, services, week_range)
+            assert z_values == _crosstab_counts(patients, row_attribute, services, week_range), (week_range, services)
+
+
+def test_services_come_from_the_data():
+    services = pd.DataFrame({"service": ["ward_7", "surgery", "emergency", "ward_7"]})
+    patients = pd.DataFrame({"service": ["ICU", "ward_2", None]})
+    assert dash_data._data_services(services, patients) == ["emergency", "ICU", "surgery", "ward_7", "ward_2"]
+    assert [dash_data.service_label(s) for s in ("general_medicine", "ward_12")] == ["General Medicine", "Ward 12"]
+
+
+# The data directory is read when dash_data is imported, so this runs in its own
+# process on the directory set in the environment. Prints the services, whether the
+# heatmap counts of every service add up to its patients, and what the page shows.
+MANY_SERVICES = """
+import json
+from app import server
+from benchmarks.dash_client import layout_ids, layout_values
+from dashboard import dash_data
+from dashboard.scatterplot_matrix import get_scatterplot_fig
+
+current = dash_data.snapshot()
+patients = current["PATIENTS_DATA"]["service"].value_counts()
+counts = dash_data.get_heatmap_counts("age_bin").sum(axis=(1, 2))
+layout = server.test_client().get("/_dash-layout").get_json()
+print(
+    json.dumps(
+        {
+            "services": current["SERVICES"],
+            "patients_match": [int(count) == int(patients[s]) for s, count in zip(current["SERVICES"], counts)],
+            "cube_services": len(current["SERVICES_CUBE"]),
+            "options": [option["value"] for option in layout_values(layout)["services-checklist.options"]],
+            "heatmaps": [i["service"] for i in layout_ids(layout) if isinstance(i, dict) and i["type"] == "heatmap"],
+            "scatter_traces": [trace.name for trace in get_scatterplot_fig().data],
+        }
+    )
+)
+"""
+
+
+def test_every_service_of_the_data_is_shown(tmp_path):
+    from benchmarks.synthetic_data import service_names, write_dataset
+
+    write_dataset(tmp_path, n_services=12, n_patients=3000)
+    env = {key: value for key, value in os.environ.items() if not key.startswith("HOSPITOOLS_")}
+    env["HOSPITOOLS_DATA_DIR"] = str(tmp_path)
+    result = subprocess.run(
+        [sys.executable, "-c", MANY_SERVICES],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    shown = json.loads(result.stdout.splitlines()[-1])
+
+    services = service_names(12)
+    assert sorted(shown["services"]) == sorted(services)
+    assert shown["services"][4:] == services[4:]
+    assert shown["patients_match"] == [True] * 12
+    assert shown["cube_services"] == 12
+    assert shown["options"] == shown["heatmaps"] == shown["services"]
+    assert shown["scatter_traces"][4:] == [f"Ward {i}" for i in range(5, 13)]
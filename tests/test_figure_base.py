@@ -0,0 +1,46 @@
+import json
+
+import pytest
+from plotly import graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+from dashboard import dash_data
+from dashboard.figure_base import SKIP_REVALIDATION, clone_figure, trusted_trace
+from dashboard.heatmap import get_heatmap_bases
+from dashboard.linechart import get_linechart_base
+from dashboard.scatterplot_matrix import _category_traces, get_scatterplot_base
+from dashboard.violinchart import get_violin_base
+
+
+def _bases():
+    return [get_linechart_base(), get_scatterplot_base(), get_violin_base(), *get_heatmap_bases().values()]
+
+
+def test_installed_plotly_is_supported():
+    # Otherwise every clone is validated again: correct, but the fast path is untested
+    assert SKIP_REVALIDATION
+
+
+def test_clone_matches_the_public_constructor():
+    for frozen in _bases():
+        assert clone_figure(frozen).to_plotly_json() == go.Figure(json.loads(frozen)).to_plotly_json()
+
+
+def test_clone_validates_later_updates():
+    fig = clone_figure(get_heatmap_bases()[dash_data.SERVICES[0]])
+    fig.update_layout(xaxis_title="Week")
+    assert fig.layout.xaxis.title.text == "Week"
+    with pytest.raises(ValueError):
+        fig.update_layout(not_a_property=1)
+    with pytest.raises(ValueError):
+        fig.data[0].update(not_a_property=1)
+
+
+def test_trusted_trace_matches_the_public_constructor():
+    for static in _category_traces(dash_data.snapshot()):
+        trace = trusted_trace(go.Splom, static)
+        # Arrays compared through their JSON, as the browser gets them
+        as_json = [json.dumps(t.to_plotly_json(), cls=PlotlyJSONEncoder) for t in (trace, go.Splom(static))]
+        assert as_json[0] == as_json[1]
+        with pytest.raises(ValueError):
+            trace.update(not_a_property=1)
@@ -0,0 +1,110 @@
+import pytest
+from plotly import graph_objects as go
+
+from dashboard import dash_data
+from dashboard.figure_cache import FigureCache
+from dashboard.serialization import dumps
+
+
+def _value(size: int) -> str:
+    # Serialized as the string and its two quotes
+    return "x" * (size - 2)
+
+
+@pytest.fixture
+def cache() -> FigureCache:
+    dash_data.load_data()
+    return FigureCache(max_bytes=100)
+
+
+def _get(cache: FigureCache, key: str, size: int = 30) -> list[str]:
+    built = []
+
+    def build():
+        built.append(key)
+        return _value(size)
+
+    cache.get_or_build(key, build)
+    return built
+
+
+def test_hits_return_private_copies(cache):
+    cache.max_bytes = 10_000
+    fig = go.Figure(go.Scatter(x=[1, 2, 3], y=[0.5, 1.25, 2.0]))
+    first = cache.get_or_build("fig", lambda: fig)
+    second = cache.get_or_build("fig", lambda: pytest.fail("built twice"))
+    assert first == second and first is not second
+    first["data"][0]["x"] = None
+    assert cache.get_or_build("fig", lambda: None) == second
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_least_recently_used_is_evicted_first(cache):
+    for key in "abc":
+        _get(cache, key)
+    _get(cache, "a")  # Now b is the least recently used
+    assert _get(cache, "d") == ["d"]
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 4,
+        "evictions": 1,
+        "entries": 3,
+        "bytes": 90,
+        "max_bytes": 100,
+    }
+    assert _get(cache, "b") == ["b"]
+    assert _get(cache, "a") == []
+
+
+def test_byte_budget(cache):
+    _get(cache, "a", 60)
+    _get(cache, "b", 60)  # Both don't fit: a goes
+    assert (cache.stats()["entries"], cache.stats()["bytes"], cache.evictions) == (1, 60, 1)
+    # A result larger than the whole budget is built every time and evicts nothing
+    assert _get(cache, "big", 101) == ["big"]
+    assert _get(cache, "big", 101) == ["big"]
+    assert (cache.stats()["entries"], cache.evictions) == (1, 1)
+    assert _get(cache, "b", 60) == []
+
+
+def test_new_data_version_drops_every_entry(cache, monkeypatch):
+    _get(cache, "a")
+    _get(cache, "b")
+    monkeypatch.setattr(dash_data, "DATA_VERSION", dash_data.DATA_VERSION + 1)
+    assert _get(cache, "a") == ["a"]
+    assert cache.stats()["entries"] == 1 and cache.evictions == 0
+
+
+def test_result_built_during_a_reload_is_not_served_after_it(cache, monkeypatch):
+    def build():
+        monkeypatch.setattr(dash_data, "DATA_VERSION", dash_data.DATA_VERSION + 1)
+        return _value(30)
+
+    cache.get_or_build("a", build)
+    assert _get(cache, "a") == ["a"]
+
+
+def test_capture_and_merge(cache, monkeypatch):
+    _get(cache, "a")
+    with cache.capture() as captured:
+        _get(cache, "a")
+        _get(cache, "b")
+    _get(cache, "c")  # Not captured
+    assert captured == {
+        "version": dash_data.DATA_VERSION,
+        "hits": 1,
+        "misses": 1,
+        "entries": [("b", dumps(_value(30)))],
+    }
+
+    # The worker that collects the job's result gets its counts and entries
+    worker = FigureCache(max_bytes=100)
+    worker.merge(captured)
+    assert (worker.hits, worker.misses) == (1, 1)
+    assert _get(worker, "b") == []
+
+    # Entries built from other data only count
+    stale = FigureCache(max_bytes=100)
+    monkeypatch.setattr(dash_data, "DATA_VERSION", dash_data.DATA_VERSION + 1)
+    stale.merge(captured)
+    assert (stale.hits, stale.misses, stale.stats()["entries"]) == (1, 1, 0)
@@ -0,0 +1,201 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from dashboard.dash_data import SERVICES_LOAD_COLUMNS
+from dashboard.ingest import SERVICES_TABLE, TableFeed, TableRewritten
+
+ROOT = Path(__file__).resolve().parent.parent
+SHIPPED = ROOT / "data"
+
+
+def _services_csv() -> str:
+    return (SHIPPED / f"{SERVICES_TABLE}.csv").read_text()
+
+
+# ============================================
+# TableFeed
+# ============================================
+
+
+def test_feed_reads_only_complete_new_lines(tmp_path):
+    header, *lines = _services_csv().splitlines(keepends=True)
+    path = tmp_path / f"{SERVICES_TABLE}.csv"
+    path.write_text(header + "".join(lines[:10]))
+    feed = TableFeed(tmp_path, SERVICES_TABLE, SERVICES_LOAD_COLUMNS)
+    assert len(feed.read_new()) == 10
+    assert feed.read_new() is None
+
+    # A half-written row waits until its line is complete
+    with open(path, "a") as file:
+        file.write("".join(lines[10:15]) + lines[15][:12])
+    assert feed.read_new()["week"].tolist() == [int(line.split(",")[0]) for line in lines[10:15]]
+    with open(path, "a") as file:
+        file.write(lines[15][12:])
+    new = feed.read_new()
+    assert len(new) == 1 and new["service"].iloc[0] == lines[15].split(",")[1]
+
+
+def test_feed_reads_part_files_in_name_order(tmp_path):
+    header, *lines = _services_csv().splitlines(keepends=True)
+    (tmp_path / f"{SERVICES_TABLE}.csv").write_text(header + "".join(lines[:4]))
+    feed = TableFeed(tmp_path, SERVICES_TABLE, SERVICES_LOAD_COLUMNS)
+    feed.read_new()
+
+    (tmp_path / f"{SERVICES_TABLE}-0002.csv").write_text(header + "".join(lines[8:12]))
+    (tmp_path / f"{SERVICES_TABLE}-0001.csv").write_text(header + "".join(lines[4:8]))
+    (tmp_path / f"{SERVICES_TABLE}-notes.txt").write_text("not a table")
+    new = feed.read_new()
+    expected = pd.read_csv(SHIPPED / f"{SERVICES_TABLE}.csv", usecols=SERVICES_LOAD_COLUMNS).iloc[4:12]
+    assert new["staff_morale"].tolist() == expected["staff_morale"].tolist()
+
+
+def test_feed_raises_when_a_file_shrinks(tmp_path):
+    header, *lines = _services_csv().splitlines(keepends=True)
+    path = tmp_path / f"{SERVICES_TABLE}.csv"
+    path.write_text(header + "".join(lines[:10]))
+    feed = TableFeed(tmp_path, SERVICES_TABLE, SERVICES_LOAD_COLUMNS)
+    feed.read_new()
+    path.write_text(header + "".join(lines[:5]))
+    with pytest.raises(TableRewritten):
+        feed.read_new()
+
+
+# ============================================
+# Live ingestion against a full reload
+# ============================================
+
+# Live mode and the data directory are read when dash_data is imported, so this runs
+# in its own process. The data directory given as argument holds the shipped data
+# enlarged to two years, of which only the weeks before 40 are in the base files; the
+# rest comes in as an append that crosses the year boundary (with a half-written last
+# line), its completion, and a part file. After every step the snapshot must equal a
+# full load of the same files. Then rows of a new service come in and a base file is
+# rewritten shorter, which both rebuild everything. Prints the row count returned by
+# every step.
+INGEST_STEPS = """
+import json, sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from dashboard import dash_data
+from dashboard.ingest import PATIENTS_TABLE, SERVICES_TABLE
+
+data_dir = Path(sys.argv[1])
+tables = {table: pd.read_csv(data_dir / "full" / f"{table}.csv") for table in (SERVICES_TABLE, PATIENTS_TABLE)}
+
+
+def rows(table, first, last):
+    frame = tables[table]
+    return frame[(frame["week"] >= first) & (frame["week"] <= last)].to_csv(index=False)
+
+
+def append(name, text):
+    with open(data_dir / name, "a") as file:
+        file.write(text)
+
+
+def full_load():
+    feeds = dash_data._feeds
+    try:
+        return dash_data._build_data()
+    finally:
+        dash_data._feeds = feeds
+
+
+def assert_same(current, expected):
+    for name in ("SERVICES", "WEEKS", "DATES", "HEATMAP_WEEKS", "DATA_ROWS"):
+        assert current[name] == expected[name], name
+    np.testing.assert_array_equal(current["SERVICES_CUBE"], expected["SERVICES_CUBE"])
+    np.testing.assert_array_equal(current["EVENT_CODES"], expected["EVENT_CODES"])
+    for attribute, prefix in expected["HEATMAP_PREFIX_COUNTS"].items():
+        np.testing.assert_array_equal(current["HEATMAP_PREFIX_COUNTS"][attribute], prefix)
+    for level, buckets in expected["TIME_PYRAMID"].items():
+        for key, values in buckets.items():
+            np.testing.assert_allclose(current["TIME_PYRAMID"][level][key], values, err_msg=f"{level} {key}")
+    pd.testing.assert_frame_equal(current["SCATTER_DATA"], expected["SCATTER_DATA"])
+    for name in ("SERVICES_DATA", "PATIENTS_DATA"):
+        pd.testing.assert_frame_equal(
+            current[name].reset_index(drop=True).astype(str), expected[name].reset_index(drop=True).astype(str)
+        )
+
+
+counts = []
+dash_data.load_data()
+assert_same(dash_data.snapshot(), full_load())
+
+# Weeks 40-70, the last patient line half-written
+patients = rows(PATIENTS_TABLE, 40, 70).split("\\n", 1)[1]
+append(f"{SERVICES_TABLE}.csv", rows(SERVICES_TABLE, 40, 70).split("\\n", 1)[1])
+append(f"{PATIENTS_TABLE}.csv", patients[:-20])
+counts.append(dash_data.ingest_new_rows())
+assert_same(dash_data.snapshot(), full_load())
+
+append(f"{PATIENTS_TABLE}.csv", patients[-20:])
+counts.append(dash_data.ingest_new_rows())
+assert_same(dash_data.snapshot(), full_load())
+
+# Weeks 71-104 as part files
+(data_dir / f"{SERVICES_TABLE}-0001.csv").write_text(rows(SERVICES_TABLE, 71, 104))
+(data_dir / f"{PATIENTS_TABLE}-0001.csv").write_text(rows(PATIENTS_TABLE, 71, 104))
+counts.append(dash_data.ingest_new_rows())
+assert_same(dash_data.snapshot(), full_load())
+counts.append(dash_data.ingest_new_rows())
+
+# A new ward, with three weeks copied from the emergency service
+ward = tables[SERVICES_TABLE].query("service == 'emergency' and week <= 3").assign(service="ward_5")
+(data_dir / f"{SERVICES_TABLE}-0002.csv").write_text(ward.to_csv(index=False))
+counts.append(dash_data.ingest_new_rows())
+assert dash_data.SERVICES[-1] == "ward_5"
+assert_same(dash_data.snapshot(), full_load())
+
+# Rewritten shorter: everything is read again
+(data_dir / f"{SERVICES_TABLE}.csv").write_text(rows(SERVICES_TABLE, 1, 20))
+counts.append(dash_data.ingest_new_rows())
+assert_same(dash_data.snapshot(), full_load())
+print(json.dumps(counts))
+"""
+
+
+def test_live_ingestion_matches_a_full_load(tmp_path):
+    from benchmarks.bench_callbacks import write_scaled_data
+
+    full = tmp_path / "full"
+    write_scaled_data(2, full)
+    tables = {path.name: pd.read_csv(path) for path in full.glob("*.csv")}
+    for name, frame in tables.items():
+        frame[frame["week"] < 40].to_csv(tmp_path / name, index=False)
+
+    env = {key: value for key, value in os.environ.items() if not key.startswith("HOSPITOOLS_")}
+    env.update(HOSPITOOLS_DATA_DIR=str(tmp_path), HOSPITOOLS_LIVE_INGEST="1")
+    result = subprocess.run(
+        [sys.executable, "-c", INGEST_STEPS, str(tmp_path)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    counts = json.loads(result.stdout.splitlines()[-1])
+
+    services, patients = tables[f"{SERVICES_TABLE}.csv"], tables["df_patients_prepped.csv"]
+
+    def between(frame, first, last):
+        return int(((frame["week"] >= first) & (frame["week"] <= last)).sum())
+
+    assert counts == [
+        between(services, 40, 70) + between(patients, 40, 70) - 1,
+        1,
+        between(services, 71, 104) + between(patients, 71, 104),
+        0,
+        # The new ward loads everything again
+        len(services) + 3 + len(patients),
+        # The rewritten base file, the part files and every patient
+        between(services, 1, 20) + between(services, 71, 104) + 3 + len(patients),
+    ]
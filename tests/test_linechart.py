@@ -0,0 +1,148 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The data directory is read when dash_data is imported, so each dataset gets its own
+# process. Prints the trace types of the line chart (both metrics, all services) for
+# the x-axis range given as JSON; the stream graph is always "scatter"
+TRACE_TYPES = """
+import json, sys
+from dashboard.dash_data import SERVICES
+from dashboard.figure_base import clone_figure
+from dashboard.linechart import get_linechart_base, update_line_chart
+
+metrics = ["Patient Satisfaction", "Staff Morale"]
+fig = update_line_chart(clone_figure(get_linechart_base()), metrics, SERVICES, json.loads(sys.argv[1]))
+print(" ".join(sorted({trace.type for trace in fig.data})))
+"""
+
+
+def _trace_types(xaxis_range: list[float] | None, data_dir: Path | None = None) -> str:
+    # Default settings: no HOSPITOOLS_* variables from the calling environment
+    env = {key: value for key, value in os.environ.items() if not key.startswith("HOSPITOOLS_")}
+    if data_dir is not None:
+        env["HOSPITOOLS_DATA_DIR"] = str(data_dir)
+    result = subprocess.run(
+        [sys.executable, "-c", TRACE_TYPES, json.dumps(xaxis_range)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+def test_shipped_data_draws_svg_lines():
+    # One year of weeks: at most 5 * 2 * 52 points
+    assert _trace_types(None) == "scatter"
+
+
+def test_long_history_draws_webgl_lines(tmp_path):
+    # Eight years zoomed out to 2.5: the week level around the view fills LINE_MAX_POINTS
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.synthetic_data", str(tmp_path), "--years", "8", "--patients", "2000"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+    )
+    assert _trace_types([100, 230], tmp_path) == "scatter scattergl"
+
+
+# Run on a long history (own process: the data directory is read on import). For
+# every x-axis range given as JSON, the view select_time_view picks must fit
+# LINE_MAX_POINTS where the next finer level around the same range would not, and its
+# points must equal the cube resampled directly with pandas: the mean of every metric
+# per service and calendar period, at the mean week of the period. Prints
+# [level, points, finer level's points, largest difference] per range
+TIME_VIEWS = """
+import json, sys
+import numpy as np
+import pandas as pd
+from dashboard import dash_data
+from dashboard.linechart import LINE_MAX_POINTS, select_time_view
+
+current = dash_data.snapshot()
+cube = current["SERVICES_CUBE"]
+weeks = np.asarray(current["WEEKS"])
+dates = pd.DatetimeIndex(current["DATES"])
+periods = {
+    "week": np.arange(len(weeks)),
+    "month": dates.to_period("M"),
+    "quarter": dates.to_period("Q"),
+    "year": dates.year,
+}
+
+
+def resampled(level):
+    # Mean week and per-service metric means of every period, in period order
+    x = pd.Series(weeks).groupby(periods[level]).mean().to_numpy()
+    means = [pd.DataFrame(cube[s]).groupby(periods[level]).mean().to_numpy() for s in range(len(cube))]
+    return x, np.stack(means)
+
+
+def window_points(level, lo, hi):
+    span = max(hi - lo, 1)
+    buckets = current["TIME_PYRAMID"][level]
+    start = np.searchsorted(buckets["last_week"], lo - span, side="left")
+    stop = np.searchsorted(buckets["first_week"], hi + span, side="right")
+    return int(stop - start)
+
+
+results = []
+for xaxis_range in json.loads(sys.argv[1]):
+    view = select_time_view(xaxis_range)
+    x, means = resampled(view["level"])
+    start = int(np.searchsorted(x, view["x"][0]))
+    expected = means[:, start : start + len(view["x"])]
+    assert np.array_equal(view["x"], x[start : start + len(view["x"])])
+    assert np.array_equal(np.isnan(view["cube"]), np.isnan(expected))
+    difference = float(np.nanmax(np.abs(view["cube"] - expected)))
+
+    level_index = dash_data.TIME_LEVELS.index(view["level"])
+    finer = None
+    if level_index:
+        lo, hi = xaxis_range if xaxis_range is not None else [1, 52]
+        finer = window_points(dash_data.TIME_LEVELS[level_index - 1], lo, hi)
+    results.append([view["level"], len(view["x"]), finer, difference])
+print(json.dumps({"max_points": LINE_MAX_POINTS, "results": results}))
+"""
+
+
+def test_time_views_fit_and_match_a_resample(tmp_path):
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.synthetic_data", str(tmp_path), "--years", "40", "--patients", "2000"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+    )
+    weeks = 40 * 52
+    ranges = [None, [1, weeks], [1, 300], [500, 560], [900, 2000], [weeks - 30, weeks + 30], [700.5, 702.5]]
+    env = {key: value for key, value in os.environ.items() if not key.startswith("HOSPITOOLS_")}
+    env["HOSPITOOLS_DATA_DIR"] = str(tmp_path)
+    result = subprocess.run(
+        [sys.executable, "-c", TIME_VIEWS, json.dumps(ranges)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.splitlines()[-1])
+
+    max_points = report["max_points"]
+    levels = []
+    for level, points, finer_points, difference in report["results"]:
+        levels.append(level)
+        assert points <= max_points
+        # The finest level that fits: the next finer one would not
+        assert finer_points is None or finer_points > max_points
+        assert difference < 1e-9
+    # Forty years at once are drawn per quarter, 300 weeks per month, short windows per week
+    assert levels == ["week", "quarter", "month", "week", "quarter", "week", "week"]
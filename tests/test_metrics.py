@@ -0,0 +1,97 @@
+import base64
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from dashboard.metrics import DURATION_BUCKETS, QUANTILES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Metrics are module state of the worker, so one request is made in a fresh process
+# (default settings: callbacks run in the request thread). Prints the gzip-compressed
+# body of one violin chart request, then the /metrics exposition that follows it
+ONE_REQUEST = """
+import base64, json
+from app import server
+from benchmarks.dash_client import build_callback_body, find_dependency, load_dependencies, load_layout_ids
+
+client = server.test_client()
+dependency = find_dependency(load_dependencies(client), "violin-chart.figure")
+values = {"violin-metric-radio.value": "staff_morale", "services-checklist.value": ["ICU"]}
+body = build_callback_body(dependency, values, ["violin-metric-radio.value"], load_layout_ids(client))
+response = client.post(
+    "/_dash-update-component", json=body, headers={"Accept-Encoding": "gzip"}
+)
+assert response.status_code == 200 and response.headers["Content-Encoding"] == "gzip"
+print(json.dumps({"body": base64.b64encode(response.data).decode()}))
+print(client.get("/metrics").get_data(as_text=True))
+"""
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def _samples(exposition: str) -> dict:
+    """{(metric name, frozenset of label pairs): value} of a text exposition."""
+    samples = {}
+    for line in exposition.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        pairs = frozenset(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', labels or ""))
+        samples[name, pairs] = float(value)
+    return samples
+
+
+def _get(samples: dict, name: str, **labels) -> float:
+    return samples[name, frozenset(labels.items())]
+
+
+def test_metrics_after_one_callback_request():
+    env = {key: value for key, value in os.environ.items() if not key.startswith("HOSPITOOLS_")}
+    result = subprocess.run(
+        [sys.executable, "-c", ONE_REQUEST],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    first, exposition = result.stdout.split("\n", 1)
+    sent = base64.b64decode(json.loads(first)["body"])
+    samples = _samples(exposition)
+    callback = "update_violin_chart_cb"
+
+    # Histograms: cumulative buckets ending at +Inf with the one sample
+    for measure in ("duration_seconds", "cpu_seconds"):
+        name = f"hospitools_callback_{measure}"
+        cumulative = [_get(samples, f"{name}_bucket", callback=callback, le=repr(le)) for le in DURATION_BUCKETS]
+        cumulative.append(_get(samples, f"{name}_bucket", callback=callback, le="+Inf"))
+        assert cumulative == sorted(cumulative) and cumulative[-1] == 1
+        assert _get(samples, f"{name}_count", callback=callback) == 1
+        duration = _get(samples, f"{name}_sum", callback=callback)
+        assert duration > 0
+        # The sample lies in the first bucket that counts it
+        first_bucket = cumulative.index(1)
+        assert duration <= (DURATION_BUCKETS + [float("inf")])[first_bucket]
+        assert first_bucket == 0 or duration > DURATION_BUCKETS[first_bucket - 1]
+        # One sample: every quantile of the recent ones is that sample
+        for q in QUANTILES:
+            assert _get(samples, f"{name}_recent", callback=callback, quantile=str(q)) == duration
+        assert _get(samples, f"{name}_recent_count", callback=callback) == 1
+
+    # Sizes before and after compression, as the client received them
+    assert _get(samples, "hospitools_callback_response_bytes_sum", callback=callback) == len(gzip.decompress(sent))
+    assert _get(samples, "hospitools_callback_compressed_bytes_sum", callback=callback) == len(sent)
+    for q in QUANTILES:
+        quantile = _get(samples, "hospitools_callback_compressed_bytes_recent", callback=callback, quantile=str(q))
+        assert quantile == len(sent)
+
+    # Triggers: only the one request, by the input it changed
+    triggers = {labels: value for (name, labels), value in samples.items() if name.endswith("triggers_total")}
+    assert triggers == {frozenset({("callback", callback), ("trigger", "violin-metric-radio")}): 1}
+    assert _get(samples, "hospitools_figure_cache_misses_total") == 1
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Recording is set up when the app is imported, so it runs in its own process with
+# HOSPITOOLS_RECORD_SESSIONS pointing at the directory given as argument. One page
+# loads the layout and changes the violin metric; another page comes back with a
+# session cookie the server does not know (restart or idle expiry) and first sends a
+# request without changes. The recorded sessions are then replayed; prints
+# {session file name: steps} and the replay errors
+RECORD_AND_REPLAY = """
+import json, math, sys
+from pathlib import Path
+from app import server
+from benchmarks.dash_client import call_callback, find_dependency, load_dependencies, load_layout_ids
+from benchmarks.load_test import CallbackGraph, LoadStats, load_sessions, replay
+from dashboard.recording import SESSION_COOKIE, read_session
+
+dependencies = load_dependencies(server.test_client())
+violin = find_dependency(dependencies, "violin-chart.figure")
+values = {"violin-metric-radio.value": "staff_morale", "services-checklist.value": ["ICU"]}
+
+page = server.test_client()
+ids = load_layout_ids(page)
+call_callback(page, violin, values, ["violin-metric-radio.value"], ids)
+call_callback(page, violin, {**values, "violin-metric-radio.value": "ratio"}, ["violin-metric-radio.value"], ids)
+
+returning = server.test_client()
+returning.set_cookie(SESSION_COOKIE, "0" * 32)
+call_callback(returning, violin, values, [], ids)
+call_callback(returning, violin, {**values, "services-checklist.value": ["surgery"]}, [], ids)
+
+record_dir = Path(sys.argv[1])
+steps = {path.name: [step["changed"] for step in read_session(path)["steps"]] for path in record_dir.glob("*.jsonl")}
+graph = CallbackGraph(load_dependencies(server.test_client()))
+stats = LoadStats(verify=False)
+for session in load_sessions([record_dir]):
+    replay(server.test_client(), graph, stats, session, speed=0, deadline=math.inf)
+errors = stats.report(1.0)["total"]["errors"]
+print(json.dumps({"steps": steps, "errors": errors}))
+"""
+
+
+def test_recorded_sessions_replay(tmp_path):
+    env = {key: value for key, value in os.environ.items() if not key.startswith("HOSPITOOLS_")}
+    env["HOSPITOOLS_RECORD_SESSIONS"] = str(tmp_path)
+    result = subprocess.run(
+        [sys.executable, "-c", RECORD_AND_REPLAY, str(tmp_path)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    recorded = json.loads(result.stdout.splitlines()[-1])
+
+    assert recorded["errors"] == 0
+    steps = recorded["steps"]
+    # The loaded page, then the returning one (its unknown cookie starts a new file)
+    assert sorted(steps.values(), key=len) == [
+        [{"services-checklist.value": ["surgery"]}],
+        [{"violin-metric-radio.value": "staff_morale"}, {"violin-metric-radio.value": "ratio"}],
+    ]
+    assert all(name.endswith(".jsonl") for name in steps)
@@ -0,0 +1,103 @@
+import base64
+
+import numpy as np
+import pytest
+from plotly import graph_objects as go
+
+from dashboard import serialization
+from dashboard.figure_base import WEBGL_POINT_THRESHOLD, clone_figure
+from dashboard.heatmap import get_heatmap_bases, get_heatmap_figs
+from dashboard.linechart import get_linechart_fig
+from dashboard.scatterplot_matrix import get_scatterplot_fig
+from dashboard.serialization import FLOAT_DECIMALS, compact_figure, dumps, loads
+from dashboard.violinchart import get_violin_fig
+
+# Largest difference rounding to FLOAT_DECIMALS places may make (a little more for
+# values like 3.4375, whose half-way rounding happens in binary)
+ROUNDING = 0.5 * 10**-FLOAT_DECIMALS * (1 + 1e-9)
+
+
+def _figures() -> list[go.Figure]:
+    rng = np.random.default_rng(5)
+    size = WEBGL_POINT_THRESHOLD + 1
+    large = go.Figure(go.Scattergl(x=np.arange(size), y=rng.normal(50, 10, size), customdata=np.arange(size) * 1.0))
+    gaps = go.Figure(go.Scatter(x=list(range(20)), y=[None if i % 7 == 3 else i / 3 for i in range(20)]))
+    # Clones hold the arrays of their base as plotly's own typed-array specs
+    clones = [clone_figure(base) for base in get_heatmap_bases().values()]
+    figures = [get_linechart_fig(), get_scatterplot_fig(), get_violin_fig(), *get_heatmap_figs().values(), *clones]
+    return [*figures, large, gaps]
+
+
+def _decode(value):
+    """The array of a plotly.js typed-array spec, or value when it is none."""
+    if not (isinstance(value, dict) and "bdata" in value):
+        return value
+    array = np.frombuffer(base64.b64decode(value["bdata"]), dtype=np.dtype(value["dtype"]).newbyteorder("<"))
+    if "shape" in value:
+        array = array.reshape([int(n) for n in value["shape"].split(",")])
+    return array
+
+
+def _numeric(values) -> np.ndarray | None:
+    try:
+        array = np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    return array if array.size else None
+
+
+def _assert_same(original, loaded, path: str) -> None:
+    # to_plotly_json writes numpy arrays as typed-array specs too
+    original, loaded = _decode(original), _decode(loaded)
+    if isinstance(original, dict):
+        assert original.keys() == loaded.keys(), path
+        for key, value in original.items():
+            _assert_same(value, loaded[key], f"{path}.{key}")
+        return
+    expected = _numeric(original) if isinstance(original, (list, tuple, np.ndarray)) else None
+    if expected is None:
+        if isinstance(original, (list, tuple, np.ndarray)):
+            assert len(original) == len(loaded), path
+            for i, (item, loaded_item) in enumerate(zip(original, loaded)):
+                _assert_same(item, loaded_item, f"{path}[{i}]")
+        else:
+            assert loaded == original, path
+        return
+
+    actual = np.array(loaded, dtype=float)
+    integer_valued = np.array_equal(expected, np.rint(expected))
+    if integer_valued:
+        # Integers (and integer-valued floats) come back exactly, as integers
+        assert np.array_equal(actual, expected), path
+        if isinstance(loaded, np.ndarray):
+            assert loaded.dtype.kind in "iu", path
+    else:
+        tolerance = ROUNDING
+        if isinstance(loaded, np.ndarray):
+            # Only large arrays are sent as float32, which adds its own relative error
+            assert loaded.dtype == np.float32, path
+            tolerance += np.abs(expected[np.isfinite(expected)]).max() * 2**-23
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=tolerance, equal_nan=True, err_msg=path)
+
+
+@pytest.mark.parametrize("read_figure_dicts", [True, False])
+def test_compact_figures_round_trip(monkeypatch, read_figure_dicts):
+    monkeypatch.setattr(serialization, "READ_FIGURE_DICTS", read_figure_dicts)
+    for fig in _figures():
+        loaded = loads(dumps(compact_figure(fig)))
+        _assert_same(fig.to_plotly_json(), loaded, "figure")
+
+
+def test_public_path_matches_the_private_one(monkeypatch):
+    private = [dumps(compact_figure(fig)) for fig in _figures()]
+    monkeypatch.setattr(serialization, "READ_FIGURE_DICTS", False)
+    assert [dumps(compact_figure(fig)) for fig in _figures()] == private
+
+
+def test_large_float_arrays_are_float32_and_integers_narrow():
+    fig = _figures()[-2]
+    compacted = compact_figure(fig)["data"][0]
+    assert compacted["y"]["dtype"] == "f4"
+    # Weeks and integer-valued floats both become the smallest integer type
+    assert compacted["x"]["dtype"] == compacted["customdata"]["dtype"]
+    assert np.dtype(compacted["x"]["dtype"]).itemsize == 2
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from dashboard.callbacks import _get_event_from_violin_click
+from dashboard.dash_data import CUBE_METRICS, EVENT_CATEGORIES, METRIC_INDEX, SERVICES
+from dashboard.violinchart import _kde_curve, _violin_stats, create_violin_chart
+
+METRIC = "staff_morale"
+WEEKS = list(range(1, 61))
+
+
+def _snapshot(values: np.ndarray, codes: np.ndarray, weeks: list[int]) -> dict:
+    cube = np.full((len(SERVICES), len(weeks), len(CUBE_METRICS)), np.nan)
+    cube[..., METRIC_INDEX[METRIC]] = values
+    return {"DATA_VERSION": None, "SERVICES": SERVICES, "SERVICES_CUBE": cube, "EVENT_CODES": codes, "WEEKS": weeks}
+
+
+@pytest.fixture
+def data() -> dict:
+    rng = np.random.default_rng(7)
+    values = rng.normal(70, 8, (len(SERVICES), len(WEEKS)))
+    values[0, 5] = 200  # Outlier beyond the upper fence
+    values[0, 6] = np.nan  # Missing week
+    codes = rng.integers(0, len(EVENT_CATEGORIES), (len(SERVICES), len(WEEKS))).astype(np.int8)
+    codes[1] = 0
+    codes[1, :10] = 2
+    values[1, :10] = 55.0  # One constant group
+    return _snapshot(values, codes, WEEKS)
+
+
+def test_quartiles_and_fences_match_numpy(data):
+    # Uncached: the test snapshots have no data version of their own
+    stats = _violin_stats.__wrapped__(data, METRIC, None)
+    values = data["SERVICES_CUBE"][..., METRIC_INDEX[METRIC]]
+    for (service, code), result in stats.items():
+        s = SERVICES.index(service)
+        group = values[s][(data["EVENT_CODES"][s] == code) & ~np.isnan(values[s])]
+        q1, median, q3 = np.percentile(group, [25, 50, 75])
+        iqr = q3 - q1
+        assert result["q1"] == pytest.approx(q1)
+        assert result["median"] == pytest.approx(median)
+        assert result["q3"] == pytest.approx(q3)
+        assert result["mean"] == pytest.approx(group.mean())
+        assert result["lowerfence"] == pytest.approx(min(v for v in group if v >= q1 - 1.5 * iqr))
+        assert result["upperfence"] == pytest.approx(max(v for v in group if v <= q3 + 1.5 * iqr))
+    assert stats[SERVICES[0], int(data["EVENT_CODES"][0, 5])]["upperfence"] < 200
+
+
+def test_constant_group_has_no_density(data):
+    stats = _violin_stats.__wrapped__(data, METRIC, None)
+    constant = stats[SERVICES[1], 2]
+    assert constant["grid"] is None and constant["density"] is None
+    assert constant["q1"] == constant["q3"] == constant["mean"] == 55.0
+    assert _kde_curve(np.full(5, 3.0)) is None
+
+
+def test_kde_is_a_density_on_the_soft_span():
+    values = np.random.default_rng(3).normal(0, 1, 200)
+    grid, density = _kde_curve(values)
+    q1, q3 = np.percentile(values, [25, 75])
+    bandwidth = 1.059 * min(values.std(ddof=1), (q3 - q1) / 1.349) * len(values) ** -0.2
+    assert grid[0] == pytest.approx(values.min() - 2 * bandwidth)
+    assert grid[-1] == pytest.approx(values.max() + 2 * bandwidth)
+    # Gaussian kernels summed directly, and the mass of the soft span
+    expected = [np.exp(-0.5 * ((x - values) / bandwidth) ** 2).sum() for x in grid[::10]]
+    expected = np.array(expected) / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    np.testing.assert_allclose(density[::10], expected)
+    assert 0.97 < np.trapezoid(density, grid) <= 1.0
+
+
+def test_week_range_keeps_only_its_weeks(data):
+    ranged = _violin_stats.__wrapped__(data, METRIC, (11, 40))
+    sliced = _snapshot(
+        data["SERVICES_CUBE"][:, 10:40, METRIC_INDEX[METRIC]], data["EVENT_CODES"][:, 10:40], WEEKS[10:40]
+    )
+    expected = _violin_stats.__wrapped__(sliced, METRIC, None)
+    assert ranged.keys() == expected.keys()
+    for key, result in expected.items():
+        for stat, value in result.items():
+            np.testing.assert_array_equal(ranged[key][stat], value)
+    # Week 6 (the outlier) is outside the range
+    assert max(result["upperfence"] for result in ranged.values()) < 200
+
+
+def test_click_targets_decode_to_their_event():
+    fig = create_violin_chart(METRIC, SERVICES)
+    targets = [trace for trace in fig.data if trace.type == "bar"]
+    assert len(targets) == len(SERVICES)
+    for trace in targets:
+        for x, event in zip(trace.x, trace.customdata):
+            assert _get_event_from_violin_click({"points": [{"x": x}]}) == event